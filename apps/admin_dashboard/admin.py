@@ -10,6 +10,7 @@ from .models import TokenUsage, UserAction, SystemMetrics
 from apps.users.models import UserProfile
 from apps.reports.models import DailyReport, WeeklyReport, AIEnhancementLog
 from apps.companies.models import Company
+from apps.core.authentication import invalidate_user_principals
 
 
 class TokenUsageAdmin(admin.ModelAdmin):
@@ -93,6 +94,8 @@ class EnhancedUserAdmin(BaseUserAdmin):
     
     def ban_users(self, request, queryset):
         updated = queryset.update(is_active=False)
+        # Queryset update() bypasses the User signals that clear cached principals
+        invalidate_user_principals(queryset.values_list('pk', flat=True))
         for user in queryset:
             UserAction.objects.create(
                 admin_user=request.user,
@@ -105,6 +108,8 @@ class EnhancedUserAdmin(BaseUserAdmin):
     
     def unban_users(self, request, queryset):
         updated = queryset.update(is_active=True)
+        # Queryset update() bypasses the User signals that clear cached principals
+        invalidate_user_principals(queryset.values_list('pk', flat=True))
         for user in queryset:
             UserAction.objects.create(
                 admin_user=request.user,
@@ -129,6 +134,8 @@ class EnhancedUserAdmin(BaseUserAdmin):
     
     def activate_users(self, request, queryset):
         updated = queryset.update(is_active=True)
+        # Queryset update() bypasses the User signals that clear cached principals
+        invalidate_user_principals(queryset.values_list('pk', flat=True))
         for user in queryset:
             UserAction.objects.create(
                 admin_user=request.user,
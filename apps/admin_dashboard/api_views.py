@@ -1,22 +1,27 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
+from rest_framework.pagination import CursorPagination
+from rest_framework.exceptions import ValidationError
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.models import User
 from django.db.models import Count, Sum, Q
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from datetime import datetime, timedelta
-from django.core.paginator import Paginator
 from .models import TokenUsage, UserAction, SystemMetrics
+from .services import DashboardService, TokenTrackingService, UserSearchService, UserActionService
 from .serializers import (
     TokenUsageSerializer, UserActionSerializer, SystemMetricsSerializer,
     EnhancedUserSerializer, DashboardStatsSerializer, UserManagementSerializer,
     TokenAnalyticsSerializer, ReportAnalyticsSerializer, UserSearchSerializer,
-    UserActionRequestSerializer, TokenUsageStatsSerializer, RecentActivitySerializer
+    UserActionRequestSerializer, TokenUsageStatsSerializer, RecentActivitySerializer,
+    AuditEventSerializer
 )
 from apps.reports.models import DailyReport, WeeklyReport, AIEnhancementLog
 from apps.companies.models import Company
 from apps.users.models import UserProfile
+from apps.core.models import AuditEvent
 
 
 class AdminPermission(permissions.BasePermission):
@@ -30,55 +35,7 @@ class AdminPermission(permissions.BasePermission):
 @permission_classes([AdminPermission])
 def dashboard_stats(request):
     """Get dashboard statistics"""
-    # Get date ranges
-    today = timezone.now().date()
-    last_week = today - timedelta(days=7)
-    last_month = today - timedelta(days=30)
-    
-    # User statistics
-    total_users = User.objects.count()
-    active_users = User.objects.filter(is_active=True).count()
-    new_users_this_week = User.objects.filter(date_joined__gte=last_week).count()
-    new_users_this_month = User.objects.filter(date_joined__gte=last_month).count()
-    
-    # Report statistics
-    total_daily_reports = DailyReport.objects.count()
-    total_weekly_reports = WeeklyReport.objects.count()
-    reports_this_week = DailyReport.objects.filter(created_at__gte=last_week).count()
-    reports_this_month = DailyReport.objects.filter(created_at__gte=last_month).count()
-    
-    # Company statistics
-    total_companies = Company.objects.count()
-    active_companies = Company.objects.filter(is_active=True).count()
-    
-    # AI Token statistics
-    total_tokens_used = AIEnhancementLog.objects.aggregate(
-        total=Sum('tokens_consumed')
-    )['total'] or 0
-    
-    tokens_this_week = AIEnhancementLog.objects.filter(
-        created_at__gte=last_week
-    ).aggregate(total=Sum('tokens_consumed'))['total'] or 0
-    
-    tokens_this_month = AIEnhancementLog.objects.filter(
-        created_at__gte=last_month
-    ).aggregate(total=Sum('tokens_consumed'))['total'] or 0
-    
-    data = {
-        'total_users': total_users,
-        'active_users': active_users,
-        'new_users_this_week': new_users_this_week,
-        'new_users_this_month': new_users_this_month,
-        'total_daily_reports': total_daily_reports,
-        'total_weekly_reports': total_weekly_reports,
-        'reports_this_week': reports_this_week,
-        'reports_this_month': reports_this_month,
-        'total_companies': total_companies,
-        'active_companies': active_companies,
-        'total_tokens_used': total_tokens_used,
-        'tokens_this_week': tokens_this_week,
-        'tokens_this_month': tokens_this_month,
-    }
+    data = DashboardService.get_stats()
     
     serializer = DashboardStatsSerializer(data)
     return Response(serializer.data)
@@ -87,64 +44,25 @@ def dashboard_stats(request):
 @api_view(['GET'])
 @permission_classes([AdminPermission])
 def user_management_api(request):
-    """Get user management data with search and filters"""
-    # Get search parameters
-    search = request.GET.get('search', '')
-    program_filter = request.GET.get('program', '')
-    status_filter = request.GET.get('status', '')
-    date_filter = request.GET.get('date', '')
-    page = int(request.GET.get('page', 1))
-    
-    # Build queryset
-    users = User.objects.select_related('profile')
-    
-    if search:
-        users = users.filter(
-            Q(username__icontains=search) |
-            Q(first_name__icontains=search) |
-            Q(last_name__icontains=search) |
-            Q(email__icontains=search) |
-            Q(profile__student_id__icontains=search)
-        )
-    
-    if program_filter:
-        users = users.filter(profile__program=program_filter)
-    
-    if status_filter == 'active':
-        users = users.filter(is_active=True)
-    elif status_filter == 'inactive':
-        users = users.filter(is_active=False)
+    """Get user management data with search and filters
     
-    if date_filter:
-        if date_filter == 'today':
-            users = users.filter(date_joined__date=timezone.now().date())
-        elif date_filter == 'week':
-            users = users.filter(date_joined__gte=timezone.now().date() - timedelta(days=7))
-        elif date_filter == 'month':
-            users = users.filter(date_joined__gte=timezone.now().date() - timedelta(days=30))
+    Keyset paginated: pass the previous response's ``pagination.next_cursor``
+    as ``cursor`` to get the next page.
+    """
+    users = UserSearchService.filter_users(request.GET)
     
-    # Pagination
-    paginator = Paginator(users, 50)
-    page_obj = paginator.get_page(page)
-    
-    # Statistics
-    total_users = User.objects.count()
-    active_users = User.objects.filter(is_active=True).count()
-    new_users_today = User.objects.filter(date_joined__date=timezone.now().date()).count()
-    new_users_week = User.objects.filter(date_joined__gte=timezone.now().date() - timedelta(days=7)).count()
+    cursor = request.GET.get('cursor', '')
+    page_users, next_cursor = UserSearchService.paginate(
+        users, cursor=int(cursor) if cursor.isdigit() else None, page_size=50
+    )
     
     data = {
-        'users': page_obj.object_list,
-        'total_users': total_users,
-        'active_users': active_users,
-        'new_users_today': new_users_today,
-        'new_users_week': new_users_week,
+        'users': page_users,
+        **UserSearchService.get_header_stats(),
         'pagination': {
-            'page': page_obj.number,
-            'pages': paginator.num_pages,
-            'has_next': page_obj.has_next(),
-            'has_previous': page_obj.has_previous(),
-            'total_count': paginator.count,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None,
+            'page_size': 50,
         }
     }
     
@@ -162,36 +80,12 @@ def user_actions(request):
         action = serializer.validated_data['action']
         reason = serializer.validated_data.get('reason', '')
         
-        users = User.objects.filter(id__in=user_ids)
-        
-        if action == 'BAN':
-            users.update(is_active=False)
-        elif action == 'UNBAN':
-            users.update(is_active=True)
-        elif action == 'DELETE':
-            for user in users:
-                UserAction.objects.create(
-                    admin_user=request.user,
-                    target_user=user,
-                    action='DELETE',
-                    reason=reason
-                )
-            users.delete()
-        elif action == 'ACTIVATE':
-            users.update(is_active=True)
-        
-        # Log the action
-        for user in users:
-            UserAction.objects.create(
-                admin_user=request.user,
-                target_user=user,
-                action=action,
-                reason=reason
-            )
+        affected = UserActionService.apply(request.user, user_ids, action, reason)
         
         return Response({
             'success': True,
-            'message': f'{len(users)} users {action.lower()}ed successfully'
+            'message': f'{affected} users {dict(UserAction.ACTION_CHOICES)[action].lower()} successfully',
+            'affected': affected
         })
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -202,68 +96,7 @@ def user_actions(request):
 def token_analytics_api(request):
     """Get token analytics data"""
     days = int(request.GET.get('days', 30))
-    end_date = timezone.now().date()
-    start_date = end_date - timedelta(days=days)
-    
-    # Token usage over time
-    daily_usage = list(AIEnhancementLog.objects.filter(
-        created_at__date__range=[start_date, end_date]
-    ).values('created_at__date').annotate(
-        total_tokens=Sum('tokens_consumed'),
-        count=Count('id')
-    ).order_by('created_at__date'))
-    
-    # User token usage
-    user_usage = list(AIEnhancementLog.objects.filter(
-        created_at__date__range=[start_date, end_date]
-    ).values('user__username').annotate(
-        total_tokens=Sum('tokens_consumed'),
-        count=Count('id')
-    ).order_by('-total_tokens')[:20])
-    
-    # Enhancement type usage
-    enhancement_usage = list(AIEnhancementLog.objects.filter(
-        created_at__date__range=[start_date, end_date]
-    ).values('enhancement_type').annotate(
-        total_tokens=Sum('tokens_consumed'),
-        count=Count('id')
-    ).order_by('-total_tokens'))
-    
-    # Content type usage
-    content_usage = list(AIEnhancementLog.objects.filter(
-        created_at__date__range=[start_date, end_date]
-    ).values('content_type').annotate(
-        total_tokens=Sum('tokens_consumed'),
-        count=Count('id')
-    ).order_by('-total_tokens'))
-    
-    # Total statistics
-    total_tokens = AIEnhancementLog.objects.aggregate(
-        total=Sum('tokens_consumed')
-    )['total'] or 0
-    
-    period_tokens = AIEnhancementLog.objects.filter(
-        created_at__date__range=[start_date, end_date]
-    ).aggregate(total=Sum('tokens_consumed'))['total'] or 0
-    
-    total_enhancements = AIEnhancementLog.objects.count()
-    period_enhancements = AIEnhancementLog.objects.filter(
-        created_at__date__range=[start_date, end_date]
-    ).count()
-    
-    data = {
-        'days': days,
-        'start_date': start_date,
-        'end_date': end_date,
-        'daily_usage': daily_usage,
-        'user_usage': user_usage,
-        'enhancement_usage': enhancement_usage,
-        'content_usage': content_usage,
-        'total_tokens': total_tokens,
-        'period_tokens': period_tokens,
-        'total_enhancements': total_enhancements,
-        'period_enhancements': period_enhancements,
-    }
+    data = TokenTrackingService.get_token_analytics(days)
     
     serializer = TokenAnalyticsSerializer(data)
     return Response(serializer.data)
@@ -383,44 +216,7 @@ class TokenUsageViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get token usage statistics"""
-        total_tokens = TokenUsage.objects.aggregate(total=Sum('tokens_consumed'))['total'] or 0
-        total_cost = TokenUsage.objects.aggregate(total=Sum('cost_estimate'))['total'] or 0
-        
-        # Average tokens per user
-        user_count = TokenUsage.objects.values('user').distinct().count()
-        average_tokens_per_user = total_tokens / user_count if user_count > 0 else 0
-        
-        # Top users
-        top_users = list(TokenUsage.objects.values('user__username').annotate(
-            total_tokens=Sum('tokens_consumed')
-        ).order_by('-total_tokens')[:10])
-        
-        # Enhancement type breakdown
-        enhancement_type_breakdown = list(TokenUsage.objects.values('enhancement_type').annotate(
-            total_tokens=Sum('tokens_consumed'),
-            count=Count('id')
-        ).order_by('-total_tokens'))
-        
-        # Content type breakdown
-        content_type_breakdown = list(TokenUsage.objects.values('content_type').annotate(
-            total_tokens=Sum('tokens_consumed'),
-            count=Count('id')
-        ).order_by('-total_tokens'))
-        
-        # Daily usage trend
-        daily_usage_trend = list(TokenUsage.objects.values('created_at__date').annotate(
-            total_tokens=Sum('tokens_consumed')
-        ).order_by('created_at__date')[:30])
-        
-        data = {
-            'total_tokens': total_tokens,
-            'total_cost': total_cost,
-            'average_tokens_per_user': average_tokens_per_user,
-            'top_users': top_users,
-            'enhancement_type_breakdown': enhancement_type_breakdown,
-            'content_type_breakdown': content_type_breakdown,
-            'daily_usage_trend': daily_usage_trend,
-        }
+        data = TokenTrackingService.get_usage_stats()
         
         serializer = TokenUsageStatsSerializer(data)
         return Response(serializer.data)
@@ -441,4 +237,37 @@ class SystemMetricsViewSet(viewsets.ModelViewSet):
     queryset = SystemMetrics.objects.all()
     serializer_class = SystemMetricsSerializer
     permission_classes = [AdminPermission]
-    ordering = ['-date'] 
\ No newline at end of file
+    ordering = ['-date']
+
+
+class AuditEventPagination(CursorPagination):
+    """Keyset pagination: stays fast at any depth, unlike page numbers/offsets"""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('-ts', '-id')
+
+
+class AuditEventViewSet(viewsets.ReadOnlyModelViewSet):
+    """Read-only audit history, filterable by model, action, user and time range"""
+    queryset = AuditEvent.objects.all()
+    serializer_class = AuditEventSerializer
+    permission_classes = [AdminPermission]
+    pagination_class = AuditEventPagination
+    filterset_fields = ['model', 'action', 'user']
+    search_fields = ['username']
+    ordering_fields = []
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        for param, lookup in (('since', 'ts__gte'), ('until', 'ts__lte')):
+            value = self.request.query_params.get(param)
+            if not value:
+                continue
+            parsed = parse_datetime(value)
+            if parsed is None:
+                raise ValidationError({param: 'Use ISO 8601 format, e.g. 2024-01-31T12:00:00Z'})
+            if timezone.is_naive(parsed):
+                parsed = timezone.make_aware(parsed)
+            queryset = queryset.filter(**{lookup: parsed})
+        return queryset
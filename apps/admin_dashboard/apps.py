@@ -4,4 +4,8 @@ from django.apps import AppConfig
 class AdminDashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.admin_dashboard'
-    verbose_name = 'Admin Dashboard' 
\ No newline at end of file
+    verbose_name = 'Admin Dashboard'
+    
+    def ready(self):
+        """Import signals when app is ready."""
+        import apps.admin_dashboard.signals
@@ -0,0 +1,138 @@
+"""Live admin dashboard metrics pushed over server-sent events.
+
+Model signals (and bulk writers that bypass them) mark the
+:class:`LiveMetricsBus` dirty. One refresher thread per process then
+rebuilds a single snapshot: the dashboard counts plus recent activity. It
+rebuilds at most once every ``LIVE_METRICS_MIN_INTERVAL`` seconds, and also
+every ``LIVE_METRICS_REFRESH_INTERVAL`` seconds to pick up writes made by
+other worker processes. Every open stream receives the same pre-encoded
+event, so the number of open dashboards doesn't change the database load.
+Nothing is queried while no dashboard is open.
+"""
+import json
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from apps.core.background import BackgroundWorker
+
+logger = logging.getLogger(__name__)
+
+
+class LiveMetricsBus(BackgroundWorker):
+    """In-process fan-out of dashboard snapshots to SSE subscribers."""
+
+    thread_name = 'live-metrics'
+
+    def __init__(self):
+        super().__init__()
+        self.refresh_interval = getattr(settings, 'LIVE_METRICS_REFRESH_INTERVAL', 30)
+        self.min_interval = getattr(settings, 'LIVE_METRICS_MIN_INTERVAL', 2)
+        self.heartbeat = getattr(settings, 'LIVE_METRICS_HEARTBEAT', 15)
+        self.stream_max_age = getattr(settings, 'LIVE_METRICS_STREAM_MAX_AGE', 300)
+        self._cond = threading.Condition()
+        self._dirty = True
+        self._version = 0
+        self._payload = None
+        self._subscribers = 0
+
+    @property
+    def subscriber_count(self):
+        return self._subscribers
+
+    def mark_dirty(self):
+        """Called on writes that change the dashboard; cheap enough for any signal handler."""
+        with self._cond:
+            self._dirty = True
+            self._cond.notify_all()
+
+    def subscribe(self):
+        """Yield SSE messages: a snapshot whenever it changes, comments as keep-alives.
+
+        The stream ends after ``LIVE_METRICS_STREAM_MAX_AGE`` seconds so a worker
+        isn't held forever; EventSource reconnects on its own.
+        """
+        with self._cond:
+            self._subscribers += 1
+            self._dirty = True
+            self._cond.notify_all()
+        self._ensure_thread()
+        try:
+            yield 'retry: 3000\n\n'
+            seen = 0
+            deadline = time.monotonic() + self.stream_max_age
+            while time.monotonic() < deadline:
+                with self._cond:
+                    self._cond.wait_for(
+                        lambda: self._payload is not None and self._version != seen, timeout=self.heartbeat
+                    )
+                    version, payload = self._version, self._payload
+                if payload is not None and version != seen:
+                    seen = version
+                    yield payload
+                else:
+                    yield ': keep-alive\n\n'
+        finally:
+            with self._cond:
+                self._subscribers -= 1
+                if not self._subscribers:
+                    # Don't hand a stale snapshot to the next dashboard opened
+                    self._payload = None
+
+    def _run(self):
+        last_built = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._subscribers and self._dirty, timeout=self.refresh_interval)
+                due = self._dirty or time.monotonic() - last_built >= self.refresh_interval
+                if not self._subscribers or not due:
+                    continue
+
+            # Coalesce bursts of writes into one rebuild
+            delay = last_built + self.min_interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            with self._cond:
+                self._dirty = False
+                version = self._version + 1
+
+            self._refresh_connection()
+            try:
+                payload = self._build(version)
+            except Exception:
+                logger.exception("Failed to build live dashboard metrics")
+                last_built = time.monotonic()
+                continue
+            last_built = time.monotonic()
+
+            with self._cond:
+                if self._subscribers:
+                    self._version, self._payload = version, payload
+                    self._cond.notify_all()
+
+    @staticmethod
+    def _build(version):
+        from .services import DashboardService
+
+        data = {
+            'stats': DashboardService.get_stats(),
+            **DashboardService.get_recent_activity(),
+            'generated_at': timezone.now(),
+        }
+        return f"id: {version}\nevent: metrics\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_live_metrics_bus() -> LiveMetricsBus:
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = LiveMetricsBus()
+    return _bus
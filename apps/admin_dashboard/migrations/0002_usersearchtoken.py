@@ -0,0 +1,74 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:10
+
+import re
+import unicodedata
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def tokenize(*values):
+    """UserSearchService.tokenize as of this migration (later changes must not alter it)."""
+    tokens = set()
+    for value in values:
+        if not value:
+            continue
+        value = unicodedata.normalize('NFKD', str(value))
+        value = ''.join(ch for ch in value if not unicodedata.combining(ch)).casefold()
+        tokens.update(token[:64] for token in re.split(r'[\W_]+', value) if token)
+    return tokens
+
+
+def populate_search_tokens(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    UserSearchToken = apps.get_model('admin_dashboard', 'UserSearchToken')
+    users = User.objects.values_list(
+        'id', 'username', 'first_name', 'last_name', 'email', 'profile__student_id'
+    ).order_by('id')
+    batch = []
+    for user_id, *values in users.iterator(chunk_size=2000):
+        batch.extend(
+            UserSearchToken(user_id=user_id, token=token)
+            for token in tokenize(*values)
+        )
+        if len(batch) >= 5000:
+            UserSearchToken.objects.bulk_create(batch)
+            batch = []
+    UserSearchToken.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('users', '0005_userprofile_profile_company_name_idx'),
+        ('admin_dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                (
+                    'user',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='search_tokens',
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'User Search Token',
+                'verbose_name_plural': 'User Search Tokens',
+                'db_table': 'user_search_tokens',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='usersearchtoken',
+            constraint=models.UniqueConstraint(fields=('token', 'user'), name='user_search_token_unique'),
+        ),
+        migrations.RunPython(populate_search_tokens, migrations.RunPython.noop),
+    ]
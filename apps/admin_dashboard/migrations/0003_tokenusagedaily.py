@@ -0,0 +1,68 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:00
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+import django.db.models.deletion
+
+
+def populate_rollups(apps, schema_editor):
+    TokenUsage = apps.get_model('admin_dashboard', 'TokenUsage')
+    TokenUsageDaily = apps.get_model('admin_dashboard', 'TokenUsageDaily')
+    buckets = TokenUsage.objects.annotate(
+        day=TruncDate('created_at'),
+        enhancement=Coalesce('enhancement_type', Value('')),
+        content=Coalesce('content_type', Value('')),
+    ).values('day', 'user_id', 'enhancement', 'content').annotate(
+        tokens=Sum('tokens_consumed'),
+        cost=Sum('cost_estimate'),
+        requests=Count('id'),
+    ).order_by()
+    TokenUsageDaily.objects.bulk_create([
+        TokenUsageDaily(
+            day=bucket['day'],
+            user_id=bucket['user_id'],
+            enhancement_type=bucket['enhancement'],
+            content_type=bucket['content'],
+            tokens_consumed=bucket['tokens'] or 0,
+            cost_estimate=bucket['cost'] or 0,
+            request_count=bucket['requests'],
+        )
+        for bucket in buckets
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('admin_dashboard', '0002_usersearchtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenUsageDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('enhancement_type', models.CharField(blank=True, default='', max_length=50)),
+                ('content_type', models.CharField(blank=True, default='', max_length=50)),
+                ('tokens_consumed', models.BigIntegerField(default=0)),
+                ('cost_estimate', models.DecimalField(decimal_places=6, default=0, max_digits=14)),
+                ('request_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='token_usage_daily', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Daily Token Usage',
+                'verbose_name_plural': 'Daily Token Usage',
+                'db_table': 'token_usage_daily',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='tokenusagedaily',
+            constraint=models.UniqueConstraint(fields=('day', 'user', 'enhancement_type', 'content_type'), name='token_usage_daily_bucket_unique'),
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
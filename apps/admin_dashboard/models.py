@@ -10,7 +10,8 @@ class TokenUsage(models.Model):
     enhancement_type = models.CharField(max_length=50, blank=True, null=True)
     content_type = models.CharField(max_length=50, blank=True, null=True)
     cost_estimate = models.DecimalField(max_digits=10, decimal_places=6, default=0)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: rows are written in batches and keep the time of the call
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         ordering = ['-created_at']
@@ -21,6 +22,37 @@ class TokenUsage(models.Model):
         return f"{self.user.username} - {self.tokens_consumed} tokens - {self.created_at.date()}"
 
 
+class TokenUsageDaily(models.Model):
+    """Per-day token usage rollup, kept in step with TokenUsage by TokenTrackingService.
+
+    Analytics read these buckets so queries scale with the number of days
+    requested rather than the number of usage rows logged.
+    """
+    day = models.DateField()
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='token_usage_daily')
+    # '' instead of NULL so the unique constraint treats "no type" as one bucket
+    enhancement_type = models.CharField(max_length=50, blank=True, default='')
+    content_type = models.CharField(max_length=50, blank=True, default='')
+    tokens_consumed = models.BigIntegerField(default=0)
+    cost_estimate = models.DecimalField(max_digits=14, decimal_places=6, default=0)
+    request_count = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'token_usage_daily'
+        ordering = ['-day']
+        verbose_name = 'Daily Token Usage'
+        verbose_name_plural = 'Daily Token Usage'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'user', 'enhancement_type', 'content_type'],
+                name='token_usage_daily_bucket_unique'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} {self.user_id} {self.enhancement_type or '-'}/{self.content_type or '-'}: {self.tokens_consumed} tokens"
+
+
 class UserAction(models.Model):
     """Track admin actions on users"""
     ACTION_CHOICES = [
@@ -63,4 +95,24 @@ class SystemMetrics(models.Model):
         verbose_name_plural = 'System Metrics'
     
     def __str__(self):
-        return f"Metrics for {self.date} - {self.total_users} users, {self.total_reports} reports" 
\ No newline at end of file
+        return f"Metrics for {self.date} - {self.total_users} users, {self.total_reports} reports" 
+
+class UserSearchToken(models.Model):
+    """Normalized word from a user's username, names, email or student ID.
+
+    Admin user search matches each query term as a prefix against the
+    (token, user) index instead of scanning users with icontains.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=64)
+    
+    class Meta:
+        db_table = 'user_search_tokens'
+        verbose_name = 'User Search Token'
+        verbose_name_plural = 'User Search Tokens'
+        constraints = [
+            models.UniqueConstraint(fields=['token', 'user'], name='user_search_token_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.token} -> {self.user_id}"
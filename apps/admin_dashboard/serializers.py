@@ -7,6 +7,7 @@ from .models import TokenUsage, UserAction, SystemMetrics
 from apps.users.models import UserProfile
 from apps.reports.models import DailyReport, WeeklyReport, AIEnhancementLog
 from apps.companies.models import Company
+from apps.core.models import AuditEvent
 
 
 class TokenUsageSerializer(serializers.ModelSerializer):
@@ -39,6 +40,13 @@ class SystemMetricsSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
 
+class AuditEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuditEvent
+        fields = ['id', 'ts', 'model', 'action', 'user', 'username', 'payload']
+        read_only_fields = fields
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
     program_display = serializers.CharField(source='get_program_display', read_only=True)
     pt_phase_display = serializers.CharField(source='get_pt_phase_display', read_only=True)
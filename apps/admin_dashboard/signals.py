@@ -0,0 +1,66 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.companies.models import Company
+from apps.reports.models import DailyReport, WeeklyReport
+from apps.users.models import UserProfile
+from .live import get_live_metrics_bus
+from .models import UserAction
+from .services import UserSearchService
+from .usage import get_usage_writer
+
+SEARCHABLE_USER_FIELDS = {'username', 'first_name', 'last_name', 'email'}
+
+
+@receiver(post_save, sender=User)
+def update_user_search_tokens(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    """Re-index a user when a searchable field may have changed.
+
+    The header stats count active users, so they are dropped on creation and
+    whenever ``is_active`` may have changed (bans, activations).
+    """
+    if created or update_fields is None or 'is_active' in update_fields:
+        cache.delete(UserSearchService.HEADER_STATS_CACHE_KEY)
+    if raw:
+        return
+    # Logins only touch last_login; skip them
+    if update_fields is not None and not SEARCHABLE_USER_FIELDS & set(update_fields):
+        return
+    UserSearchService.reindex_user(instance.id)
+
+
+@receiver(post_save, sender=UserProfile)
+def update_profile_search_tokens(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Re-index the owner when the student ID may have changed."""
+    if raw or (update_fields is not None and 'student_id' not in update_fields):
+        return
+    UserSearchService.reindex_user(instance.user_id)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=UserAction)
+def clear_user_header_stats(sender, **kwargs):
+    """Django admin actions ban and activate with queryset update(); their UserAction rows mark the change."""
+    cache.delete(UserSearchService.HEADER_STATS_CACHE_KEY)
+
+
+@receiver(request_finished)
+def flush_usage_events(sender, **kwargs):
+    """On SQLite, write queued usage events once the response has been sent."""
+    writer = get_usage_writer()
+    if writer.flushes_after_request() and not writer.queue.empty():
+        writer.flush()
+
+
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=DailyReport)
+@receiver([post_save, post_delete], sender=WeeklyReport)
+@receiver([post_save, post_delete], sender=Company)
+@receiver([post_save, post_delete], sender=UserAction)
+def refresh_live_metrics(sender, update_fields=None, **kwargs):
+    """Tell open live dashboards that their counts or recent activity changed."""
+    if sender is User and update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    get_live_metrics_bus().mark_dirty()
@@ -0,0 +1,223 @@
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.core.authentication import PRINCIPAL_CACHE_KEY
+from apps.core.models import AuditEvent
+from apps.reports.models import AIEnhancementLog
+from .models import TokenUsage, TokenUsageDaily, UserAction
+from .services import TokenTrackingService, UserActionService, UserSearchService
+from .usage import get_usage_writer, record_usage
+
+
+class UsageEventTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+
+    def test_rows_keep_the_time_of_the_call(self):
+        called_at = datetime(2025, 1, 20, 9, 30, tzinfo=dt_timezone.utc)
+        with mock.patch('django.utils.timezone.now', return_value=called_at):
+            record_usage(self.user, 120, 'ENHANCE', 'WEEKLY', enhanced_content='enhanced')
+        get_usage_writer().flush()
+
+        self.assertEqual(TokenUsage.objects.get().created_at, called_at)
+        self.assertEqual(AIEnhancementLog.objects.get().created_at, called_at)
+        self.assertEqual(TokenUsageDaily.objects.get().day, called_at.date())
+
+    def test_discarded_completions_log_tokens_only(self):
+        record_usage(self.user, 80, 'ENHANCE', 'WEEKLY', discarded=True)
+        get_usage_writer().flush()
+
+        self.assertEqual(TokenUsage.objects.get().tokens_consumed, 80)
+        self.assertFalse(AIEnhancementLog.objects.exists())
+
+
+class TokenRollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        cls.other = User.objects.create_user(username='other', password='pass12345')
+
+    def setUp(self):
+        self.now = datetime.now(dt_timezone.utc)
+
+    def record(self, user, tokens, days_ago=0, enhancement_type='ENHANCE', content_type='WEEKLY'):
+        with mock.patch('django.utils.timezone.now', return_value=self.now - timedelta(days=days_ago)):
+            record_usage(user, tokens, enhancement_type, content_type, cost_estimate=Decimal('0.01'))
+
+    def test_calls_are_summed_into_one_bucket_per_day_user_and_type(self):
+        self.record(self.user, 100)
+        self.record(self.user, 50)
+        self.record(self.user, 30, content_type='DAILY')
+        self.record(self.user, 20, days_ago=1)
+        get_usage_writer().flush()
+        # Later batches increment the existing bucket
+        self.record(self.user, 5)
+        get_usage_writer().flush()
+
+        bucket = TokenUsageDaily.objects.get(day=self.now.date(), user=self.user, content_type='WEEKLY')
+        self.assertEqual((bucket.tokens_consumed, bucket.request_count), (155, 3))
+        self.assertEqual(bucket.cost_estimate, Decimal('0.03'))
+        self.assertEqual(TokenUsageDaily.objects.count(), 3)
+        self.assertEqual(TokenUsage.objects.count(), 5)
+
+    def test_analytics_match_the_raw_usage_rows(self):
+        self.record(self.user, 100)
+        self.record(self.user, 40, enhancement_type='SUMMARIZE')
+        self.record(self.other, 60, days_ago=3)
+        self.record(self.other, 500, days_ago=40)
+        get_usage_writer().flush()
+
+        with self.assertNumQueries(6):
+            analytics = TokenTrackingService.get_token_analytics(days=30)
+        self.assertEqual(analytics['total_tokens'], sum(TokenUsage.objects.values_list('tokens_consumed', flat=True)))
+        self.assertEqual((analytics['period_tokens'], analytics['period_enhancements']), (200, 3))
+        self.assertEqual(analytics['total_enhancements'], 4)
+        self.assertEqual(
+            [(row['created_at__date'], row['total_tokens']) for row in analytics['daily_usage']],
+            [((self.now - timedelta(days=3)).date(), 60), (self.now.date(), 140)],
+        )
+        self.assertEqual(
+            [(row['user__username'], row['total_tokens'], row['count']) for row in analytics['user_usage']],
+            [('student', 140, 2), ('other', 60, 1)],
+        )
+        self.assertEqual(
+            {row['enhancement_type']: row['total_tokens'] for row in analytics['enhancement_usage']},
+            {'ENHANCE': 160, 'SUMMARIZE': 40},
+        )
+
+        totals = TokenTrackingService.get_token_totals(
+            last_week=(self.now - timedelta(days=7)).date(), last_month=(self.now - timedelta(days=30)).date()
+        )
+        self.assertEqual(totals, {'total': 700, 'this_week': 200, 'this_month': 200})
+        stats = TokenTrackingService.get_usage_stats()
+        self.assertEqual((stats['total_tokens'], stats['average_tokens_per_user']), (700, 350))
+        self.assertEqual(TokenTrackingService.get_user_token_stats(self.user)['total_tokens'], 140)
+
+
+class HeaderStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', password='pass12345')
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_banning_a_user_refreshes_the_active_count(self):
+        self.assertEqual(UserSearchService.get_header_stats()['active_users'], 2)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(UserSearchService.get_header_stats()['active_users'], 1)
+
+    def test_admin_actions_refresh_the_active_count(self):
+        self.assertEqual(UserSearchService.get_header_stats()['active_users'], 2)
+        # As the Django admin ban action does: queryset update() plus a UserAction row
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        UserAction.objects.create(admin_user=self.admin, target_user=self.user, action='BAN')
+        self.assertEqual(UserSearchService.get_header_stats()['active_users'], 1)
+
+    def test_logins_keep_the_cached_stats(self):
+        UserSearchService.get_header_stats()
+        self.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            UserSearchService.get_header_stats()
+
+
+class DjangoAdminActionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', password='pass12345')
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+
+    def test_ban_drops_cached_principals(self):
+        cache.set(PRINCIPAL_CACHE_KEY.format(self.user.pk), (self.user.pk, 'student', True, False, False))
+        request = RequestFactory().post('/admin/auth/user/')
+        request.user = self.admin
+        model_admin = admin.site._registry[User]
+        with mock.patch.object(model_admin, 'message_user'):
+            model_admin.ban_users(request, User.objects.filter(pk=self.user.pk))
+        self.assertIsNone(cache.get(PRINCIPAL_CACHE_KEY.format(self.user.pk)))
+
+
+class UserActionServiceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', password='pass12345')
+        cls.staff = User.objects.create_user(username='staff', password='pass12345', is_staff=True)
+        cls.students = [User.objects.create_user(username=f'student{n}', password='pass12345') for n in range(3)]
+        cls.student_ids = [student.pk for student in cls.students]
+
+    def setUp(self):
+        cache.clear()
+
+    def apply(self, user_ids, action, admin_user=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return UserActionService.apply(admin_user or self.admin, user_ids, action, reason='Spam')
+
+    def test_users_are_updated_in_batches_with_a_constant_query_count(self):
+        with CaptureQueriesContext(connection) as one_user:
+            self.apply(self.student_ids[:1], 'SUSPEND')
+        with CaptureQueriesContext(connection) as all_users:
+            self.assertEqual(self.apply(self.student_ids, 'BAN'), 3)
+        self.assertEqual(len(all_users), len(one_user))
+        self.assertFalse(User.objects.filter(pk__in=self.student_ids, is_active=True).exists())
+        self.assertEqual(UserAction.objects.filter(action='BAN', reason='Spam').count(), 3)
+
+        with mock.patch.object(UserActionService, 'BATCH_SIZE', 2), \
+                mock.patch.object(UserActionService, '_apply_batch', wraps=UserActionService._apply_batch) as batches:
+            self.assertEqual(self.apply(self.student_ids, 'UNBAN'), 3)
+        self.assertEqual([call.args[1] for call in batches.call_args_list], [self.student_ids[:2], self.student_ids[2:]])
+        self.assertEqual(User.objects.filter(pk__in=self.student_ids, is_active=True).count(), 3)
+
+    def test_admins_skip_themselves_and_only_superusers_act_on_superusers(self):
+        self.assertEqual(self.apply([self.staff.pk, self.admin.pk, self.students[0].pk], 'BAN', self.staff), 1)
+        self.assertTrue(User.objects.get(pk=self.admin.pk).is_active)
+        self.assertTrue(User.objects.get(pk=self.staff.pk).is_active)
+
+    def test_ban_drops_cached_principals_and_revokes_refresh_tokens(self):
+        student = self.students[0]
+        cache.set(PRINCIPAL_CACHE_KEY.format(student.pk), (student.pk, student.username, True, False, False))
+        RefreshToken.for_user(student)
+        RefreshToken.for_user(self.students[1])
+
+        self.apply([student.pk], 'BAN')
+
+        self.assertIsNone(cache.get(PRINCIPAL_CACHE_KEY.format(student.pk)))
+        self.assertEqual(list(BlacklistedToken.objects.values_list('token__user_id', flat=True)), [student.pk])
+        # Unbanning doesn't revoke anything
+        RefreshToken.for_user(student)
+        self.apply([student.pk], 'UNBAN')
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+    def test_deleted_users_are_recorded_in_the_audit_log(self):
+        base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, base_dir)
+        RefreshToken.for_user(self.students[0])
+
+        with override_settings(BASE_DIR=base_dir):
+            self.assertEqual(self.apply(self.student_ids[:2], 'DELETE'), 2)
+            request_finished.send(sender=None)
+
+        self.assertFalse(User.objects.filter(pk__in=self.student_ids[:2]).exists())
+        event = AuditEvent.objects.get(model='User', action='bulk_delete')
+        self.assertEqual(event.user_id, self.admin.pk)
+        self.assertEqual(event.payload['reason'], 'Spam')
+        self.assertEqual([user['username'] for user in event.payload['users']], ['student0', 'student1'])
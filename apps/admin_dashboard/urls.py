@@ -10,10 +10,12 @@ router = DefaultRouter()
 router.register(r'token-usage', api_views.TokenUsageViewSet)
 router.register(r'user-actions', api_views.UserActionViewSet)
 router.register(r'system-metrics', api_views.SystemMetricsViewSet)
+router.register(r'audit-events', api_views.AuditEventViewSet)
 
 urlpatterns = [
     # Dashboard Views
     path('', views.admin_dashboard, name='dashboard'),
+    path('live/', views.live_metrics, name='live_metrics'),
     path('users/', views.user_management, name='user_management'),
     path('tokens/', views.token_analytics, name='token_analytics'),
     path('reports/', views.report_analytics, name='report_analytics'),
@@ -0,0 +1,97 @@
+"""Buffered pipeline for LLM usage events.
+
+Every LLM call reports its token usage with :func:`record_usage`. Events are
+queued in memory and written in batches by :meth:`TokenTrackingService.save_usage_events`
+(TokenUsage and AIEnhancementLog rows via ``bulk_create`` plus the daily
+rollups), so the request that made the call never waits on those inserts.
+"""
+import atexit
+import logging
+import threading
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from apps.core.background import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+
+class UsageEventWriter(BatchWriter):
+    """Queues usage events and flushes them in batches.
+
+    A background thread flushes every ``USAGE_EVENT_FLUSH_INTERVAL`` seconds.
+    SQLite allows a single writer, so there the queue is flushed from the
+    request thread once its response has been sent (``request_finished``)
+    instead of competing with request transactions from another thread.
+    """
+
+    thread_name = 'usage-event-writer'
+
+    def __init__(self):
+        super().__init__(
+            queue_size=getattr(settings, 'USAGE_EVENT_QUEUE_SIZE', 10000),
+            flush_interval=getattr(settings, 'USAGE_EVENT_FLUSH_INTERVAL', 2.0),
+        )
+        self.batch_size = getattr(settings, 'USAGE_EVENT_BATCH_SIZE', 500)
+
+    @staticmethod
+    def flushes_after_request():
+        return connection.vendor == 'sqlite'
+
+    def _writes_in_background(self):
+        return not self.flushes_after_request()
+
+    def _write(self, entries):
+        from .services import TokenTrackingService
+
+        try:
+            TokenTrackingService.save_usage_events(entries)
+        except Exception:
+            logger.exception("Failed to save %d usage events", len(entries))
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_usage_writer() -> UsageEventWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = UsageEventWriter()
+                atexit.register(_writer.flush)
+    return _writer
+
+
+def record_usage(user, tokens_consumed, enhancement_type=None, content_type=None, cost_estimate=0,
+                 original_content=None, enhanced_content=None, discarded=False):
+    """Queue one LLM call's usage; returns immediately.
+
+    - user: the user the call was made for (calls without one are not tracked)
+    - tokens_consumed: prompt + completion tokens
+    - enhancement_type / content_type: e.g. 'ENHANCE' / 'WEEKLY'
+    - original_content / enhanced_content: optional text kept on the AIEnhancementLog row
+    - discarded: the answer was thrown away (lost a hedge); only its tokens are recorded
+    """
+    if user is None or not getattr(user, 'is_authenticated', False):
+        return
+    try:
+        # Rows keep the time of the call, not the time the batch was flushed
+        created_at = timezone.now()
+        get_usage_writer().submit({
+            'user_id': user.pk,
+            'created_at': created_at,
+            'day': timezone.localdate(created_at),
+            'tokens_consumed': int(tokens_consumed or 0),
+            'enhancement_type': enhancement_type,
+            'content_type': content_type,
+            'cost_estimate': cost_estimate or 0,
+            'original_content': original_content,
+            'enhanced_content': enhanced_content,
+            'discarded': discarded,
+        })
+    except Exception:
+        # Usage tracking must never break the LLM call that reported it
+        logger.exception("Failed to queue usage event")
@@ -0,0 +1,261 @@
+import datetime
+import json
+import math
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.core.throttling import AIEnhanceThrottle, AISuggestThrottle, AIWeeklyReportThrottle
+from apps.reports.models import DailyReport, MainJob, MainJobOperation, WeeklyReport
+from apps.users.models import UserProfile
+from billings.models import UserBalance
+
+SAMPLE_TEXT = (
+    'Today I helped the technician to service the compressor. We checked the oil level, cleaned the air '
+    'filter and tested the pressure switch. I learned how to read the pressure gauge.'
+)
+
+# name -> (throttle, path, JSON body); bodies may use {week}, {daily_report_id} and {request}
+# (the request's sequence number). Weekly bodies differ per request: identical enhancements
+# of a week share one LLM call, which would hide the load.
+ENDPOINTS = {
+    'weekly': (AIWeeklyReportThrottle, '/api/reports/weekly/week/{week}/enhance_with_ai/',
+               {'additional_instructions': 'Load test request {request}: keep the tone formal.'}),
+    'text': (AIEnhanceThrottle, '/api/ai/enhance/text/', {'text': SAMPLE_TEXT, 'type': 'improve'}),
+    'daily': (AIEnhanceThrottle, '/api/ai/enhance/daily/', {'daily_report_id': '{daily_report_id}', 'field': 'description'}),
+    'suggest': (AISuggestThrottle, '/api/ai/suggest/improvements/', {'text': SAMPLE_TEXT, 'type': 'daily'}),
+}
+
+WEEK_START = datetime.date(2025, 1, 20)  # a Monday
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the AI enhancement endpoints at a target request rate and report throughput and latency. "
+        "Run the server against the same database, with the LLM providers pointed at `mock_llm_server`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server under test')
+        parser.add_argument('--rps', type=float, default=2.0, help='Requests started per second (default: 2)')
+        parser.add_argument('--duration', type=float, default=60, help='Seconds to send requests for (default: 60)')
+        parser.add_argument(
+            '--endpoints', default='weekly,text,daily,suggest',
+            help=f"Comma-separated mix, sent round-robin (choices: {', '.join(ENDPOINTS)})"
+        )
+        parser.add_argument(
+            '--users', type=int,
+            help='Test users to spread requests over (default: enough to stay under the per-user AI throttles)'
+        )
+        parser.add_argument('--user-prefix', default='loadtest', help='Username prefix for test users')
+        parser.add_argument('--max-in-flight', type=int, default=200,
+                            help='Client-side cap on open requests; requests over it are counted as skipped')
+        parser.add_argument('--timeout', type=float, default=120, help='Per-request timeout in seconds')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+        parser.add_argument('--cleanup', action='store_true', help='Delete the test users and their data, then exit')
+
+    def handle(self, *args, **options):
+        prefix = options['user_prefix']
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(username__startswith=f'{prefix}-').delete()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} rows for test users '{prefix}-*'"))
+            return
+
+        names = [name.strip() for name in options['endpoints'].split(',') if name.strip()]
+        unknown = set(names) - set(ENDPOINTS)
+        if unknown or not names:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown)) or '(none given)'}")
+        if options['rps'] <= 0 or options['duration'] <= 0:
+            raise CommandError("--rps and --duration must be positive")
+
+        total = max(1, int(options['rps'] * options['duration']))
+        user_count = options['users'] or self._users_needed(names, total, options['duration'])
+        users = self._setup_users(prefix, user_count)
+        lifetime = datetime.timedelta(seconds=options['duration'] + options['timeout'] + 60)
+        for user in users:
+            token = AccessToken.for_user(user['user'])
+            token.set_exp(lifetime=lifetime)
+            user['token'] = str(token)
+
+        self.stderr.write(
+            f"Sending {total} requests at {options['rps']}/s over {options['duration']:.0f}s "
+            f"({', '.join(names)}) as {len(users)} users to {options['base_url']}"
+        )
+        results, skipped, elapsed = self._run(names, users, total, options)
+        report = self._report(names, results, skipped, elapsed, options)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._print(report)
+
+    def _users_needed(self, names, total, duration):
+        """Users whose subscribed-tier throttle buckets can absorb the whole run."""
+        per_endpoint = Counter(names[i % len(names)] for i in range(total))
+        needed = 1
+        for name in per_endpoint:
+            throttle = ENDPOINTS[name][0]()
+            rate = throttle.THROTTLE_RATES.get(f'{throttle.scope}.SUBSCRIBED') or throttle.rate
+            if not rate:
+                continue
+            capacity, period = throttle.parse_rate(rate)
+            # Endpoints sharing a scope share the bucket
+            shared = sum(c for n, c in per_endpoint.items() if ENDPOINTS[n][0].scope == throttle.scope)
+            budget = capacity + capacity / period * duration
+            needed = max(needed, math.ceil(shared / (budget * 0.9)))
+        return needed
+
+    @transaction.atomic
+    def _setup_users(self, prefix, count):
+        """Create (or reuse) subscribed users with a complete week 1 to enhance."""
+        users = []
+        for n in range(count):
+            user, created = User.objects.get_or_create(
+                username=f'{prefix}-{n}', defaults={'email': f'{prefix}-{n}@example.com'}
+            )
+            if created:
+                user.set_unusable_password()
+                user.save(update_fields=['password'])
+                UserProfile.objects.update_or_create(user=user, defaults={
+                    'program': 'MECHANICAL', 'company_name': 'Load Test Engineering Ltd',
+                })
+                for offset in range(5):
+                    DailyReport.objects.create(
+                        student=user, week_number=1, date=WEEK_START + datetime.timedelta(days=offset),
+                        description=SAMPLE_TEXT, hours_spent=8,
+                    )
+                weekly_report = WeeklyReport.create_from_daily_reports(user, 1)
+                main_job = MainJob.objects.create(weekly_report=weekly_report, title='Compressor servicing')
+                for step, description in enumerate(['Isolate the compressor', 'Service the filters', 'Test run'], 1):
+                    MainJobOperation.objects.create(
+                        main_job=main_job, step_number=step, operation_description=description,
+                        tools_used='Spanners, pressure gauge',
+                    )
+            UserBalance.objects.filter(user=user).update(payment_status='SUBSCRIBED', updated_at=timezone.now())
+            users.append({
+                'user': user,
+                'daily_report_id': DailyReport.objects.filter(student=user).values_list('id', flat=True).first(),
+            })
+        return users
+
+    def _run(self, names, users, total, options):
+        local = threading.local()
+        lock = threading.Lock()
+        results = []
+        in_flight = [0]
+
+        def send(name, user, scheduled, number):
+            _, path, body = ENDPOINTS[name]
+            fields = {'week': 1, 'daily_report_id': user['daily_report_id'], 'request': number}
+            body = {key: value.format(**fields) if isinstance(value, str) and '{' in value else value
+                    for key, value in body.items()}
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+            try:
+                response = local.session.post(
+                    options['base_url'].rstrip('/') + path.format(**fields), json=body,
+                    headers={'Authorization': f"Bearer {user['token']}"}, timeout=options['timeout'],
+                )
+                outcome = response.status_code
+            except requests.Timeout:
+                outcome = 'timeout'
+            except requests.RequestException:
+                outcome = 'connection_error'
+            # Latency from the scheduled start, so client-side delays count too
+            finished = time.monotonic()
+            with lock:
+                results.append((name, outcome, finished - scheduled, finished))
+                in_flight[0] -= 1
+
+        skipped = Counter()
+        pool = ThreadPoolExecutor(max_workers=options['max_in_flight'], thread_name_prefix='load-test')
+        start = time.monotonic()
+        try:
+            for i in range(total):
+                scheduled = start + i / options['rps']
+                delay = scheduled - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                name = names[i % len(names)]
+                with lock:
+                    if in_flight[0] >= options['max_in_flight']:
+                        skipped[name] += 1
+                        continue
+                    in_flight[0] += 1
+                pool.submit(send, name, users[i % len(users)], scheduled, i)
+        finally:
+            pool.shutdown(wait=True)
+        end = max((r[3] for r in results), default=time.monotonic())
+        return results, skipped, end - start
+
+    @staticmethod
+    def _report(names, results, skipped, elapsed, options):
+        def summarize(rows, skipped_count):
+            statuses = Counter(str(outcome) for _, outcome, _, _ in rows)
+            ok = sum(1 for _, outcome, _, _ in rows if isinstance(outcome, int) and 200 <= outcome < 300)
+            latencies = [latency for _, _, latency, _ in rows]
+            return {
+                'sent': len(rows),
+                'skipped': skipped_count,
+                'ok': ok,
+                'statuses': dict(sorted(statuses.items())),
+                'throughput_rps': round(ok / elapsed, 2) if elapsed else 0,
+                'latency_s': {
+                    'p50': round(_percentile(latencies, 50), 3) if latencies else None,
+                    'p90': round(_percentile(latencies, 90), 3) if latencies else None,
+                    'p99': round(_percentile(latencies, 99), 3) if latencies else None,
+                    'max': round(max(latencies), 3) if latencies else None,
+                },
+            }
+
+        by_endpoint = defaultdict(list)
+        for row in results:
+            by_endpoint[row[0]].append(row)
+        return {
+            'base_url': options['base_url'],
+            'target_rps': options['rps'],
+            'elapsed_s': round(elapsed, 2),
+            'overall': summarize(results, sum(skipped.values())),
+            'endpoints': {name: summarize(by_endpoint[name], skipped[name]) for name in dict.fromkeys(names)},
+        }
+
+    def _print(self, report):
+        self.stdout.write(self.style.SUCCESS(
+            f"\nLoad test against {report['base_url']}: target {report['target_rps']} req/s, {report['elapsed_s']}s"
+        ))
+        header = f"{'endpoint':<10} {'sent':>6} {'ok':>6} {'skip':>5} {'ok/s':>7} {'p50':>7} {'p90':>7} {'p99':>7} {'max':>7}  statuses"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        rows = list(report['endpoints'].items()) + [('overall', report['overall'])]
+        for name, stats in rows:
+            latency = {k: f"{v:.2f}" if v is not None else '-' for k, v in stats['latency_s'].items()}
+            statuses = ' '.join(f"{code}:{count}" for code, count in stats['statuses'].items())
+            self.stdout.write(
+                f"{name:<10} {stats['sent']:>6} {stats['ok']:>6} {stats['skipped']:>5} {stats['throughput_rps']:>7} "
+                f"{latency['p50']:>7} {latency['p90']:>7} {latency['p99']:>7} {latency['max']:>7}  {statuses}"
+            )
+
+        statuses = report['overall']['statuses']
+        if statuses.get('429'):
+            self.stdout.write(self.style.WARNING(
+                "429s: the per-user AI throttles kicked in; raise --users to spread the load."
+            ))
+        if statuses.get('503'):
+            self.stdout.write(self.style.WARNING(
+                "503s: LLM admission control shed calls (queue full or LLM_QUEUE_TIMEOUT) or every provider was down."
+            ))
+        if report['overall']['skipped']:
+            self.stdout.write(self.style.WARNING(
+                "Skipped requests: more than --max-in-flight were open; the server isn't keeping up with the rate."
+            ))
@@ -0,0 +1,65 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from apps.ai_assist.mock_llm import LatencyModel, MockLLMServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local mock of the Anthropic messages and OpenAI chat completions APIs for load tests. "
+        "Start the app with ANTHROPIC_BASE_URL=http://HOST:PORT and OPENAI_API_BASE=http://HOST:PORT/v1."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8100)
+        parser.add_argument(
+            '--latency', default='lognormal:1.5,0.5',
+            help="Response latency: fixed:S, uniform:LOW,HIGH, exponential:MEAN or lognormal:MEDIAN,SIGMA, "
+                 "optionally +SECONDS_PER_OUTPUT_TOKEN (default: lognormal:1.5,0.5)"
+        )
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls answered with a 500')
+        parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of calls answered with a 429')
+        parser.add_argument(
+            '--down', action='append', choices=['anthropic', 'openai'], default=[],
+            help='Answer every call to this provider with a 500 (repeatable), to exercise failover'
+        )
+        parser.add_argument(
+            '--fixtures',
+            help='JSON file with a list of {"match": "<prompt substring>", "response": <string or JSON>}; '
+                 'the first match wins'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            latency = LatencyModel(options['latency'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        for name in ('error_rate', 'rate_limit_rate'):
+            if not 0 <= options[name] <= 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be between 0 and 1")
+
+        fixtures = None
+        if options['fixtures']:
+            try:
+                with open(options['fixtures']) as f:
+                    fixtures = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Could not read fixtures: {e}")
+            if not isinstance(fixtures, list) or not all(isinstance(x, dict) and 'response' in x for x in fixtures):
+                raise CommandError('Fixtures must be a list of objects with a "response" key')
+
+        server = MockLLMServer(
+            (options['host'], options['port']), latency, options['error_rate'], options['rate_limit_rate'],
+            fixtures, options['down'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Mock LLM server on http://{options['host']}:{options['port']} "
+            f"(latency {latency.spec}, errors {options['error_rate']:.0%}, 429s {options['rate_limit_rate']:.0%})"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(json.dumps(server.stats))
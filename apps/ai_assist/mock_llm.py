@@ -0,0 +1,226 @@
+"""Local stand-in for the Anthropic and OpenAI APIs, for load tests without real tokens.
+
+Serves ``POST /v1/messages`` (Anthropic) and ``POST /v1/chat/completions``
+(OpenAI) with the response and error bodies the SDKs expect. Point the app at
+it with ``ANTHROPIC_BASE_URL=http://127.0.0.1:8100`` and
+``OPENAI_API_BASE=http://127.0.0.1:8100/v1`` (any non-placeholder API keys).
+
+Each call sleeps for a latency drawn from a :class:`LatencyModel`, then may
+fail with a 429 or a 500 at the configured rates. The reply text is the first
+fixture whose ``match`` string occurs in the prompt. The built-in fixtures
+return a valid weekly report JSON for weekly enhancement prompts and a short
+paragraph for everything else.
+"""
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+WEEKLY_REPORT_RESPONSE = {
+    'main_job_title': 'Overhaul of a centrifugal water pump',
+    'daily_reports': [
+        {
+            'day': day,
+            'description': (
+                f'{day}: Inspected pump components, measured shaft run-out with a dial gauge and '
+                'recorded bearing clearances against the manufacturer tolerances.'
+            ),
+            'hours_worked': hours,
+        }
+        for day, hours in [('Monday', 8), ('Tuesday', 7), ('Wednesday', 8), ('Thursday', 6), ('Friday', 7)]
+    ],
+    'operations': [
+        {'step_number': 1, 'operation_description': 'Isolated the pump and drained the casing.',
+         'tools_used': 'Spanners, drain tray'},
+        {'step_number': 2, 'operation_description': 'Dismantled the casing and removed the impeller.',
+         'tools_used': 'Bearing puller, socket set'},
+        {'step_number': 3, 'operation_description': 'Replaced the bearings and mechanical seal.',
+         'tools_used': 'Hydraulic press, seal kit'},
+        {'step_number': 4, 'operation_description': 'Reassembled, aligned the coupling and test ran the pump.',
+         'tools_used': 'Dial gauge, tachometer'},
+    ],
+}
+
+DEFAULT_FIXTURES = [
+    {'match': '"main_job_title"', 'response': WEEKLY_REPORT_RESPONSE},
+    {'match': '', 'response': (
+        'During this period I carried out routine maintenance tasks under supervision, documented each '
+        'step and verified the results against the workshop procedures.'
+    )},
+]
+
+
+class LatencyModel:
+    """Seconds to wait before answering, from a spec string.
+
+    ``fixed:S``, ``uniform:LOW,HIGH``, ``exponential:MEAN`` or
+    ``lognormal:MEDIAN,SIGMA``, optionally with ``+PER_TOKEN`` seconds per
+    output token (e.g. ``lognormal:1.5,0.6+0.01``).
+    """
+
+    KINDS = {'fixed': 1, 'uniform': 2, 'exponential': 1, 'lognormal': 2}
+
+    def __init__(self, spec):
+        self.spec = spec
+        base, _, per_token = spec.partition('+')
+        kind, _, params = base.partition(':')
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution '{kind}' (use one of {', '.join(self.KINDS)})")
+        try:
+            self.params = [float(p) for p in params.split(',')] if params else []
+            self.per_token = float(per_token) if per_token else 0.0
+        except ValueError:
+            raise ValueError(f"Invalid latency spec '{spec}'")
+        if len(self.params) != self.KINDS[kind]:
+            raise ValueError(f"'{kind}' takes {self.KINDS[kind]} parameter(s), got '{params}'")
+        self.kind = kind
+
+    def sample(self, output_tokens=0):
+        if self.kind == 'fixed':
+            seconds = self.params[0]
+        elif self.kind == 'uniform':
+            seconds = random.uniform(*self.params)
+        elif self.kind == 'exponential':
+            seconds = random.expovariate(1 / self.params[0]) if self.params[0] > 0 else 0
+        else:
+            median, sigma = self.params
+            seconds = median * random.lognormvariate(0, sigma)
+        return max(0.0, seconds) + self.per_token * output_tokens
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency, error_rate=0.0, rate_limit_rate=0.0, fixtures=None, down=()):
+        super().__init__(address, MockLLMHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.fixtures = fixtures or DEFAULT_FIXTURES
+        self.down = set(down)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'ok': 0, 'rate_limited': 0, 'errors': 0, 'in_flight': 0, 'max_in_flight': 0}
+
+    def reply_for(self, prompt):
+        for fixture in self.fixtures:
+            if fixture.get('match', '') in prompt:
+                response = fixture['response']
+                return response if isinstance(response, str) else json.dumps(response, indent=2)
+        return ''
+
+    def count(self, key, delta=1):
+        with self._lock:
+            self.stats[key] += delta
+            if key == 'in_flight':
+                self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self.stats['in_flight'])
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockLLM/1.0'
+
+    def do_POST(self):
+        path = self.path.split('?', 1)[0].rstrip('/')
+        if path.endswith('/messages'):
+            provider = 'anthropic'
+        elif path.endswith('/chat/completions'):
+            provider = 'openai'
+        else:
+            self._send(404, {'error': {'message': f'Unknown endpoint {self.path}'}})
+            return
+
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        except ValueError:
+            self._send(400, self._error(provider, 'invalid_request_error', 'Request body is not valid JSON'))
+            return
+
+        server = self.server
+        server.count('requests')
+        server.count('in_flight')
+        try:
+            prompt = '\n'.join(self._text(m.get('content')) for m in body.get('messages', []))
+            prompt += self._text(body.get('system'))
+            text = server.reply_for(prompt)
+            input_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(text)
+            time.sleep(server.latency.sample(output_tokens))
+
+            roll = random.random()
+            if roll < server.rate_limit_rate:
+                server.count('rate_limited')
+                self._send(429, self._error(provider, 'rate_limit_error', 'Rate limit exceeded (mock)'),
+                           {'retry-after': '1'})
+            elif provider in server.down or roll < server.rate_limit_rate + server.error_rate:
+                server.count('errors')
+                self._send(500, self._error(provider, 'api_error', 'Internal server error (mock)'))
+            else:
+                server.count('ok')
+                model = body.get('model', 'mock')
+                if provider == 'anthropic':
+                    self._send(200, self._anthropic_message(model, text, input_tokens, output_tokens))
+                else:
+                    self._send(200, self._openai_completion(model, text, input_tokens, output_tokens))
+        finally:
+            server.count('in_flight', -1)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    @staticmethod
+    def _text(content):
+        if isinstance(content, list):
+            return '\n'.join(block.get('text', '') for block in content if isinstance(block, dict))
+        return content or ''
+
+    @staticmethod
+    def _anthropic_message(model, text, input_tokens, output_tokens):
+        return {
+            'id': f'msg_mock_{uuid.uuid4().hex[:24]}',
+            'type': 'message',
+            'role': 'assistant',
+            'model': model,
+            'content': [{'type': 'text', 'text': text}],
+            'stop_reason': 'end_turn',
+            'stop_sequence': None,
+            'usage': {'input_tokens': input_tokens, 'output_tokens': output_tokens},
+        }
+
+    @staticmethod
+    def _openai_completion(model, text, input_tokens, output_tokens):
+        return {
+            'id': f'chatcmpl-mock{uuid.uuid4().hex[:24]}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+            'usage': {
+                'prompt_tokens': input_tokens,
+                'completion_tokens': output_tokens,
+                'total_tokens': input_tokens + output_tokens,
+            },
+        }
+
+    @staticmethod
+    def _error(provider, error_type, message):
+        if provider == 'anthropic':
+            return {'type': 'error', 'error': {'type': error_type, 'message': message}}
+        return {'error': {'message': message, 'type': error_type, 'param': None, 'code': None}}
+
+    def _send(self, status_code, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
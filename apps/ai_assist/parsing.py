@@ -0,0 +1,243 @@
+"""Tolerant parsing of the weekly report enhancement JSON returned by the LLM.
+
+:class:`JSONObjectExtractor` scans the reply once, chunk by chunk, and keeps
+the first valid top-level ``{...}`` object (a brace pair in the prose before
+it that isn't JSON is skipped). It ignores code fences, ``//`` comments (the
+prompt's template has one) and trailing commas. While scanning it records the
+last point where the object could be cut and closed. If the reply stops early
+(``max_tokens``), the object is cut there and closed. The member that was
+still open at the cut (say ``operations``) is dropped: saving a partial list
+would replace the user's full list.
+
+:func:`parse_enhancement` validates the result against the enhancement
+schema (``main_job_title``, ``daily_reports``, ``operations``). Malformed
+entries are dropped rather than failing the whole enhancement.
+"""
+import json
+import re
+
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+_NUMBER = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+class EnhancementParseError(ValueError):
+    pass
+
+
+class JSONObjectExtractor:
+    """Incrementally extract the first top-level JSON object from LLM output."""
+
+    def __init__(self):
+        self.done = False
+        self._value = None
+        self._reset()
+
+    def _reset(self):
+        self._buffer = []
+        self._stack = []        # open containers: '{' or '['
+        self._expect_key = []   # per open container: an object waiting for a key (not a value)
+        self._in_string = False
+        self._escape = False
+        self._comment = False
+        self._slash = False
+        self._string_start = None
+        self._member = None     # top-level key whose value is being read
+        self._safe = None       # (buffer length, closers, open member) of the last clean cut point
+
+    def feed(self, chunk):
+        """Consume more output; returns True once the object is complete."""
+        for char in chunk:
+            if self.done:
+                break
+            self._consume(char)
+        return self.done
+
+    def _consume(self, char):
+        if not self._stack:
+            if char == '{':
+                self._open(char)
+            return
+
+        if self._in_string:
+            self._buffer.append(char)
+            if self._escape:
+                self._escape = False
+            elif char == '\\':
+                self._escape = True
+            elif char == '"':
+                self._in_string = False
+                if not self._expect_key[-1]:
+                    self._mark_safe()
+                elif len(self._stack) == 1:
+                    self._member = json.loads(''.join(self._buffer[self._string_start:]))
+            return
+
+        if self._comment:
+            self._comment = char != '\n'
+            return
+        if self._slash:
+            self._slash = False
+            if char == '/':
+                self._comment = True
+                return
+            self._buffer.append('/')
+        if char == '/':
+            self._slash = True
+            return
+
+        if char == '"':
+            self._in_string = True
+            self._string_start = len(self._buffer)
+            self._buffer.append(char)
+        elif char in '{[':
+            self._open(char)
+        elif char in '}]':
+            self._strip_trailing_comma()
+            self._buffer.append(char)
+            self._stack.pop()
+            self._expect_key.pop()
+            if not self._stack:
+                self._finish()
+            else:
+                self._mark_safe()
+        elif char == ',':
+            self._mark_safe()
+            self._buffer.append(char)
+            if self._stack[-1] == '{':
+                self._expect_key[-1] = True
+        elif char == ':':
+            self._buffer.append(char)
+            self._expect_key[-1] = False
+        else:
+            self._buffer.append(char)
+
+    def _open(self, char):
+        self._buffer.append(char)
+        self._stack.append(char)
+        self._expect_key.append(char == '{')
+        self._mark_safe()
+
+    def _finish(self):
+        try:
+            self._value = json.loads(''.join(self._buffer))
+        except ValueError:
+            # Not JSON (e.g. "the {draft}" in the prose); look for the next object
+            self._reset()
+            return
+        self.done = True
+
+    def _mark_safe(self):
+        closers = ''.join('}' if c == '{' else ']' for c in reversed(self._stack))
+        self._safe = (len(self._buffer), closers, self._member if len(self._stack) > 1 else None)
+
+    def _strip_trailing_comma(self):
+        i = len(self._buffer) - 1
+        while i >= 0 and self._buffer[i].isspace():
+            i -= 1
+        if i >= 0 and self._buffer[i] == ',':
+            del self._buffer[i]
+
+    def result(self):
+        """``(obj, repaired)``; a truncated object is cut at the last clean point and closed."""
+        if self.done:
+            return self._value, False
+        if not self._buffer:
+            raise EnhancementParseError('No JSON object in the response')
+        length, closers, open_member = self._safe
+        text = ''.join(self._buffer[:length]).rstrip()
+        if text.endswith(','):
+            text = text[:-1]
+        try:
+            obj = json.loads(text + closers)
+        except ValueError as e:
+            raise EnhancementParseError(f'Could not repair truncated JSON: {e}')
+        obj.pop(open_member, None)
+        return obj, True
+
+
+def extract_json_object(text):
+    """``(obj, repaired)`` for the first JSON object in ``text``."""
+    stripped = text.strip()
+    if stripped.startswith('{'):
+        # Fast path: the reply is exactly the object
+        try:
+            return json.loads(stripped), False
+        except ValueError:
+            pass
+    extractor = JSONObjectExtractor()
+    extractor.feed(text)
+    return extractor.result()
+
+
+def _text(value):
+    return value.strip() if isinstance(value, str) else ''
+
+
+def _hours(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        hours = float(value)
+    else:
+        match = _NUMBER.search(value) if isinstance(value, str) else None
+        if not match:
+            return None
+        hours = float(match.group())
+    return hours if 0 <= hours <= 24 else None
+
+
+def _day_name(value):
+    name = _text(value).capitalize()
+    return name if name in WEEKDAYS else None
+
+
+def validate_enhancement(data, original=None):
+    """Normalise ``data`` to the enhancement schema, dropping malformed entries.
+
+    ``original`` is the prepared enhancement input; hours the model left out
+    or garbled fall back to the user's own. Raises EnhancementParseError if
+    nothing usable remains.
+    """
+    if not isinstance(data, dict):
+        raise EnhancementParseError('Enhancement is not a JSON object')
+    original_hours = {
+        d['day']: d.get('original_hours', d.get('hours_worked'))
+        for d in (original or {}).get('daily_reports', [])
+    }
+
+    daily_reports, seen = [], set()
+    for entry in data.get('daily_reports') or []:
+        if not isinstance(entry, dict):
+            continue
+        day, description = _day_name(entry.get('day')), _text(entry.get('description'))
+        if not day or not description or day in seen:
+            continue
+        seen.add(day)
+        hours = _hours(entry.get('hours_worked'))
+        if hours is None:
+            hours = original_hours.get(day)
+        report = {'day': day, 'description': description}
+        if hours is not None:
+            report['hours_worked'] = hours
+        daily_reports.append(report)
+
+    operations = []
+    for entry in data.get('operations') or []:
+        description = _text(entry.get('operation_description')) if isinstance(entry, dict) else ''
+        if description:
+            operations.append({
+                'step_number': len(operations) + 1,  # renumbered: steps are unique per main job
+                'operation_description': description,
+                'tools_used': _text(entry.get('tools_used')),
+            })
+
+    title = _text(data.get('main_job_title'))
+    if not (title or daily_reports or operations):
+        raise EnhancementParseError('Enhancement has no title, daily reports or operations')
+    return {'main_job_title': title, 'daily_reports': daily_reports, 'operations': operations}
+
+
+def parse_enhancement(text, original=None):
+    """``(enhancement, repaired)`` from the model's reply; raises EnhancementParseError."""
+    data, repaired = extract_json_object(text)
+    return validate_enhancement(data, original), repaired
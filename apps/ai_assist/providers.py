@@ -0,0 +1,390 @@
+"""LLM provider layer: Anthropic and OpenAI behind one ``complete()`` call.
+
+- Each provider has a :class:`CircuitBreaker`. After ``LLM_BREAKER_FAILURES``
+  consecutive failures it stops receiving calls for ``LLM_BREAKER_RESET``
+  seconds, then a single trial call decides whether it closes again.
+- Each provider tracks an EWMA of its latency and of its deviation. When the
+  first provider hasn't answered after ``mean + 4 * deviation`` seconds (at
+  least ``LLM_HEDGE_MIN_DELAY``), the same request is also sent to the next
+  provider and whichever answers first wins. Hedging is skipped while calls
+  are queueing for admission, so it never adds load to a backlog.
+- A failed call fails over to the next provider right away. The whole call
+  is bounded by ``LLM_REQUEST_TIMEOUT``; past that, or with every provider's
+  breaker open, it raises :class:`LLMUnavailable` (503).
+
+Every attempt runs inside :func:`apps.core.llm_admission.llm_slot`; the
+provider gets whatever is left of the timeout once it is admitted.
+``on_complete(completion, discarded)`` is called for every completion,
+including the loser of a hedge (``discarded=True``), so that tokens spent on
+discarded answers are still tracked.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import anthropic
+import openai
+from django.conf import settings
+from apps.admin_dashboard.services import TokenTrackingService
+from apps.core.llm_admission import LLMUnavailable, ProviderThrottled, get_admission_controller, llm_slot
+
+logger = logging.getLogger(__name__)
+
+
+class Completion:
+    def __init__(self, text, input_tokens, output_tokens, provider, model, latency):
+        self.text = text
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.provider = provider
+        self.model = model
+        self.latency = latency
+
+    @property
+    def total_tokens(self):
+        return self.input_tokens + self.output_tokens
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go to the provider now (claims the trial call when half-open)."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._trial_running:
+                    return False
+                self._trial_running = True
+            return self.state != self.OPEN
+
+    def record_success(self):
+        with self._lock:
+            self.state, self.failures, self._trial_running = self.CLOSED, 0, False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning("LLM circuit opened", extra={'failures': self.failures})
+                self.state, self._opened_at = self.OPEN, time.monotonic()
+
+    def release(self):
+        """The claimed call never reached the provider (shed by admission control)."""
+        with self._lock:
+            self._trial_running = False
+
+    def retry_after(self):
+        if self.state != self.OPEN:
+            return 0
+        return max(0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+
+class LatencyTracker:
+    """EWMA of call latency and of its mean deviation (as TCP estimates RTT)."""
+
+    def __init__(self, alpha=0.125, beta=0.25):
+        self.alpha, self.beta = alpha, beta
+        self.mean = None
+        self.deviation = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        # Hedged calls finish on several pool threads at once
+        with self._lock:
+            if self.mean is None:
+                self.mean, self.deviation = seconds, seconds / 2
+            else:
+                self.deviation = (1 - self.beta) * self.deviation + self.beta * abs(seconds - self.mean)
+                self.mean = (1 - self.alpha) * self.mean + self.alpha * seconds
+
+    def hedge_delay(self, minimum):
+        with self._lock:
+            if self.mean is None:
+                return None
+            return max(minimum, self.mean + 4 * self.deviation)
+
+
+class Provider:
+    name = None
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(
+            getattr(settings, 'LLM_BREAKER_FAILURES', 5), getattr(settings, 'LLM_BREAKER_RESET', 30)
+        )
+        self.latency = LatencyTracker()
+
+    @property
+    def configured(self):
+        raise NotImplementedError
+
+    def call(self, prompt, system, max_tokens, temperature, timeout):
+        raise NotImplementedError
+
+    @staticmethod
+    def _usable_key(key):
+        return bool(key) and not key.startswith('your-')
+
+
+class AnthropicProvider(Provider):
+    name = 'anthropic'
+
+    def __init__(self):
+        super().__init__()
+        self.model = getattr(settings, 'ANTHROPIC_MODEL', 'claude-3-haiku-20240307')
+        self.api_key = getattr(settings, 'ANTHROPIC_API_KEY', '')
+        # Failover replaces the SDK's own retries
+        self._client = anthropic.Anthropic(
+            api_key=self.api_key, base_url=getattr(settings, 'ANTHROPIC_BASE_URL', '') or None, max_retries=0
+        ) if self.configured else None
+
+    @property
+    def configured(self):
+        return self._usable_key(self.api_key)
+
+    def call(self, prompt, system, max_tokens, temperature, timeout):
+        kwargs = {'system': system} if system else {}
+        response = self._client.messages.create(
+            model=self.model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            messages=[{"role": "user", "content": prompt}],
+            timeout=timeout,
+            **kwargs
+        )
+        return response.content[0].text, response.usage.input_tokens, response.usage.output_tokens
+
+
+class OpenAIProvider(Provider):
+    name = 'openai'
+
+    def __init__(self):
+        super().__init__()
+        self.model = getattr(settings, 'OPENAI_MODEL', 'gpt-4')
+        self.api_key = getattr(settings, 'OPENAI_API_KEY', '')
+        self.api_base = getattr(settings, 'OPENAI_API_BASE', '') or None
+
+    @property
+    def configured(self):
+        return self._usable_key(self.api_key)
+
+    def call(self, prompt, system, max_tokens, temperature, timeout):
+        messages = [{"role": "system", "content": system}] if system else []
+        messages.append({"role": "user", "content": prompt})
+        response = openai.ChatCompletion.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            api_key=self.api_key,
+            api_base=self.api_base,
+            request_timeout=timeout,
+        )
+        return response.choices[0].message.content, response.usage.prompt_tokens, response.usage.completion_tokens
+
+
+class LLMGateway:
+    def __init__(self):
+        self.providers = [AnthropicProvider(), OpenAIProvider()]
+        self.timeout = getattr(settings, 'LLM_REQUEST_TIMEOUT', 45)
+        self.hedge_enabled = getattr(settings, 'LLM_HEDGE_ENABLED', True)
+        self.hedge_min_delay = getattr(settings, 'LLM_HEDGE_MIN_DELAY', 2.0)
+        self._pool = None
+        self._pid = None
+        self._pool_lock = threading.Lock()
+
+    def available(self):
+        return any(p.configured for p in self.providers)
+
+    def complete(self, prompt, system=None, max_tokens=1000, temperature=0.7, prefer=None, on_complete=None):
+        """Return a :class:`Completion` from the first provider that answers.
+
+        ``prefer`` names the provider to try first ('anthropic' or 'openai');
+        the others follow, fastest first.
+        """
+        candidates = self._order(prefer)
+        if not candidates:
+            raise LLMUnavailable('AI enhancement is not configured.')
+        deadline = time.monotonic() + self.timeout
+        pending = {}
+        shed = None
+
+        def launch():
+            while candidates:
+                provider = candidates.pop(0)
+                if provider.breaker.allow():
+                    future = self._get_pool().submit(
+                        self._attempt, provider, prompt, system, max_tokens, temperature, deadline
+                    )
+                    pending[future] = provider
+                    return provider
+            return None
+
+        primary = launch()
+        hedged = False
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            timeout = remaining
+            hedge_delay = None
+            if self.hedge_enabled and not hedged and candidates and primary is not None:
+                hedge_delay = primary.latency.hedge_delay(self.hedge_min_delay)
+                if hedge_delay is not None:
+                    timeout = min(timeout, max(0, hedge_delay - (self.timeout - remaining)))
+
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if hedge_delay is not None and not hedged:
+                    hedged = True
+                    if get_admission_controller().queue_depth == 0 and launch() is not None:
+                        logger.info("Hedging LLM call", extra={'primary': primary.name})
+                continue
+
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    completion = future.result()
+                except LLMUnavailable as exc:
+                    if not isinstance(exc, ProviderThrottled):
+                        shed = exc
+                    continue
+                except Exception:
+                    logger.warning("LLM provider %s failed", provider.name, exc_info=True)
+                    continue
+                self._track_late(pending, on_complete)
+                self._notify(on_complete, completion)
+                return completion
+
+            if not pending and shed is None:
+                # Fail over to the next provider
+                launch()
+
+        self._track_late(pending, on_complete)
+        if shed is not None:
+            raise shed
+        retry_after = min((p.breaker.retry_after() for p in self.providers if p.configured), default=0)
+        raise LLMUnavailable(
+            'The AI providers are unavailable right now, please try again shortly.',
+            retry_after=max(1, round(retry_after)),
+        )
+
+    def snapshot(self):
+        def rounded(value):
+            return round(value, 3) if value is not None else None
+
+        return [{
+            'provider': p.name,
+            'configured': p.configured,
+            'model': p.model,
+            'circuit': p.breaker.state,
+            'consecutive_failures': p.breaker.failures,
+            'latency_ewma_s': rounded(p.latency.mean),
+            'hedge_delay_s': rounded(p.latency.hedge_delay(self.hedge_min_delay)),
+        } for p in self.providers]
+
+    def _order(self, prefer):
+        configured = [p for p in self.providers if p.configured]
+        return sorted(configured, key=lambda p: (
+            p.name != prefer, p.latency.mean if p.latency.mean is not None else float('inf')
+        ))
+
+    @staticmethod
+    def _attempt(provider, prompt, system, max_tokens, temperature, deadline):
+        try:
+            with llm_slot():
+                # The admission wait comes out of the request's time, not the provider's
+                start = time.monotonic()
+                if start >= deadline:
+                    raise LLMUnavailable(retry_after=1)
+                text, input_tokens, output_tokens = provider.call(
+                    prompt, system, max_tokens, temperature, deadline - start
+                )
+        except ProviderThrottled:
+            provider.breaker.record_failure()
+            raise
+        except LLMUnavailable:
+            provider.breaker.release()
+            raise
+        except Exception:
+            provider.breaker.record_failure()
+            raise
+        latency = time.monotonic() - start
+        provider.latency.observe(latency)
+        provider.breaker.record_success()
+        return Completion(text, input_tokens or 0, output_tokens or 0, provider.name, provider.model, latency)
+
+    def _track_late(self, pending, on_complete):
+        # Losing or abandoned calls still spend tokens
+        for future in pending:
+            future.add_done_callback(
+                lambda f: self._notify(on_complete, f.result(), discarded=True)
+                if not f.cancelled() and f.exception() is None else None
+            )
+
+    @staticmethod
+    def _notify(on_complete, completion, discarded=False):
+        if on_complete is None:
+            return
+        try:
+            on_complete(completion, discarded)
+        except Exception:
+            logger.exception("LLM completion callback failed")
+
+    def _get_pool(self):
+        # One pool per process, like apps.core.background.BackgroundWorker's thread
+        if self._pool is None or self._pid != os.getpid():
+            with self._pool_lock:
+                if self._pool is None or self._pid != os.getpid():
+                    self._pid = os.getpid()
+                    # Big enough that calls wait in the admission queue, which sheds, not in the pool's
+                    workers = getattr(settings, 'LLM_QUEUE_SIZE', 16) + 2 * getattr(settings, 'LLM_MAX_CONCURRENCY', 4)
+                    self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='llm-call')
+        return self._pool
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway()
+    return _gateway
+
+
+def usage_tracker(user, enhancement_type, content_type, original_content):
+    """``on_complete`` callback logging a completion's tokens for ``user``.
+
+    Discarded completions (hedge losers) are logged as tokens only: their text
+    was never shown to the user, so it gets no AIEnhancementLog entry.
+    """
+    def track(completion, discarded=False):
+        if discarded:
+            TokenTrackingService.log_token_usage(
+                user, completion.total_tokens, enhancement_type=enhancement_type, content_type=content_type,
+                discarded=True
+            )
+            return
+        TokenTrackingService.log_token_usage(
+            user, completion.total_tokens, enhancement_type=enhancement_type, content_type=content_type,
+            original_content=original_content[:1000],  # Truncate for storage
+            enhanced_content=completion.text[:1000]
+        )
+    return track
@@ -1,19 +1,19 @@
-import openai
 from django.conf import settings
-from apps.reports.models import AIEnhancementLog
+from apps.core.llm_admission import LLMUnavailable
+from .providers import get_llm_gateway, usage_tracker
 import json
 
 
 class AIService:
     def __init__(self):
-        openai.api_key = settings.OPENAI_API_KEY
-        self.model = getattr(settings, 'OPENAI_MODEL', 'gpt-4')
+        self.gateway = get_llm_gateway()
         self.max_tokens = getattr(settings, 'OPENAI_MAX_TOKENS', 2000)
     
-    def enhance_text(self, text, enhancement_type='improve', user=None):
+    def enhance_text(self, text, enhancement_type='improve', user=None, content_type='GENERAL'):
         """
-        Enhance text using OpenAI GPT
+        Enhance text (OpenAI first, Anthropic as fallback)
         enhancement_type: 'improve', 'expand', 'summarize', 'grammar'
+        content_type: 'DAILY', 'WEEKLY' or 'GENERAL' (for usage tracking)
         """
         prompts = {
             'improve': f"Improve the following text for a professional industrial training report. Make it more detailed and technical while maintaining accuracy:\n\n{text}",
@@ -23,30 +23,17 @@ class AIService:
         }
         
         try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a professional technical writing assistant specializing in industrial training reports. Provide clear, concise, and technically accurate improvements."},
-                    {"role": "user", "content": prompts.get(enhancement_type, prompts['improve'])}
-                ],
+            completion = self.gateway.complete(
+                prompts.get(enhancement_type, prompts['improve']),
+                system="You are a professional technical writing assistant specializing in industrial training reports. Provide clear, concise, and technically accurate improvements.",
                 max_tokens=self.max_tokens,
-                temperature=0.7
+                temperature=0.7,
+                prefer='openai',
+                on_complete=usage_tracker(user, 'ENHANCE', content_type, text)
             )
             
-            enhanced_text = response.choices[0].message.content.strip()
-            tokens_used = response.usage.total_tokens
-            
-            # Log the enhancement
-            if user:
-                AIEnhancementLog.objects.create(
-                    user=user,
-                    content_type='GENERAL',
-                    original_text=text[:1000],  # Truncate for storage
-                    enhanced_text=enhanced_text[:1000],
-                    prompt_used=prompts.get(enhancement_type, prompts['improve'])[:500],
-                    tokens_consumed=tokens_used,
-                    enhancement_type=enhancement_type
-                )
+            enhanced_text = completion.text.strip()
+            tokens_used = completion.total_tokens
             
             return {
                 'success': True,
@@ -56,6 +43,8 @@ class AIService:
                 'enhanced_length': len(enhanced_text)
             }
             
+        except LLMUnavailable:
+            raise
         except Exception as e:
             return {
                 'success': False,
@@ -73,65 +62,56 @@ class AIService:
         prompt = f"Create a professional weekly summary for an industrial training report based on these daily activities:\n\n{combined_text}\n\nFocus on key achievements, skills learned, and overall progress."
         
         try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are creating weekly summaries for industrial training reports. Focus on technical skills, practical experience, and professional development."},
-                    {"role": "user", "content": prompt}
-                ],
+            completion = self.gateway.complete(
+                prompt,
+                system="You are creating weekly summaries for industrial training reports. Focus on technical skills, practical experience, and professional development.",
                 max_tokens=800,
-                temperature=0.6
+                temperature=0.6,
+                prefer='openai',
+                on_complete=usage_tracker(user, 'GENERATE', 'WEEKLY', combined_text)
             )
             
-            summary = response.choices[0].message.content.strip()
-            
-            # Log the generation
-            if user:
-                AIEnhancementLog.objects.create(
-                    user=user,
-                    content_type='WEEKLY',
-                    original_text=combined_text[:1000],
-                    enhanced_text=summary[:1000],
-                    prompt_used=prompt[:500],
-                    tokens_consumed=response.usage.total_tokens,
-                    enhancement_type='summary'
-                )
+            summary = completion.text.strip()
             
             return {
                 'success': True,
                 'summary': summary,
-                'tokens_used': response.usage.total_tokens
+                'tokens_used': completion.total_tokens
             }
             
+        except LLMUnavailable:
+            raise
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e)
             }
     
-    def suggest_improvements(self, report_text, report_type='general'):
+    def suggest_improvements(self, report_text, report_type='general', user=None):
         """Suggest specific improvements for reports"""
         prompt = f"Analyze the following {report_type} training report and suggest 5 specific improvements to make it more professional and comprehensive:\n\n{report_text}"
         
         try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a professional technical writing reviewer. Provide specific, actionable suggestions for improving industrial training reports."},
-                    {"role": "user", "content": prompt}
-                ],
+            content_type = report_type.upper() if report_type.upper() in ('DAILY', 'WEEKLY') else 'GENERAL'
+            completion = self.gateway.complete(
+                prompt,
+                system="You are a professional technical writing reviewer. Provide specific, actionable suggestions for improving industrial training reports.",
                 max_tokens=600,
-                temperature=0.5
+                temperature=0.5,
+                prefer='openai',
+                on_complete=usage_tracker(user, 'SUGGEST', content_type, report_text)
             )
             
-            suggestions = response.choices[0].message.content.strip()
+            suggestions = completion.text.strip()
             
             return {
                 'success': True,
                 'suggestions': suggestions,
-                'tokens_used': response.usage.total_tokens
+                'tokens_used': completion.total_tokens
             }
             
+        except LLMUnavailable:
+            raise
         except Exception as e:
             return {
                 'success': False,
@@ -0,0 +1,164 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from unittest import mock
+from django.test import SimpleTestCase
+
+from .mock_llm import WEEKLY_REPORT_RESPONSE
+from .parsing import EnhancementParseError, JSONObjectExtractor, extract_json_object, parse_enhancement
+from .providers import CircuitBreaker, LLMGateway, Provider
+
+REPLY = json.dumps(WEEKLY_REPORT_RESPONSE, indent=2)
+
+
+class EnhancementParsingTests(SimpleTestCase):
+
+    def test_complete_reply(self):
+        enhancement, repaired = parse_enhancement(REPLY)
+        self.assertFalse(repaired)
+        self.assertEqual(len(enhancement['daily_reports']), 5)
+        self.assertEqual([op['step_number'] for op in enhancement['operations']], [1, 2, 3, 4])
+
+    def test_truncated_inside_operations_drops_them(self):
+        # A partial list would replace all of the user's steps when saved
+        cut = REPLY.index('"step_number": 3') + 30
+        enhancement, repaired = parse_enhancement(REPLY[:cut])
+        self.assertTrue(repaired)
+        self.assertEqual(enhancement['operations'], [])
+        self.assertEqual(len(enhancement['daily_reports']), 5)
+
+    def test_truncated_inside_daily_reports_drops_them(self):
+        enhancement, repaired = parse_enhancement(REPLY[:REPLY.index('"Wednesday"')])
+        self.assertTrue(repaired)
+        self.assertEqual(enhancement['daily_reports'], [])
+        self.assertEqual(enhancement['main_job_title'], WEEKLY_REPORT_RESPONSE['main_job_title'])
+
+    def test_truncated_after_operations_keeps_them(self):
+        cut = REPLY.rindex(']') + 1
+        enhancement, repaired = parse_enhancement(REPLY[:cut])
+        self.assertTrue(repaired)
+        self.assertEqual(len(enhancement['operations']), 4)
+
+    def test_skips_invalid_object_in_prose(self):
+        data, repaired = extract_json_object(f'Here is the {{draft}}: {REPLY}\nHope this helps!')
+        self.assertFalse(repaired)
+        self.assertEqual(data, WEEKLY_REPORT_RESPONSE)
+
+    def test_code_fence_comments_and_trailing_commas(self):
+        reply = '```json\n{"main_job_title": "Pump", // title\n "operations": [{"operation_description": "Drain",},],}\n```'
+        enhancement, _ = parse_enhancement(reply)
+        self.assertEqual(enhancement['operations'][0]['operation_description'], 'Drain')
+
+    def test_fed_in_chunks(self):
+        extractor = JSONObjectExtractor()
+        for start in range(0, len(REPLY), 7):
+            extractor.feed(REPLY[start:start + 7])
+        self.assertTrue(extractor.done)
+        self.assertEqual(extractor.result(), (WEEKLY_REPORT_RESPONSE, False))
+
+    def test_hours_fall_back_to_original(self):
+        reply = json.dumps({'daily_reports': [{'day': 'monday', 'description': 'Work', 'hours_worked': 'n/a'}]})
+        original = {'daily_reports': [{'day': 'Monday', 'original_hours': 6.0}]}
+        enhancement, _ = parse_enhancement(reply, original)
+        self.assertEqual(enhancement['daily_reports'], [{'day': 'Monday', 'description': 'Work', 'hours_worked': 6.0}])
+
+    def test_nothing_usable(self):
+        for reply in ('No JSON here', '{"main_job_title": "Pu', '{"other": 1}'):
+            with self.assertRaises(EnhancementParseError):
+                parse_enhancement(reply)
+
+
+class FakeProvider(Provider):
+    def __init__(self, name, delay=0, error=None):
+        super().__init__()
+        self.name, self.model = name, f'{name}-model'
+        self.delay, self.error = delay, error
+        self.timeouts = []
+
+    @property
+    def configured(self):
+        return True
+
+    def call(self, prompt, system, max_tokens, temperature, timeout):
+        self.timeouts.append(timeout)
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return f'{self.name} answer', 10, 5
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def open_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+        breaker._opened_at -= 30
+        return breaker
+
+    def test_one_trial_call_after_the_reset_timeout_closes_it(self):
+        breaker = self.open_breaker()
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+
+    def test_failed_trial_reopens_it(self):
+        breaker = self.open_breaker()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+
+class LLMGatewayTests(SimpleTestCase):
+
+    def setUp(self):
+        patcher = mock.patch('apps.ai_assist.providers.llm_slot', nullcontext)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.completions = []
+
+    def gateway(self, *providers):
+        gateway = LLMGateway()
+        gateway.providers = list(providers)
+        gateway.timeout = 2
+        gateway.hedge_min_delay = 0.05
+        return gateway
+
+    def on_complete(self, completion, discarded):
+        self.completions.append((completion.provider, discarded))
+
+    def test_failed_call_fails_over_to_the_next_provider(self):
+        failing, healthy = FakeProvider('first', error=RuntimeError('down')), FakeProvider('second')
+        completion = self.gateway(failing, healthy).complete('prompt', on_complete=self.on_complete)
+
+        self.assertEqual(completion.provider, 'second')
+        self.assertEqual(failing.breaker.failures, 1)
+        self.assertEqual(self.completions, [('second', False)])
+
+    def test_slow_call_is_hedged_and_the_loser_is_tracked_as_discarded(self):
+        slow, fast = FakeProvider('slow', delay=0.5), FakeProvider('fast')
+        slow.latency.observe(0.01)
+        gateway = self.gateway(slow, fast)
+        completion = gateway.complete('prompt', on_complete=self.on_complete)
+        gateway._get_pool().shutdown(wait=True)
+
+        self.assertEqual(completion.provider, 'fast')
+        self.assertEqual(self.completions, [('fast', False), ('slow', True)])
+
+    def test_provider_timeout_excludes_the_admission_wait(self):
+        @contextmanager
+        def slow_admission():
+            time.sleep(0.5)
+            yield
+
+        provider = FakeProvider('only')
+        with mock.patch('apps.ai_assist.providers.llm_slot', slow_admission):
+            self.gateway(provider).complete('prompt')
+        self.assertLessEqual(provider.timeouts[0], 1.5)
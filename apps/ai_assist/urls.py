@@ -11,4 +11,5 @@ urlpatterns = [
     path('generate/summary/', views.generate_weekly_summary, name='generate-summary'),
     path('suggest/improvements/', views.suggest_improvements, name='suggest-improvements'),
     path('usage/', views.usage_stats, name='usage-stats'),
+    path('providers/', views.provider_status, name='provider-status'),
 ] 
\ No newline at end of file
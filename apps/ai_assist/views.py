@@ -1,7 +1,9 @@
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from apps.core.throttling import AIEnhanceThrottle, AIGenerateThrottle, AISuggestThrottle
+from .providers import get_llm_gateway
 from .services import AIService
 from apps.reports.models import DailyReport
 from django.db import models
@@ -9,6 +11,7 @@ from django.db import models
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([AIEnhanceThrottle])
 def enhance_text(request):
     text = request.data.get('text', '')
     enhancement_type = request.data.get('type', 'improve')
@@ -27,6 +30,7 @@ def enhance_text(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([AIEnhanceThrottle])
 def enhance_daily_report(request):
     """Enhance daily report content"""
     daily_report_id = request.data.get('daily_report_id')
@@ -49,7 +53,7 @@ def enhance_daily_report(request):
         }, status=400)
     
     ai_service = AIService()
-    result = ai_service.enhance_text(text, enhancement_type, request.user)
+    result = ai_service.enhance_text(text, enhancement_type, request.user, content_type='DAILY')
     
     if result['success']:
         # Update the field with enhanced text
@@ -62,6 +66,7 @@ def enhance_daily_report(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([AIEnhanceThrottle])
 def enhance_weekly_report(request):
     """Enhance weekly report content"""
     weekly_report_id = request.data.get('weekly_report_id')
@@ -86,7 +91,7 @@ def enhance_weekly_report(request):
         }, status=400)
     
     ai_service = AIService()
-    result = ai_service.enhance_text(text, enhancement_type, request.user)
+    result = ai_service.enhance_text(text, enhancement_type, request.user, content_type='WEEKLY')
     
     if result['success']:
         # Update the field with enhanced text
@@ -100,6 +105,7 @@ def enhance_weekly_report(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([AIEnhanceThrottle])
 def enhance_general_report(request):
     """Enhance general report content"""
     field = request.data.get('field', 'introduction')
@@ -137,6 +143,7 @@ def enhance_general_report(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([AIGenerateThrottle])
 def generate_weekly_summary(request):
     """Generate weekly summary from daily reports"""
     week_number = request.data.get('week_number')
@@ -167,6 +174,7 @@ def generate_weekly_summary(request):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@throttle_classes([AISuggestThrottle])
 def suggest_improvements(request):
     """Suggest improvements for reports"""
     report_text = request.data.get('text', '')
@@ -179,7 +187,7 @@ def suggest_improvements(request):
         }, status=400)
     
     ai_service = AIService()
-    result = ai_service.suggest_improvements(report_text, report_type)
+    result = ai_service.suggest_improvements(report_text, report_type, request.user)
     
     return Response(result)
 
@@ -214,4 +222,14 @@ def usage_stats(request):
                 'content_type', 'enhancement_type', 'tokens_consumed', 'created_at'
             ))
         }
-    }) 
\ No newline at end of file
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def provider_status(request):
+    """Circuit state, latency EWMA and hedge delay per LLM provider (this worker)"""
+    return Response({
+        'success': True,
+        'data': get_llm_gateway().snapshot()
+    })
\ No newline at end of file
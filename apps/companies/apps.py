@@ -3,4 +3,8 @@ from django.apps import AppConfig
 
 class CompaniesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.companies' 
\ No newline at end of file
+    name = 'apps.companies'
+    
+    def ready(self):
+        """Import signals when app is ready."""
+        import apps.companies.signals
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:40
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalize_company_name(value):
+    """companies.models.normalize_company_name as of this migration."""
+    value = unicodedata.normalize("NFKD", value or "")
+    value = "".join(ch for ch in value if not unicodedata.combining(ch)).casefold()
+    return re.sub(r"[\W_]+", " ", value).strip()
+
+
+def populate_normalized_name(apps, schema_editor):
+    Company = apps.get_model("companies", "Company")
+    companies = list(Company.objects.only("id", "name"))
+    for company in companies:
+        company.normalized_name = normalize_company_name(company.name)
+    Company.objects.bulk_update(companies, ["normalized_name"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0002_alter_company_address_alter_company_contact_person_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="company",
+            name="normalized_name",
+            field=models.CharField(blank=True, default="", editable=False, max_length=200),
+        ),
+        migrations.RunPython(populate_normalized_name, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="company",
+            index=models.Index(fields=["normalized_name"], name="company_normalized_name_idx"),
+        ),
+    ]
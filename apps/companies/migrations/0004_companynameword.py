@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_name_words(apps, schema_editor):
+    Company = apps.get_model("companies", "Company")
+    CompanyNameWord = apps.get_model("companies", "CompanyNameWord")
+    batch = []
+    for company_id, normalized_name in Company.objects.values_list("id", "normalized_name").iterator(chunk_size=2000):
+        batch.extend(
+            CompanyNameWord(company_id=company_id, word=word)
+            for word in set(normalized_name.split())
+        )
+        if len(batch) >= 5000:
+            CompanyNameWord.objects.bulk_create(batch)
+            batch = []
+    CompanyNameWord.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("companies", "0003_company_normalized_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompanyNameWord",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("word", models.CharField(max_length=200)),
+                (
+                    "company",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="name_words",
+                        to="companies.company",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "company_name_words",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="companynameword",
+            constraint=models.UniqueConstraint(fields=("word", "company"), name="company_name_word_unique"),
+        ),
+        migrations.RunPython(populate_name_words, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,15 @@
+import re
+import unicodedata
 from django.db import models
 
 
+def normalize_company_name(value):
+    """Casefold, strip accents and collapse punctuation/whitespace to single spaces."""
+    value = unicodedata.normalize('NFKD', value or '')
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch)).casefold()
+    return re.sub(r'[\W_]+', ' ', value).strip()
+
+
 class Company(models.Model):
     INDUSTRY_CHOICES = [
         ('MANUFACTURING', 'Manufacturing'),
@@ -13,6 +22,8 @@ class Company(models.Model):
     ]
     
     name = models.CharField(max_length=200, unique=True)
+    # Lookup key for autocomplete; kept in sync with name on save()
+    normalized_name = models.CharField(max_length=200, blank=True, default='', editable=False)
     address = models.TextField(blank=True, null=True)
     contact_person = models.CharField(max_length=100, blank=True, null=True)
     phone = models.CharField(max_length=15, blank=True, null=True)
@@ -30,9 +41,38 @@ class Company(models.Model):
         verbose_name = 'Company'
         verbose_name_plural = 'Companies'
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['normalized_name'], name='company_normalized_name_idx'),
+        ]
     
     def __str__(self):
         return self.name
     
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_company_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'normalized_name'}
+        super().save(*args, **kwargs)
+    
     def get_industry_display(self):
-        return dict(self.INDUSTRY_CHOICES).get(self.industry_type, self.industry_type) 
\ No newline at end of file
+        return dict(self.INDUSTRY_CHOICES).get(self.industry_type, self.industry_type)
+
+
+class CompanyNameWord(models.Model):
+    """Word of a company's normalized name.
+
+    Autocomplete finds names containing a word that starts with the query
+    through the (word, company) index instead of scanning every name.
+    """
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='name_words')
+    word = models.CharField(max_length=200)
+
+    class Meta:
+        db_table = 'company_name_words'
+        constraints = [
+            models.UniqueConstraint(fields=['word', 'company'], name='company_name_word_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.word} -> {self.company_id}"
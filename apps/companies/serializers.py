@@ -14,14 +14,12 @@ class CompanySerializer(serializers.ModelSerializer):
 
 class CompanyListSerializer(serializers.ModelSerializer):
     industry_display = serializers.CharField(source='get_industry_display', read_only=True)
-    student_count = serializers.SerializerMethodField()
+    # Annotated by CompanyViewSet.get_queryset() to avoid a COUNT query per company
+    student_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Company
         fields = ('id', 'name', 'industry_type', 'industry_display', 'address', 'contact_person', 'student_count')
-    
-    def get_student_count(self, obj):
-        return obj.userprofile_set.count()
 
 
 class CompanyManagementSerializer(serializers.ModelSerializer):
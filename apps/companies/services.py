@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.db.models.functions import Length
+from .models import Company, CompanyNameWord, normalize_company_name
+
+
+class LRUCache:
+    """Small thread-safe in-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Cleared on every Company change in this process; the TTL bounds staleness in other workers
+company_autocomplete_cache = LRUCache(
+    maxsize=getattr(settings, 'COMPANY_AUTOCOMPLETE_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'COMPANY_AUTOCOMPLETE_CACHE_TTL', 300),
+)
+
+
+class CompanyAutocompleteService:
+    """Ranked company name suggestions for typeahead inputs"""
+
+    MAX_LIMIT = 25
+    FIELDS = ('id', 'name', 'industry_type')
+
+    @staticmethod
+    def suggest(query, limit=10):
+        """Return up to ``limit`` active companies matching ``query``.
+
+        Names starting with the query rank first (shortest first), followed by
+        names containing a word that starts with it.
+        """
+        prefix = normalize_company_name(query)
+        if not prefix:
+            return []
+        limit = max(1, min(limit, CompanyAutocompleteService.MAX_LIMIT))
+
+        cached = company_autocomplete_cache.get((prefix, limit))
+        if cached is not None:
+            return cached
+
+        results = CompanyAutocompleteService._from_shorter_prefix(prefix, limit)
+        if results is None:
+            results = CompanyAutocompleteService._query(prefix, limit)
+        company_autocomplete_cache.set((prefix, limit), results)
+        return results
+
+    @staticmethod
+    def _from_shorter_prefix(prefix, limit):
+        """Narrow a cached result for a shorter prefix when that result was exhaustive."""
+        for length in range(len(prefix) - 1, 0, -1):
+            cached = company_autocomplete_cache.get((prefix[:length], limit))
+            if cached is None:
+                continue
+            if len(cached) >= limit:
+                # Truncated: rows beyond the limit could match the longer prefix
+                return None
+            matches = []
+            for row in cached:
+                name = normalize_company_name(row['name'])
+                if name.startswith(prefix) or f" {prefix}" in name:
+                    matches.append(row)
+            return matches
+        return None
+
+    @staticmethod
+    def reindex_company(company):
+        """Bring a company's name words in line with its current normalized name"""
+        wanted = set(company.normalized_name.split())
+        existing = set(CompanyNameWord.objects.filter(company=company).values_list('word', flat=True))
+
+        if existing - wanted:
+            CompanyNameWord.objects.filter(company=company, word__in=existing - wanted).delete()
+        if wanted - existing:
+            CompanyNameWord.objects.bulk_create(
+                [CompanyNameWord(company=company, word=word) for word in wanted - existing],
+                ignore_conflicts=True
+            )
+
+    @staticmethod
+    def _query(prefix, limit):
+        companies = Company.objects.filter(is_active=True).order_by(Length('normalized_name'), 'normalized_name')
+        fields = CompanyAutocompleteService.FIELDS
+
+        # Range scan on company_normalized_name_idx; LIKE 'x%' can't use the index on every backend
+        results = list(
+            companies.filter(normalized_name__gte=prefix, normalized_name__lt=prefix + '\uffff')
+            .values(*fields)[:limit]
+        )
+        if len(results) < limit:
+            # Word matches through the (word, company) index. Every query word but
+            # the last is complete; the contains filter then checks word order
+            # on the few candidate rows only.
+            *words, last = prefix.split(' ')
+            word_filter = {'word': words[0]} if words else {'word__gte': last, 'word__lt': last + '\uffff'}
+            candidates = CompanyNameWord.objects.filter(**word_filter).values('company_id')
+            results += list(
+                companies.filter(id__in=candidates, normalized_name__contains=f" {prefix}")
+                .exclude(normalized_name__startswith=prefix)
+                .values(*fields)[:limit - len(results)]
+            )
+        return results
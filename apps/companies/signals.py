@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Company
+from .services import CompanyAutocompleteService, company_autocomplete_cache
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def clear_company_autocomplete_cache(sender, **kwargs):
+    """Drop cached suggestions whenever a company is added, renamed or removed."""
+    company_autocomplete_cache.clear()
+
+
+@receiver(post_save, sender=Company)
+def reindex_company_name_words(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the autocomplete word index in line with the company name."""
+    if created or update_fields is None or 'normalized_name' in update_fields:
+        CompanyAutocompleteService.reindex_company(instance)
@@ -0,0 +1,106 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.users.models import UserProfile
+from .models import Company, CompanyNameWord
+
+
+class CompanyQueryCountTests(TestCase):
+    """The company list/search must not issue a query per company."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        Company.objects.bulk_create([
+            Company(name=f'Company {i:02d}', industry_type='TECHNOLOGY') for i in range(30)
+        ])
+        students = User.objects.bulk_create([User(username=f'student{i}') for i in range(5)])
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=student, company_name='Company 00') for student in students[:3]]
+            + [UserProfile(user=student, company_name='Company 01') for student in students[3:]]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_query_count_is_constant(self):
+        # One COUNT for pagination plus one SELECT with annotated student counts
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('companies:company-list'))
+        self.assertEqual(response.status_code, 200)
+
+        counts = {row['name']: row['student_count'] for row in response.data['results']}
+        self.assertEqual(counts['Company 00'], 3)
+        self.assertEqual(counts['Company 01'], 2)
+        self.assertEqual(counts['Company 02'], 0)
+
+    def test_search_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('companies:company-search'), {'q': 'Company 0'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 10)
+        self.assertEqual(response.data['data'][0]['student_count'], 3)
+
+    def test_students_does_not_query_per_profile(self):
+        company = Company.objects.get(name='Company 00')
+        # get_object + profiles joined with their users
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('companies:company-students', args=[company.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['student_count'], 3)
+
+
+class CompanyAutocompleteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        for name in ['Tanzania Breweries Ltd', 'TANESCO', 'Tanga Cement', 'Azam Tanning Co', 'Bakhresa Group']:
+            Company.objects.create(name=name)
+        Company.objects.create(name='Tanzania Ports Authority', is_active=False)
+
+    def setUp(self):
+        from .services import company_autocomplete_cache
+        company_autocomplete_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def suggest(self, q, **params):
+        response = self.client.get(reverse('companies:company-autocomplete'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.data['data']]
+
+    def test_prefix_matches_rank_before_word_matches(self):
+        self.assertEqual(
+            self.suggest('tan'),
+            ['TANESCO', 'Tanga Cement', 'Tanzania Breweries Ltd', 'Azam Tanning Co'],
+        )
+        self.assertEqual(self.suggest('  BREW'), ['Tanzania Breweries Ltd'])
+        self.assertEqual(self.suggest('tan', limit=2), ['TANESCO', 'Tanga Cement'])
+        self.assertEqual(self.suggest(''), [])
+
+    def test_cached_results_are_reused_and_invalidated(self):
+        self.suggest('ta')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('tang'), ['Tanga Cement'])
+
+        Company.objects.create(name='Tanganyika Packers')
+        self.assertEqual(self.suggest('tang'), ['Tanga Cement', 'Tanganyika Packers'])
+
+    def test_word_matches_come_from_the_word_index(self):
+        self.assertEqual(self.suggest('breweries l'), ['Tanzania Breweries Ltd'])
+        self.assertEqual(self.suggest('tanning c'), ['Azam Tanning Co'])
+        self.assertEqual(self.suggest('co tanning'), [])
+
+        company = Company.objects.get(name='Azam Tanning Co')
+        company.name = 'Azam Leather Co'
+        company.save(update_fields=['name'])
+        self.assertEqual(
+            set(CompanyNameWord.objects.filter(company=company).values_list('word', flat=True)),
+            {'azam', 'leather', 'co'},
+        )
+        self.assertEqual(self.suggest('leath'), ['Azam Leather Co'])
+        self.assertEqual(self.suggest('tann'), [])
@@ -4,8 +4,11 @@ from rest_framework.response import Response
 from django_filters import rest_framework as filters
 from .models import Company
 from .serializers import CompanySerializer, CompanyListSerializer
+from .services import CompanyAutocompleteService
 from apps.core.permissions import IsCompanyOwnerOrReadOnly
+from apps.users.models import UserProfile
 from django.db import models
+from django.db.models.functions import Coalesce
 
 
 class CompanyFilter(filters.FilterSet):
@@ -17,6 +20,24 @@ class CompanyFilter(filters.FilterSet):
         fields = ['name', 'industry_type', 'is_active']
 
 
+def with_student_counts(queryset):
+    """Annotate ``student_count`` in the same query as the companies.
+
+    Profiles reference their company by name (``UserProfile.company_name``), so the
+    count is a correlated subquery served by ``profile_company_name_idx``.
+    """
+    student_counts = (
+        UserProfile.objects.filter(company_name=models.OuterRef('name'))
+        .order_by()
+        .values('company_name')
+        .annotate(total=models.Count('pk'))
+        .values('total')
+    )
+    return queryset.annotate(
+        student_count=Coalesce(models.Subquery(student_counts, output_field=models.IntegerField()), 0)
+    )
+
+
 class CompanyViewSet(viewsets.ModelViewSet):
     queryset = Company.objects.filter(is_active=True)
     permission_classes = [permissions.IsAuthenticated, IsCompanyOwnerOrReadOnly]
@@ -25,8 +46,14 @@ class CompanyViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'created_at']
     ordering = ['name']
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'search'):
+            queryset = with_student_counts(queryset)
+        return queryset
+    
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ('list', 'search'):
             return CompanyListSerializer
         return CompanySerializer
     
@@ -46,26 +73,42 @@ class CompanyViewSet(viewsets.ModelViewSet):
         )
         
         serializer = self.get_serializer(companies, many=True)
+        data = serializer.data
+        return Response({
+            'success': True,
+            'data': data,
+            'count': len(data)
+        })
+    
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Top ranked company names for a typeahead prefix"""
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 10
+        
         return Response({
             'success': True,
-            'data': serializer.data,
-            'count': companies.count()
+            'data': CompanyAutocompleteService.suggest(query, limit=limit)
         })
     
     @action(detail=True, methods=['get'])
     def students(self, request, pk=None):
         """Get students working at this company"""
         company = self.get_object()
-        students = company.userprofile_set.all()
+        students = UserProfile.objects.filter(company_name=company.name).select_related('user')
         
         from apps.users.serializers import UserProfileSerializer
         serializer = UserProfileSerializer(students, many=True)
+        data = serializer.data
         
         return Response({
             'success': True,
             'data': {
                 'company': CompanySerializer(company).data,
-                'students': serializer.data,
-                'student_count': students.count()
+                'students': data,
+                'student_count': len(data)
             }
         }) 
\ No newline at end of file
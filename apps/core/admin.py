@@ -0,0 +1,19 @@
+from django.contrib import admin
+from .models import AuditEvent
+
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(admin.ModelAdmin):
+    list_display = ('ts', 'model', 'action', 'username')
+    list_filter = ('model', 'action')
+    search_fields = ('username',)
+    date_hierarchy = 'ts'
+    # Audit history is append-only
+    readonly_fields = ('ts', 'model', 'action', 'user', 'username', 'payload')
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -3,4 +3,8 @@ from django.apps import AppConfig
  
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.core' 
\ No newline at end of file
+    name = 'apps.core'
+
+    def ready(self):
+        """Import signals when app is ready."""
+        import apps.core.signals
@@ -1,7 +1,24 @@
+import atexit
+import gzip
 import json
+import logging
 import os
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from django.conf import settings
+from django.db import connection, transaction
+
+from .background import BatchWriter
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev server, no locking needed
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+AUDIT_LOG_NAME = 'audit_log.jsonl'
 
 
 def _ensure_backups_dir() -> str:
@@ -10,27 +27,248 @@ def _ensure_backups_dir() -> str:
     return backups_dir
 
 
-def log_change(model_name: str, action: str, payload):
-    """Append a JSON line into backups/audit_log.jsonl with timestamp.
+def _segments_dir() -> str:
+    segments_dir = os.path.join(_ensure_backups_dir(), 'audit')
+    os.makedirs(segments_dir, exist_ok=True)
+    return segments_dir
+
+
+def _index_path() -> str:
+    return os.path.join(_segments_dir(), 'index.jsonl')
+
+
+@contextmanager
+def _file_lock():
+    """Serialize writes/rotation across gunicorn workers sharing the log file."""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(_ensure_backups_dir(), '.audit.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class AuditLogWriter(BatchWriter):
+    """Buffers audit entries in memory and writes them from a background thread.
+
+    Each batch is appended to the JSONL file and bulk inserted as AuditEvent rows
+    (unless ``AUDIT_LOG_TO_DATABASE`` is False; on SQLite rows are inserted from
+    the request thread after the response instead, see :meth:`submit`).
+
+    The active file is rotated into a gzip segment under backups/audit/ once it
+    exceeds ``AUDIT_LOG_MAX_BYTES`` or its first entry is older than
+    ``AUDIT_LOG_MAX_AGE`` seconds; each segment gets a summary line in
+    backups/audit/index.jsonl used by :func:`query_audit_log`.
+    """
+
+    thread_name = 'audit-log-writer'
+
+    def __init__(self):
+        super().__init__(
+            queue_size=getattr(settings, 'AUDIT_LOG_QUEUE_SIZE', 10000),
+            flush_interval=getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 1.0),
+        )
+        self.max_bytes = getattr(settings, 'AUDIT_LOG_MAX_BYTES', 50 * 1024 * 1024)
+        self.max_age = getattr(settings, 'AUDIT_LOG_MAX_AGE', 24 * 60 * 60)
+        self._pending_rows = []
+
+    def submit(self, entry):
+        if self._database_inline():
+            # SQLite allows a single writer: inserting from the background thread would
+            # deadlock request transactions that read and then write ("database is
+            # locked"). Rows of committed changes are collected instead and inserted
+            # in one batch once the response has been sent (flush_pending_rows).
+            transaction.on_commit(lambda: self._pending_rows.append(entry))
+        super().submit(entry)
+
+    def flush(self):
+        """Write everything queued so far (used at exit and by tests/commands)."""
+        super().flush()
+        self.flush_pending_rows()
+
+    def flush_pending_rows(self):
+        """Insert the AuditEvent rows collected on SQLite (after each request and at exit)."""
+        if not self._pending_rows:
+            return
+        with self._lock:
+            rows, self._pending_rows = self._pending_rows, []
+        if rows:
+            self._write_database(rows)
+
+    def _write(self, entries):
+        self._write_file(entries)
+        if getattr(settings, 'AUDIT_LOG_TO_DATABASE', True) and not self._database_inline():
+            self._write_database(entries)
+
+    @staticmethod
+    def _database_inline():
+        return getattr(settings, 'AUDIT_LOG_TO_DATABASE', True) and connection.vendor == 'sqlite'
+
+    def _write_database(self, entries):
+        """Insert the batch as AuditEvent rows with a single bulk_create."""
+        from apps.core.models import AuditEvent
+
+        try:
+            AuditEvent.objects.bulk_create(
+                [AuditEvent.from_entry(entry) for entry in entries], batch_size=500
+            )
+        except Exception:
+            # The file sink still has the entries; never block the main flow
+            logger.exception("Failed to insert %d audit events", len(entries))
+
+    def _write_file(self, entries):
+        try:
+            data = ''.join(json.dumps(e, ensure_ascii=False, default=str) + '\n' for e in entries)
+            log_path = os.path.join(_ensure_backups_dir(), AUDIT_LOG_NAME)
+            with _file_lock():
+                with open(log_path, 'a', encoding='utf-8') as f:
+                    f.write(data)
+                if self._should_rotate(log_path):
+                    self._rotate(log_path)
+        except Exception:
+            # Never block the main flow
+            logger.exception("Failed to write %d audit entries to the log file", len(entries))
+
+    def _should_rotate(self, log_path):
+        if os.path.getsize(log_path) >= self.max_bytes:
+            return True
+        with open(log_path, 'r', encoding='utf-8') as f:
+            first_line = f.readline()
+        try:
+            first_ts = _parse_ts(json.loads(first_line)['ts'])
+        except (ValueError, KeyError):
+            return False
+        return (datetime.utcnow() - first_ts).total_seconds() >= self.max_age
+
+    def _rotate(self, log_path):
+        """Compress the active file into a segment and record its index entry."""
+        segment_name = f"audit-{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}.jsonl.gz"
+        pending_path = log_path + '.rotating'
+        os.replace(log_path, pending_path)
+
+        summary = {'segment': segment_name, 'start': None, 'end': None, 'count': 0, 'models': {}, 'actions': {}}
+        with open(pending_path, 'r', encoding='utf-8') as src, \
+                gzip.open(os.path.join(_segments_dir(), segment_name), 'wt', encoding='utf-8') as dst:
+            for line in src:
+                dst.write(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                summary['count'] += 1
+                summary['start'] = min(filter(None, [summary['start'], entry.get('ts')]))
+                summary['end'] = max(filter(None, [summary['end'], entry.get('ts')]))
+                for key, field in (('models', 'model'), ('actions', 'action')):
+                    value = entry.get(field)
+                    summary[key][value] = summary[key].get(value, 0) + 1
+        os.remove(pending_path)
+
+        with open(_index_path(), 'a', encoding='utf-8') as index:
+            index.write(json.dumps(summary) + '\n')
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_audit_writer() -> AuditLogWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditLogWriter()
+                atexit.register(_writer.flush)
+    return _writer
+
+
+def log_change(model_name: str, action: str, payload, user=None):
+    """Queue an audit entry (JSONL file + AuditEvent table) with timestamp.
+
+    The entry is written by a background thread, so this returns immediately.
 
     - model_name: e.g., 'MainJobOperation'
     - action: e.g., 'delete', 'bulk_delete', 'update'
     - payload: dict or list that will be JSON-serialized
+    - user: the acting user, if known
     """
     try:
-        backups_dir = _ensure_backups_dir()
-        log_path = os.path.join(backups_dir, 'audit_log.jsonl')
         entry = {
             'ts': datetime.utcnow().isoformat() + 'Z',
             'model': model_name,
             'action': action,
             'payload': payload,
         }
-        with open(log_path, 'a', encoding='utf-8') as f:
-            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        if user is not None and getattr(user, 'is_authenticated', False):
+            entry['user_id'] = user.pk
+            entry['username'] = user.get_username()
+        get_audit_writer().submit(entry)
     except Exception:
-        # We intentionally swallow exceptions to never block the main flow
-        pass
+        # Never block the main flow
+        logger.exception("Failed to queue audit entry for %s %s", model_name, action)
+
+
+def _parse_ts(value) -> datetime:
+    return datetime.fromisoformat(value.rstrip('Z'))
+
+
+def _read_index():
+    if not os.path.exists(_index_path()):
+        return []
+    with open(_index_path(), 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def query_audit_log(model=None, action=None, since=None, until=None, limit=None):
+    """Yield audit entries matching all given filters, oldest first.
+
+    ``since``/``until`` are naive UTC datetimes. Rotated segments whose index
+    summary can't contain a match are skipped without being decompressed.
+    """
+    since_ts = since.isoformat() if since else None
+    until_ts = until.isoformat() if until else None
+
+    def matches(entry):
+        if model and entry.get('model') != model:
+            return False
+        if action and entry.get('action') != action:
+            return False
+        ts = entry.get('ts', '').rstrip('Z')
+        if since_ts and ts < since_ts:
+            return False
+        if until_ts and ts > until_ts:
+            return False
+        return True
 
+    sources = []
+    for summary in _read_index():
+        if model and model not in summary['models']:
+            continue
+        if action and action not in summary['actions']:
+            continue
+        if since_ts and summary['end'] and summary['end'].rstrip('Z') < since_ts:
+            continue
+        if until_ts and summary['start'] and summary['start'].rstrip('Z') > until_ts:
+            continue
+        sources.append(os.path.join(_segments_dir(), summary['segment']))
 
+    active_log = os.path.join(_ensure_backups_dir(), AUDIT_LOG_NAME)
+    if os.path.exists(active_log):
+        sources.append(active_log)
 
+    found = 0
+    for path in sources:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if matches(entry):
+                    yield entry
+                    found += 1
+                    if limit and found >= limit:
+                        return
@@ -1,5 +1,28 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+PRINCIPAL_CACHE_KEY = 'auth:principal:{}'
+# Only these columns are loaded for the authenticated user; any other field is
+# deferred and fetched on first access, so views that need it still work.
+PRINCIPAL_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+
+
+def invalidate_user_principals(user_ids):
+    """Drop cached principals once the surrounding transaction commits.
+
+    The cache is per process unless a shared ``CACHES`` backend is configured;
+    other workers pick the change up when ``JWT_USER_CACHE_TTL`` expires.
+    """
+    keys = [PRINCIPAL_CACHE_KEY.format(user_id) for user_id in user_ids]
+    if keys:
+        cache.delete_many(keys)
+        # A request may re-cache the old row before our transaction commits
+        transaction.on_commit(lambda: cache.delete_many(keys))
 
 
 class CustomJWTAuthentication(JWTAuthentication):
@@ -19,4 +42,33 @@ class CustomJWTAuthentication(JWTAuthentication):
         if not user.is_active:
             raise InvalidToken('User account is disabled.')
             
-        return (user, validated_token) 
\ No newline at end of file
+        return (user, validated_token)
+
+    def get_user(self, validated_token):
+        """User for the token, from a short-lived cache of its principal columns.
+
+        Authenticating a request normally needs no query; a banned or deleted
+        user is rejected at most ``JWT_USER_CACHE_TTL`` seconds later. Nothing
+        else (no password hash) is cached. The cached flags may be stale, so
+        code saving ``request.user`` must pass ``update_fields`` with the
+        columns it changed; a plain ``save()`` would write them back.
+        """
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        user_model = get_user_model()
+        # from_db() expects the values in model field order
+        fields = [f.attname for f in user_model._meta.concrete_fields if f.attname in PRINCIPAL_FIELDS]
+        key = PRINCIPAL_CACHE_KEY.format(user_id)
+        values = cache.get(key)
+        if values is None:
+            values = user_model.objects.filter(
+                **{api_settings.USER_ID_FIELD: user_id}
+            ).values_list(*fields).first()
+            if values is None:
+                raise AuthenticationFailed('User not found', code='user_not_found')
+            cache.set(key, values, getattr(settings, 'JWT_USER_CACHE_TTL', 15))
+
+        return user_model.from_db('default', fields, values)
\ No newline at end of file
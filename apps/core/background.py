@@ -0,0 +1,113 @@
+"""Per-process background threads for work kept off the request path.
+
+Threads don't survive a fork. With gunicorn ``--preload`` the application is
+imported in the master and every worker is a fork of it, so a thread started
+at import time (or by a request served before the fork) doesn't exist in the
+workers. :class:`BackgroundWorker` starts its thread lazily and starts a new
+one whenever it finds itself in another process than the one that started
+it; :meth:`BackgroundWorker._after_fork` resets state inherited from the
+parent first.
+
+:class:`BatchWriter` adds a bounded queue that the thread writes out in
+batches (audit entries, usage events).
+"""
+import os
+import queue
+import threading
+from django.db import close_old_connections
+
+
+class BackgroundWorker:
+    """Runs :meth:`_run` in one daemon thread per process, started by :meth:`_ensure_thread`."""
+
+    thread_name = 'background-worker'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_thread(self):
+        if self._thread_running():
+            return
+        with self._lock:
+            if self._thread_running():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                self._after_fork()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+            self._thread.start()
+
+    def _thread_running(self):
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def _after_fork(self):
+        """Drop state inherited from the parent process; called before the new thread starts."""
+
+    def _run(self):
+        raise NotImplementedError
+
+    @staticmethod
+    def _refresh_connection():
+        # The thread's connection is never closed by request_finished; call this
+        # before each unit of work so a dropped or expired connection is replaced
+        close_old_connections()
+
+
+class BatchWriter(BackgroundWorker):
+    """Queues entries and writes them in batches of up to ``batch_size``.
+
+    The thread waits up to ``flush_interval`` seconds for an entry, then
+    writes it with whatever else is queued. Subclasses implement
+    :meth:`_write` and may override :meth:`_writes_in_background` to flush
+    from elsewhere instead (see :meth:`flush`).
+    """
+
+    batch_size = 1000
+
+    def __init__(self, queue_size, flush_interval):
+        super().__init__()
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+
+    def submit(self, entry):
+        if self._writes_in_background():
+            self._ensure_thread()
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            # Back-pressure: never drop entries, write inline instead
+            self._write([entry])
+
+    def flush(self):
+        """Write everything queued so far (at exit, by tests and commands)."""
+        while True:
+            entries = self._drain()
+            if not entries:
+                return
+            self._write(entries)
+
+    def _writes_in_background(self):
+        return True
+
+    def _drain(self, entries=None):
+        entries = entries or []
+        while len(entries) < self.batch_size:
+            try:
+                entries.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return entries
+
+    def _run(self):
+        while True:
+            try:
+                entries = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            self._refresh_connection()
+            self._write(self._drain(entries))
+
+    def _write(self, entries):
+        raise NotImplementedError
@@ -0,0 +1,179 @@
+import gzip
+import hashlib
+import json
+from pathlib import Path
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.core.exceptions import FieldDoesNotExist
+
+# Purely ephemeral data that is never worth restoring
+EXCLUDED_MODELS = {
+    'sessions.session',
+}
+
+# Rows of these models are inserted and deleted but never edited, apart from
+# SET_NULL cascades that restore re-applies. They have no updated_at, so
+# incremental backups dump the rows above the last backup's primary key.
+INSERT_ONLY_MODELS = {
+    'admin.logentry',
+    'admin_dashboard.tokenusage',
+    'admin_dashboard.useraction',
+    'admin_dashboard.usersearchtoken',
+    'companies.companynameword',
+    'core.auditevent',
+    'reports.aienhancementlog',
+    'token_blacklist.blacklistedtoken',
+    'token_blacklist.outstandingtoken',
+}
+
+# Dump format recorded in each manifest:
+# 1 - natural foreign keys; content types, permissions and admin log entries are
+#     not dumped and come back from post_migrate (manifests without a 'format')
+# 2 - plain primary keys for every model, so restores need no natural-key lookups
+BACKUP_FORMAT = 2
+NATURAL_KEY_FORMAT = 1
+
+
+def manifest_format(manifest) -> int:
+    return manifest.get('format', NATURAL_KEY_FORMAT)
+
+
+COMPRESSION_EXTENSIONS = {
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+
+
+def get_backups_dir() -> Path:
+    backups_dir = Path(settings.BASE_DIR) / 'backups'
+    backups_dir.mkdir(parents=True, exist_ok=True)
+    return backups_dir
+
+
+def get_media_store_dir() -> Path:
+    """Content-addressed store shared by every backup (files named by sha256)."""
+    store = get_backups_dir() / 'media_store'
+    store.mkdir(parents=True, exist_ok=True)
+    return store
+
+
+def media_store_path(digest: str) -> Path:
+    return get_media_store_dir() / digest[:2] / digest
+
+
+def open_compressed(path, mode, compression='gzip'):
+    """Open a text stream over a gzip or zstd compressed file.
+
+    zstd requires the optional ``zstandard`` package.
+    """
+    if compression == 'gzip':
+        return gzip.open(path, mode + 't', encoding='utf-8', compresslevel=6)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("zstd compression requires the 'zstandard' package")
+        import io
+        raw = open(path, mode + 'b')
+        if mode == 'w':
+            stream = zstandard.ZstdCompressor(level=6).stream_writer(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8')
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def get_backup_models():
+    """Concrete, managed models in dependency order (FK targets first)."""
+    app_list = {}
+    for model in apps.get_models():
+        opts = model._meta
+        if opts.proxy or not opts.managed or opts.label_lower in EXCLUDED_MODELS:
+            continue
+        app_list.setdefault(apps.get_app_config(opts.app_label), []).append(model)
+    return serializers.sort_dependencies(app_list.items(), allow_cycles=True)
+
+
+def get_watermark_field(model):
+    """High-water mark field that finds new and changed rows, or None to dump every row.
+
+    An ``auto_now`` ``updated_at`` is used as a timestamp mark. Models in
+    :data:`INSERT_ONLY_MODELS` use ``'pk'``: only new rows need dumping.
+    ``created_at`` alone misses edits, and the remaining models (``User``,
+    ``TokenUsageDaily``) change through queryset ``update()`` and ``F()``
+    increments nothing could track, so they are dumped in full every time.
+    Queryset ``update()`` calls on a model with ``updated_at`` must set it,
+    since they bypass ``auto_now``.
+    """
+    if model._meta.label_lower in INSERT_ONLY_MODELS:
+        return 'pk'
+    try:
+        field = model._meta.get_field('updated_at')
+    except FieldDoesNotExist:
+        return None
+    return field.name if getattr(field, 'auto_now', False) else None
+
+
+def file_sha256(path, block_size=1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def manifest_path(backup_id: str) -> Path:
+    return get_backups_dir() / backup_id / 'manifest.json'
+
+
+def load_manifest(backup_id: str) -> dict:
+    with open(manifest_path(backup_id), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_manifest(backup_id: str, manifest: dict):
+    path = manifest_path(backup_id)
+    tmp_path = path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    # Atomic rename so a crashed run never leaves a half-written manifest
+    tmp_path.replace(path)
+
+
+def list_manifests():
+    """All completed backups, oldest first."""
+    manifests = []
+    for path in get_backups_dir().glob('*/manifest.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            manifests.append(json.load(f))
+    return sorted(manifests, key=lambda m: m['created_at'])
+
+
+def latest_manifest():
+    manifests = list_manifests()
+    return manifests[-1] if manifests else None
+
+
+def resolve_chain(backup_id: str):
+    """Manifests needed to restore ``backup_id``, newest first, ending at a full backup.
+
+    Raises FileNotFoundError if a manifest or a dump file is missing, and
+    ValueError if the chain mixes dump formats, so a restore can be refused
+    before any data is touched.
+    """
+    chain = []
+    current = backup_id
+    while current:
+        if not manifest_path(current).exists():
+            raise FileNotFoundError(f"Backup {current} is missing from the chain of {backup_id}")
+        manifest = load_manifest(current)
+        for entry in manifest['models'].values():
+            for file_name in entry['files'] + ([entry['pk_file']] if entry.get('pk_file') else []):
+                if not (get_backups_dir() / manifest['id'] / file_name).exists():
+                    raise FileNotFoundError(f"Backup {manifest['id']} is missing {file_name}")
+        chain.append(manifest)
+        current = manifest.get('parent')
+    if len({manifest_format(m) for m in chain}) > 1:
+        raise ValueError(f"The chain of {backup_id} mixes dump formats")
+    return chain
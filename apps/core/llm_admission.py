@@ -0,0 +1,204 @@
+"""Admission control for outbound LLM calls.
+
+Every provider call runs inside :func:`llm_slot`. At most ``LLM_MAX_CONCURRENCY``
+calls run at once across all workers on the host. Each worker holds a slot
+with an ``flock`` on one of ``logs/llm_slots/slot-<n>.lock``, so the kernel
+releases a crashed worker's slots. Without ``fcntl`` (Windows development)
+the limit is per process.
+
+Callers wait in a per-process FIFO queue of at most ``LLM_QUEUE_SIZE``
+entries. A caller that finds the queue full, or that hasn't been admitted
+within ``LLM_QUEUE_TIMEOUT`` seconds, gets :class:`LLMUnavailable` (503 with
+Retry-After) instead of tying up a worker. Provider rate-limit errors (HTTP
+429) raise :class:`ProviderThrottled`, also a 503. :func:`get_admission_controller().snapshot()`
+reports queue depth, in-flight calls and wait times for this worker.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'The AI service is busy right now, please try again shortly.'
+    default_code = 'llm_unavailable'
+
+    def __init__(self, detail=None, retry_after=None):
+        super().__init__(detail)
+        # DRF's exception handler turns ``wait`` into a Retry-After header
+        self.wait = retry_after
+
+
+class ProviderThrottled(LLMUnavailable):
+    """The provider itself rejected the call with HTTP 429."""
+
+
+def is_rate_limit_error(exc):
+    """Provider 429 (anthropic ``status_code``, openai<1.0 ``http_status``)."""
+    return getattr(exc, 'status_code', None) == 429 or getattr(exc, 'http_status', None) == 429
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1))))]
+
+
+class AdmissionController:
+    """Cross-worker LLM call slots with a bounded, deadline-limited FIFO queue per worker."""
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self):
+        self.slots = max(1, getattr(settings, 'LLM_MAX_CONCURRENCY', 4))
+        self.max_queue = getattr(settings, 'LLM_QUEUE_SIZE', 16)
+        self.max_wait = getattr(settings, 'LLM_QUEUE_TIMEOUT', 20)
+        self._cond = threading.Condition()
+        self._waiters = deque()
+        self._busy = set()
+        self._files = None
+        self._pid = None
+        self._waits_ms = deque(maxlen=1000)
+        self._avg_hold = 5.0
+        self.counters = {'admitted': 0, 'shed_queue_full': 0, 'shed_deadline': 0, 'provider_throttled': 0}
+
+    @contextmanager
+    def slot(self):
+        start = time.monotonic()
+        slot = self._admit(start)
+        waited = time.monotonic() - start
+        with self._cond:
+            self._waits_ms.append(round(waited * 1000, 1))
+            self.counters['admitted'] += 1
+        try:
+            yield
+        except Exception as exc:
+            if is_rate_limit_error(exc):
+                with self._cond:
+                    self.counters['provider_throttled'] += 1
+                logger.warning("LLM provider rate limited the call", extra={'slot': slot})
+                raise ProviderThrottled(retry_after=self._retry_after()) from exc
+            raise
+        finally:
+            held = time.monotonic() - start - waited
+            with self._cond:
+                self._avg_hold = 0.8 * self._avg_hold + 0.2 * held
+                self._release(slot)
+                self._cond.notify_all()
+
+    def _admit(self, start):
+        ticket = object()
+        deadline = start + self.max_wait
+        with self._cond:
+            if len(self._waiters) >= self.max_queue:
+                self.counters['shed_queue_full'] += 1
+                self._shed('queue full', start)
+            self._waiters.append(ticket)
+            while True:
+                if self._waiters[0] is ticket:
+                    slot = self._try_acquire()
+                    if slot is not None:
+                        self._waiters.popleft()
+                        self._cond.notify_all()
+                        return slot
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiters.remove(ticket)
+                    self._cond.notify_all()
+                    self.counters['shed_deadline'] += 1
+                    self._shed('deadline exceeded', start)
+                # Slots freed by other workers aren't signalled, so poll
+                self._cond.wait(min(remaining, self.POLL_INTERVAL))
+
+    def _shed(self, reason, start):
+        retry_after = self._retry_after()
+        logger.warning("Shedding LLM call: %s", reason, extra={
+            'queue_depth': len(self._waiters), 'waited_ms': round((time.monotonic() - start) * 1000, 1),
+        })
+        raise LLMUnavailable(retry_after=retry_after)
+
+    @property
+    def queue_depth(self):
+        return len(self._waiters)
+
+    def _retry_after(self):
+        return max(1, round(self._avg_hold * (len(self._waiters) + 1) / self.slots))
+
+    def _slot_files(self):
+        # Re-open after a fork (gunicorn preload): inherited descriptors share their locks.
+        # Closing our copies doesn't release the parent's locks, its descriptors stay open.
+        if self._files is None or self._pid != os.getpid():
+            for f in self._files or ():
+                f.close()
+            directory = os.path.join(settings.BASE_DIR, 'logs', 'llm_slots')
+            os.makedirs(directory, exist_ok=True)
+            self._pid = os.getpid()
+            self._busy = set()
+            self._files = [open(os.path.join(directory, f'slot-{n}.lock'), 'a+b') for n in range(self.slots)]
+        return self._files
+
+    def _try_acquire(self):
+        files = self._slot_files() if fcntl else None
+        for n in range(self.slots):
+            if n in self._busy:
+                continue
+            if files is not None:
+                try:
+                    fcntl.flock(files[n].fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue
+            self._busy.add(n)
+            return n
+        return None
+
+    def _release(self, slot):
+        if fcntl and self._pid == os.getpid():
+            fcntl.flock(self._files[slot].fileno(), fcntl.LOCK_UN)
+        self._busy.discard(slot)
+
+    def snapshot(self):
+        with self._cond:
+            waits = list(self._waits_ms)
+            return {
+                'pid': os.getpid(),
+                'slots': self.slots,
+                'in_flight': len(self._busy),
+                'queue_depth': len(self._waiters),
+                'max_queue': self.max_queue,
+                'queue_timeout_s': self.max_wait,
+                'avg_call_s': round(self._avg_hold, 2),
+                'wait_ms_p50': _percentile(waits, 50) if waits else None,
+                'wait_ms_p95': _percentile(waits, 95) if waits else None,
+                'wait_ms_max': max(waits) if waits else None,
+                **self.counters,
+            }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController()
+    return _controller
+
+
+def llm_slot():
+    """Context manager around one outbound LLM call."""
+    return get_admission_controller().slot()
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime, parse_date
+from datetime import datetime, time, timezone as dt_timezone
+import json
+
+from apps.core.audit import query_audit_log
+
+
+def _parse_bound(value, end_of_day=False):
+    """Accept YYYY-MM-DD or an ISO datetime; return a naive UTC datetime."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Invalid date/time: {value}")
+        parsed = datetime.combine(day, time.max if end_of_day else time.min)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(dt_timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class Command(BaseCommand):
+    help = "Query the audit log (active file and rotated segments) by model, action or time range."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', help="Model name, e.g. 'MainJobOperation'")
+        parser.add_argument('--action', help="Action, e.g. 'delete' or 'bulk_delete'")
+        parser.add_argument('--since', help='Start (YYYY-MM-DD or ISO datetime, UTC)')
+        parser.add_argument('--until', help='End (YYYY-MM-DD or ISO datetime, UTC)')
+        parser.add_argument('--limit', type=int, default=100, help='Maximum entries to print (default: 100, 0 = all)')
+
+    def handle(self, *args, **options):
+        since = _parse_bound(options['since']) if options['since'] else None
+        until = _parse_bound(options['until'], end_of_day=True) if options['until'] else None
+
+        count = 0
+        for entry in query_audit_log(
+            model=options['model'],
+            action=options['action'],
+            since=since,
+            until=until,
+            limit=options['limit'] or None,
+        ):
+            self.stdout.write(json.dumps(entry, ensure_ascii=False))
+            count += 1
+
+        self.stderr.write(self.style.NOTICE(f"{count} matching entries"))
@@ -1,35 +1,180 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-from django.core import management
+from django.core import serializers
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from pathlib import Path
-from datetime import datetime
 import shutil
+import time
+
+from apps.core.backups import (
+    BACKUP_FORMAT, COMPRESSION_EXTENSIONS, get_backups_dir, get_backup_models, get_watermark_field,
+    file_sha256, manifest_format, media_store_path, open_compressed, latest_manifest, write_manifest,
+)
 
 
 class Command(BaseCommand):
-    help = "Create a timestamped backup: database JSON dump and media folder copy"
+    help = (
+        "Create an incremental backup: per-model chunked, compressed NDJSON dumps of rows "
+        "changed since the last backup, plus content-addressed media files and a manifest."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Ignore previous backups and dump every row')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per dump file (default: 5000)')
+        parser.add_argument('--compression', choices=sorted(COMPRESSION_EXTENSIONS), default='gzip',
+                            help='Dump compression (zstd needs the zstandard package)')
+        parser.add_argument('--skip-media', action='store_true', help='Do not back up the media folder')
 
     def handle(self, *args, **options):
-        timestamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
-        backups_dir = Path(settings.BASE_DIR) / 'backups'
-        backups_dir.mkdir(parents=True, exist_ok=True)
+        started = time.monotonic()
+        started_at = timezone.now()
+        backup_id = started_at.strftime('%Y%m%dT%H%M%SZ')
+        compression = options['compression']
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be positive")
 
-        # 1) Dump database to JSON
-        dump_path = backups_dir / f'db_{timestamp}.json'
-        self.stdout.write(self.style.NOTICE(f"Dumping database -> {dump_path}"))
-        with open(dump_path, 'w', encoding='utf-8') as out:
-            management.call_command('dumpdata', '--natural-foreign', '--natural-primary', '--indent', '2', stdout=out)
+        parent = None if options['full'] else latest_manifest()
+        if parent and manifest_format(parent) != BACKUP_FORMAT:
+            # Incrementals can't be chained onto dumps in another format
+            self.stdout.write(f"Last backup {parent['id']} uses an older dump format; taking a full backup")
+            parent = None
+        kind = 'incremental' if parent else 'full'
 
-        # 2) Copy media directory if it exists
-        media_root = Path(settings.MEDIA_ROOT)
-        if media_root.exists():
-            media_archive = backups_dir / f'media_{timestamp}'
-            self.stdout.write(self.style.NOTICE(f"Copying media -> {media_archive}"))
-            if media_archive.exists():
-                shutil.rmtree(media_archive)
-            shutil.copytree(media_root, media_archive)
+        backup_dir = get_backups_dir() / backup_id
+        if backup_dir.exists():
+            raise CommandError(f"Backup {backup_id} already exists")
+        backup_dir.mkdir(parents=True)
+
+        self.stdout.write(self.style.NOTICE(
+            f"Starting {kind} backup {backup_id}" + (f" (parent {parent['id']})" if parent else '')
+        ))
+
+        manifest = {
+            'id': backup_id,
+            'format': BACKUP_FORMAT,
+            'kind': kind,
+            'parent': parent['id'] if parent else None,
+            'created_at': started_at.isoformat(),
+            'compression': compression,
+            'models': {},
+            'media': {},
+        }
+
+        try:
+            total_rows = 0
+            for model in get_backup_models():
+                entry = self._dump_model(model, backup_dir, parent, started_at, chunk_size, compression)
+                manifest['models'][model._meta.label_lower] = entry
+                total_rows += entry['rows']
+
+            if not options['skip_media']:
+                manifest['media'] = self._backup_media(parent)
+        except Exception:
+            # Never leave a manifest-less partial backup behind
+            shutil.rmtree(backup_dir, ignore_errors=True)
+            raise
+
+        write_manifest(backup_id, manifest)
+
+        size = sum(p.stat().st_size for p in backup_dir.iterdir())
+        self.stdout.write(self.style.SUCCESS(
+            f"Backup {backup_id} completed: {total_rows} rows, {len(manifest['media'])} media files, "
+            f"{size / 1024:.1f} KiB in {time.monotonic() - started:.1f}s"
+        ))
 
-        self.stdout.write(self.style.SUCCESS("Backup completed."))
+    def _dump_model(self, model, backup_dir, parent, started_at, chunk_size, compression):
+        label = model._meta.label_lower
+        watermark_field = get_watermark_field(model)
+        queryset = model._default_manager.order_by('pk')
+        incremental = False
+
+        previous = (parent or {}).get('models', {}).get(label)
+        watermark = None
+        if watermark_field == 'pk':
+            # Insert-only: the highest key now, so rows inserted during the dump wait for the next one
+            watermark = queryset.aggregate(last=Max('pk'))['last'] or 0
+            queryset = queryset.filter(pk__lte=watermark)
+            if previous and previous.get('watermark_field') == 'pk' and previous.get('watermark') is not None:
+                queryset = queryset.filter(pk__gt=previous['watermark'])
+                incremental = True
+        elif watermark_field:
+            watermark = started_at.isoformat()
+            queryset = queryset.filter(**{f'{watermark_field}__lte': started_at})
+            if previous and previous.get('watermark') and previous.get('watermark_field') == watermark_field:
+                queryset = queryset.filter(**{f'{watermark_field}__gt': parse_datetime(previous['watermark'])})
+                incremental = True
+
+        files = []
+        rows = 0
+        extension = COMPRESSION_EXTENSIONS[compression]
+        for chunk_index, chunk in enumerate(self._chunks(queryset.iterator(chunk_size=chunk_size), chunk_size)):
+            file_name = f'{label}.{chunk_index:04d}.jsonl{extension}'
+            with open_compressed(backup_dir / file_name, 'w', compression) as out:
+                serializers.serialize('jsonl', chunk, stream=out)
+            files.append(file_name)
+            rows += len(chunk)
+
+        entry = {
+            'files': files,
+            'rows': rows,
+            'incremental': incremental,
+            'watermark_field': watermark_field,
+            'watermark': watermark,
+            'pk_file': None,
+        }
+
+        # Incremental dumps can't see deletions, so record the live key set for restore
+        if incremental:
+            pk_file = f'{label}.pks{extension}'
+            with open_compressed(backup_dir / pk_file, 'w', compression) as out:
+                for pk in model._default_manager.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=chunk_size):
+                    out.write(f'{pk}\n')
+            entry['pk_file'] = pk_file
+
+        if rows:
+            self.stdout.write(f"  {label}: {rows} rows in {len(files)} file(s)")
+        return entry
+
+    @staticmethod
+    def _chunks(iterator, size):
+        chunk = []
+        for obj in iterator:
+            chunk.append(obj)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _backup_media(self, parent):
+        """Store each media file once under its sha256; unchanged files aren't re-hashed."""
+        media_root = Path(settings.MEDIA_ROOT)
+        if not media_root.exists():
+            return {}
 
+        previous_media = (parent or {}).get('media', {})
+        media = {}
+        copied = 0
+        for path in media_root.rglob('*'):
+            if not path.is_file():
+                continue
+            rel_path = path.relative_to(media_root).as_posix()
+            stat = path.stat()
+            known = previous_media.get(rel_path)
+            if known and known['size'] == stat.st_size and known['mtime'] == stat.st_mtime:
+                digest = known['sha256']
+            else:
+                digest = file_sha256(path)
 
+            stored = media_store_path(digest)
+            if not stored.exists():
+                stored.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(path, stored)
+                copied += 1
+            media[rel_path] = {'sha256': digest, 'size': stat.st_size, 'mtime': stat.st_mtime}
 
+        self.stdout.write(f"  media: {len(media)} files ({copied} new in store)")
+        return media
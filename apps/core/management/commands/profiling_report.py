@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+import json
+import time
+
+from apps.core.profiling import clear_samples, load_samples, prune_snapshots, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        "Per-endpoint latency/SQL report from ProfilingMiddleware samples (all workers). "
+        "Snapshots older than PROFILING_SNAPSHOT_MAX_AGE are deleted first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--minutes', type=int, help='Only samples from the last N minutes')
+        parser.add_argument('--prefix', help="Only paths starting with this, e.g. '/api/reports/'")
+        parser.add_argument(
+            '--sort', default='p95_ms',
+            choices=['p50_ms', 'p95_ms', 'p95_sql_ms', 'p95_queries', 'max_duplicate_queries', 'count'],
+        )
+        parser.add_argument('--limit', type=int, default=20, help='Endpoints to show (default: 20, 0 = all)')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+        parser.add_argument('--reset', action='store_true', help='Delete all recorded samples and exit')
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            clear_samples()
+            self.stdout.write(self.style.SUCCESS("Profiling samples cleared"))
+            return
+
+        pruned = prune_snapshots()
+        if pruned:
+            self.stderr.write(self.style.NOTICE(f"Deleted {pruned} snapshots of exited workers"))
+
+        since = time.time() - options['minutes'] * 60 if options['minutes'] else None
+        samples = load_samples(since=since)
+        report = summarize(samples, sort=options['sort'], prefix=options['prefix'], limit=options['limit'] or None)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"{'endpoint':<60} {'n':>6} {'p50ms':>8} {'p95ms':>8} {'p95sql':>8} {'p95q':>6} {'dupq':>6} {'p50kb':>7}"
+        )
+        for row in report:
+            size = f"{row['p50_response_bytes'] / 1024:.1f}" if row['p50_response_bytes'] is not None else '-'
+            self.stdout.write(
+                f"{row['endpoint'][:60]:<60} {row['count']:>6} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+                f"{row['p95_sql_ms']:>8.1f} {row['p95_queries']:>6} {row['max_duplicate_queries']:>6} {size:>7}"
+            )
+            if row['top_duplicate'] and row['max_duplicate_queries']:
+                self.stdout.write(self.style.NOTICE(
+                    f"    repeated x{row['top_duplicate']['count']}: {row['top_duplicate']['sql'][:120]}"
+                ))
+        self.stderr.write(self.style.NOTICE(f"{len(samples)} samples, {len(report)} endpoints"))
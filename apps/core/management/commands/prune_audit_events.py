@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from datetime import timedelta
+import gzip
+import json
+
+from apps.core.backups import get_backups_dir
+from apps.core.models import AuditEvent
+from apps.core.pruning import delete_in_batches
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete AuditEvent rows older than the retention period, optionally archiving them "
+        "first to a gzip NDJSON file under backups/audit/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'AUDIT_EVENT_RETENTION_DAYS', 365),
+                            help='Keep events newer than this many days')
+        parser.add_argument('--archive', action='store_true', help='Write pruned events to an archive file first')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows deleted per query (default: 5000)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many events would be pruned')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError("--days must not be negative")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        expired = AuditEvent.objects.filter(ts__lt=cutoff)
+        total = expired.count()
+        self.stdout.write(self.style.NOTICE(f"{total} audit events older than {cutoff:%Y-%m-%d %H:%M}"))
+        if options['dry_run'] or not total:
+            return
+
+        if options['archive']:
+            self._archive(expired, cutoff, options['batch_size'])
+
+        deleted = delete_in_batches(expired, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted[AuditEvent._meta.label]} audit events"))
+
+    def _archive(self, queryset, cutoff, batch_size):
+        archive_dir = get_backups_dir() / 'audit'
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        path = archive_dir / f"archive-{cutoff:%Y%m%dT%H%M%S}.jsonl.gz"
+        fields = ['id', 'ts', 'model', 'action', 'user_id', 'username', 'payload']
+        count = 0
+        with gzip.open(path, 'wt', encoding='utf-8') as out:
+            for row in queryset.order_by('pk').values(*fields).iterator(chunk_size=batch_size):
+                out.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+                count += 1
+        self.stdout.write(f"  archived {count} events to {path}")
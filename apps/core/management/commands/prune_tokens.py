@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from apps.core.pruning import delete_in_batches
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired refresh tokens (OutstandingToken rows and their BlacklistedToken "
+        "entries) in batches. Schedule it daily; expired tokens are rejected without them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Tokens deleted per query (default: 5000)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many tokens would be pruned')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        expired = OutstandingToken.objects.filter(expires_at__lte=timezone.now())
+        total = expired.count()
+        self.stdout.write(self.style.NOTICE(f"{total} expired refresh tokens"))
+        if options['dry_run'] or not total:
+            return
+
+        deleted = delete_in_batches(expired, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Pruned {deleted[OutstandingToken._meta.label]} expired refresh tokens "
+            f"({deleted[BlacklistedToken._meta.label]} blacklist entries)"
+        ))
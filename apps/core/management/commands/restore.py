@@ -1,27 +1,226 @@
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-from django.core import management
+from django.core import management, serializers
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import SET_NULL
+from contextlib import contextmanager
 from pathlib import Path
 import shutil
+import time
+
+from apps.core.backups import (
+    NATURAL_KEY_FORMAT, get_backups_dir, get_backup_models, list_manifests, manifest_format,
+    media_store_path, open_compressed, resolve_chain,
+)
 
 
 class Command(BaseCommand):
-    help = "Restore database from a given JSON dump file and optionally restore media directory."
+    help = (
+        "Restore the database (and optionally media) from an incremental backup chain, "
+        "streaming the chunked dumps and inserting per model in batches. "
+        "A legacy dumpdata JSON file can still be restored with --db."
+    )
 
     def add_arguments(self, parser):
-        parser.add_argument('--db', required=True, help='Path to a dumpdata JSON file')
-        parser.add_argument('--media', help='Path to a media directory to restore')
+        parser.add_argument('--backup', help='Backup id to restore to (default: latest)')
+        parser.add_argument('--list', action='store_true', help='List available backups and exit')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk insert (default: 1000)')
+        parser.add_argument('--restore-media', action='store_true', help='Restore media files recorded in the backup')
+        parser.add_argument('--no-input', action='store_true', help='Do not prompt before flushing the database')
+        parser.add_argument('--db', help='Path to a legacy dumpdata JSON file')
+        parser.add_argument('--media', help='Path to a legacy media directory to restore')
 
     def handle(self, *args, **options):
+        if options['list']:
+            return self._list_backups()
+
+        if options['db']:
+            return self._restore_legacy(options)
+
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        manifests = list_manifests()
+        if not manifests:
+            raise CommandError(f"No backups found in {get_backups_dir()}")
+        backup_id = options['backup'] or manifests[-1]['id']
+        try:
+            chain = resolve_chain(backup_id)
+        except (FileNotFoundError, ValueError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.NOTICE(
+            f"Restoring to backup {backup_id} from a chain of {len(chain)} backup(s): "
+            + ' <- '.join(m['id'] for m in chain)
+        ))
+
+        if not options['no_input']:
+            confirm = input("This will erase ALL current data. Type 'yes' to continue: ")
+            if confirm != 'yes':
+                raise CommandError("Restore cancelled.")
+
+        started = time.monotonic()
+        models = get_backup_models()
+        # Format 1 dumps refer to content types and permissions by natural key, so let
+        # post_migrate recreate them; format 2 dumps contain them
+        natural_keys = manifest_format(chain[0]) == NATURAL_KEY_FORMAT
+
+        total_rows = 0
+        # The flush is part of the transaction: a restore that fails keeps the current data
+        with transaction.atomic():
+            management.call_command('flush', '--noinput', inhibit_post_migrate=not natural_keys, verbosity=0)
+            with connection.constraint_checks_disabled():
+                for model in models:
+                    total_rows += self._restore_model(model, chain, options['batch_size'])
+                for model in models:
+                    self._clear_dangling_references(model)
+            # Constraints were deferred while loading; verify them once at the end
+            connection.check_constraints(table_names=[m._meta.db_table for m in models])
+
+            sequence_sql = connection.ops.sequence_reset_sql(no_style(), models)
+            if sequence_sql:
+                with connection.cursor() as cursor:
+                    for sql in sequence_sql:
+                        cursor.execute(sql)
+
+        # bulk_create skips the signals that maintain the search index
+        from apps.reports.search import rebuild_search_index
+        indexed = rebuild_search_index(batch_size=options['batch_size'])
+        self.stdout.write(f"  search index: {indexed} documents")
+
+        if options['restore_media']:
+            self._restore_media(chain[0])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Restore completed: {total_rows} rows in {elapsed:.1f}s "
+            f"({total_rows / elapsed if elapsed else total_rows:.0f} rows/s)"
+        ))
+
+    def _restore_model(self, model, chain, batch_size):
+        """Stream newest-first through the chain, keeping the latest version of each row."""
+        label = model._meta.label_lower
+        target_entry = chain[0]['models'].get(label)
+        if target_entry is None:
+            return 0
+
+        live_pks = None
+        if target_entry.get('pk_file'):
+            with open_compressed(get_backups_dir() / chain[0]['id'] / target_entry['pk_file'], 'r',
+                                 chain[0]['compression']) as f:
+                live_pks = {line.strip() for line in f if line.strip()}
+
+        started = time.monotonic()
+        seen = set()
+        batch = []
+        m2m_rows = []
+        restored = 0
+        for manifest in chain:
+            entry = manifest['models'].get(label)
+            if entry is None:
+                continue
+            for file_name in entry['files']:
+                path = get_backups_dir() / manifest['id'] / file_name
+                with open_compressed(path, 'r', manifest['compression']) as stream:
+                    for deserialized in serializers.deserialize('jsonl', stream, ignorenonexistent=True):
+                        obj = deserialized.object
+                        key = str(obj.pk)
+                        if key in seen or (live_pks is not None and key not in live_pks):
+                            continue
+                        seen.add(key)
+                        batch.append(obj)
+                        if deserialized.m2m_data:
+                            m2m_rows.append((obj.pk, deserialized.m2m_data))
+                        if len(batch) >= batch_size:
+                            restored += self._flush_batch(model, batch, m2m_rows)
+                            batch, m2m_rows = [], []
+            # A non-incremental entry is a complete snapshot; older backups are irrelevant
+            if not entry.get('incremental'):
+                break
+
+        if batch:
+            restored += self._flush_batch(model, batch, m2m_rows)
+
+        if restored:
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"  {label}: {restored} rows in {elapsed:.2f}s "
+                f"({restored / elapsed if elapsed else restored:.0f} rows/s)"
+            )
+        return restored
+
+    @staticmethod
+    def _clear_dangling_references(model):
+        """Null SET_NULL foreign keys to rows that weren't restored.
+
+        Rows dumped by primary key aren't dumped again when a deletion nulls
+        their reference (an OutstandingToken whose user was deleted), so the
+        cascade is re-applied here.
+        """
+        for field in model._meta.concrete_fields:
+            if not field.is_relation or field.remote_field.on_delete is not SET_NULL:
+                continue
+            target = field.remote_field.model
+            model._base_manager.filter(**{f'{field.attname}__isnull': False}).exclude(
+                **{f'{field.attname}__in': target._base_manager.values(field.target_field.attname)}
+            ).update(**{field.attname: None})
+
+    @staticmethod
+    def _flush_batch(model, batch, m2m_rows):
+        with _preserve_timestamps(model):
+            model._base_manager.bulk_create(batch)
+
+        for field in model._meta.many_to_many:
+            through = field.remote_field.through
+            if not through._meta.auto_created:
+                # Explicit through models are dumped as regular models
+                continue
+            source = f'{field.m2m_field_name()}_id'
+            target = f'{field.m2m_reverse_field_name()}_id'
+            links = [
+                through(**{source: pk, target: related_pk})
+                for pk, m2m_data in m2m_rows
+                for related_pk in m2m_data.get(field.name, [])
+            ]
+            if links:
+                through._base_manager.bulk_create(links)
+        return len(batch)
+
+    def _restore_media(self, manifest):
+        media_dest = Path(settings.MEDIA_ROOT)
+        self.stdout.write(self.style.NOTICE(f"Restoring {len(manifest['media'])} media files -> {media_dest}"))
+        if media_dest.exists():
+            shutil.rmtree(media_dest)
+        for rel_path, info in manifest['media'].items():
+            stored = media_store_path(info['sha256'])
+            if not stored.exists():
+                raise CommandError(f"Media file {rel_path} ({info['sha256']}) is missing from the store")
+            dest = media_dest / rel_path
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(stored, dest)
+
+    def _list_backups(self):
+        manifests = list_manifests()
+        if not manifests:
+            self.stdout.write("No backups found.")
+            return
+        for manifest in manifests:
+            rows = sum(entry['rows'] for entry in manifest['models'].values())
+            parent = f" parent={manifest['parent']}" if manifest.get('parent') else ''
+            self.stdout.write(f"{manifest['id']}  {manifest['kind']:<11} {rows:>8} rows{parent}")
+
+    def _restore_legacy(self, options):
         dump_path = Path(options['db'])
         if not dump_path.exists():
             raise CommandError(f"Dump file not found: {dump_path}")
 
-        self.stdout.write(self.style.NOTICE(f"Flushing database (keep auth)?"))
-        management.call_command('flush', '--noinput')
+        with transaction.atomic():
+            self.stdout.write(self.style.NOTICE("Flushing database"))
+            management.call_command('flush', '--noinput')
 
-        self.stdout.write(self.style.NOTICE(f"Loading data from {dump_path}"))
-        management.call_command('loaddata', str(dump_path))
+            self.stdout.write(self.style.NOTICE(f"Loading data from {dump_path}"))
+            management.call_command('loaddata', str(dump_path))
 
         media_src = options.get('media')
         if media_src:
@@ -36,4 +235,17 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS("Restore completed."))
 
 
-
+@contextmanager
+def _preserve_timestamps(model):
+    """Stop auto_now/auto_now_add from overwriting restored timestamps during bulk_create."""
+    fields = [
+        (f, f.auto_now, f.auto_now_add) for f in model._meta.concrete_fields
+        if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)
+    ]
+    for field, _, _ in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in fields:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
@@ -1,3 +1,47 @@
+import random
+import re
+import time
+import uuid
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signals import request_finished
+from django.db import connections
+
+from apps.core.profiling import QueryRecorder, get_profile_store
+from apps.core.structured_logging import request_id_var
+
+REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+
+class RequestIdMiddleware:
+    """Tag the request (and every log record it produces) with an id.
+
+    A well-formed incoming ``X-Request-ID`` (e.g. from nginx) is reused,
+    otherwise a new one is generated; it is echoed back on the response.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # django.request logs 4xx/5xx after the middleware chain returns, so keep
+        # the id until the response is closed
+        request_finished.connect(_clear_request_id, dispatch_uid='clear_request_id')
+
+    def __call__(self, request):
+        request_id = request.headers.get('X-Request-ID', '')
+        if not REQUEST_ID_RE.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        request_id_var.set(request_id)
+        response = self.get_response(request)
+        response['X-Request-ID'] = request_id
+        return response
+
+
+def _clear_request_id(sender, **kwargs):
+    request_id_var.set(None)
+
+
 class SecurityHeadersMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -8,4 +52,49 @@ class SecurityHeadersMiddleware:
         response['X-Frame-Options'] = 'DENY'
         response['X-XSS-Protection'] = '1; mode=block'
         response['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
-        return response 
\ No newline at end of file
+        return response
+
+
+class ProfilingMiddleware:
+    """Record SQL count/time, duplicate queries, Python time and response size per request.
+
+    Enabled with ``PROFILING_ENABLED``; ``PROFILING_SAMPLE_RATE`` profiles a
+    fraction of requests. See apps.core.profiling for reporting.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 1.0)
+
+    def __call__(self, request):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        duplicate_queries, top_duplicate = recorder.duplicates()
+        get_profile_store().add({
+            'ts': time.time(),
+            'endpoint': f"{request.method} {(match.view_name or match.route) if match else '<unresolved>'}",
+            'view': match._func_path if match else None,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'sql_ms': round(recorder.duration * 1000, 2),
+            'python_ms': round((duration - recorder.duration) * 1000, 2),
+            'queries': recorder.count,
+            'duplicate_queries': duplicate_queries,
+            'top_duplicate': top_duplicate,
+            # Streaming responses (exports, SSE) have no length up front
+            'response_bytes': None if response.streaming else len(response.content),
+        })
+        return response
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ts', models.DateTimeField(help_text='When the change happened (UTC)')),
+                ('model', models.CharField(help_text="Model name, e.g. 'MainJobOperation'", max_length=100)),
+                ('action', models.CharField(help_text="Action, e.g. 'delete', 'bulk_delete', 'update'", max_length=50)),
+                ('username', models.CharField(blank=True, default='', help_text='Username at the time of the event', max_length=150)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='audit_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Audit Event',
+                'verbose_name_plural': 'Audit Events',
+                'db_table': 'audit_events',
+                'ordering': ['-ts', '-id'],
+                'indexes': [models.Index(fields=['model', 'action', 'ts'], name='audit_model_action_ts_idx'), models.Index(fields=['user', 'ts'], name='audit_user_ts_idx'), models.Index(fields=['ts'], name='audit_ts_idx')],
+            },
+        ),
+    ]
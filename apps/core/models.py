@@ -0,0 +1,43 @@
+from django.db import models
+from django.contrib.auth.models import User
+from django.utils.dateparse import parse_datetime
+
+
+class AuditEvent(models.Model):
+    """Queryable copy of every audit log entry, written in batches by the audit writer."""
+    ts = models.DateTimeField(help_text="When the change happened (UTC)")
+    model = models.CharField(max_length=100, help_text="Model name, e.g. 'MainJobOperation'")
+    action = models.CharField(max_length=50, help_text="Action, e.g. 'delete', 'bulk_delete', 'update'")
+    # No DB constraint: events must outlive (and may describe the deletion of) their user
+    user = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False,
+        null=True, blank=True, related_name='audit_events'
+    )
+    username = models.CharField(max_length=150, blank=True, default='', help_text="Username at the time of the event")
+    payload = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        db_table = 'audit_events'
+        verbose_name = 'Audit Event'
+        verbose_name_plural = 'Audit Events'
+        ordering = ['-ts', '-id']
+        indexes = [
+            models.Index(fields=['model', 'action', 'ts'], name='audit_model_action_ts_idx'),
+            models.Index(fields=['user', 'ts'], name='audit_user_ts_idx'),
+            models.Index(fields=['ts'], name='audit_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ts:%Y-%m-%d %H:%M:%S} {self.model} {self.action} by {self.username or 'system'}"
+
+    @classmethod
+    def from_entry(cls, entry):
+        """Build an unsaved event from an audit log entry dict."""
+        return cls(
+            ts=parse_datetime(entry['ts'].replace('Z', '+00:00')),
+            model=entry.get('model') or '',
+            action=entry.get('action') or '',
+            user_id=entry.get('user_id'),
+            username=entry.get('username') or '',
+            payload=entry.get('payload') if entry.get('payload') is not None else {},
+        )
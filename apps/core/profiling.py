@@ -0,0 +1,209 @@
+"""Per-request cost profiling (opt-in via ``PROFILING_ENABLED``).
+
+:class:`apps.core.middleware.ProfilingMiddleware` records one sample per
+request: SQL query count, SQL time, duplicate queries, Python time and
+response size. Samples go into a per-process ring buffer. Each worker
+periodically snapshots its buffer to ``logs/profiling/<pid>.json`` so the
+staff API and the ``profiling_report`` command can aggregate samples from
+every worker. Snapshots left by workers that have since exited are deleted
+once they are ``PROFILING_SNAPSHOT_MAX_AGE`` seconds old (see
+:func:`prune_snapshots`).
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from django.conf import settings
+
+SNAPSHOT_SUFFIX = '.json'
+
+
+def _profiling_dir() -> str:
+    path = os.path.join(settings.BASE_DIR, 'logs', 'profiling')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class QueryRecorder:
+    """``execute_wrapper`` hook counting and timing every SQL statement."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            # Same SQL text with different parameters is the N+1 signature
+            self.statements[sql] += 1
+
+    def duplicates(self):
+        """(number of repeated executions, most repeated statement or None)"""
+        repeated = self.count - len(self.statements)
+        if not repeated:
+            return 0, None
+        sql, times = self.statements.most_common(1)[0]
+        return repeated, {'sql': sql[:300], 'count': times}
+
+
+class ProfileStore:
+    """Thread-safe ring buffer of request samples for this process."""
+
+    def __init__(self):
+        self.samples = deque(maxlen=getattr(settings, 'PROFILING_BUFFER_SIZE', 5000))
+        self.flush_interval = getattr(settings, 'PROFILING_FLUSH_INTERVAL', 10)
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def add(self, sample):
+        with self._lock:
+            self.samples.append(sample)
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+            if due:
+                self._last_flush = time.monotonic()
+                snapshot = list(self.samples)
+        if due:
+            self._write_snapshot(snapshot)
+
+    def flush(self):
+        with self._lock:
+            self._last_flush = time.monotonic()
+            snapshot = list(self.samples)
+        self._write_snapshot(snapshot)
+
+    def clear(self):
+        with self._lock:
+            self.samples.clear()
+
+    @staticmethod
+    def _write_snapshot(samples):
+        try:
+            path = os.path.join(_profiling_dir(), f'{os.getpid()}{SNAPSHOT_SUFFIX}')
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(samples, f)
+            os.replace(tmp_path, path)
+        except Exception:
+            # Profiling must never break the request it measured
+            pass
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_profile_store() -> ProfileStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ProfileStore()
+    return _store
+
+
+def load_samples(since=None):
+    """Samples from every worker's snapshot plus this process's live buffer.
+
+    ``since`` is a UNIX timestamp; older samples are skipped.
+    """
+    samples = []
+    own_snapshot = f'{os.getpid()}{SNAPSHOT_SUFFIX}'
+    directory = _profiling_dir()
+    for name in os.listdir(directory):
+        if not name.endswith(SNAPSHOT_SUFFIX) or name == own_snapshot:
+            continue
+        try:
+            with open(os.path.join(directory, name), 'r', encoding='utf-8') as f:
+                samples.extend(json.load(f))
+        except (OSError, ValueError):
+            continue
+    store = get_profile_store()
+    with store._lock:
+        samples.extend(store.samples)
+    if since is not None:
+        samples = [s for s in samples if s['ts'] >= since]
+    return samples
+
+
+def clear_samples():
+    """Drop this process's buffer and every worker snapshot."""
+    get_profile_store().clear()
+    directory = _profiling_dir()
+    for name in os.listdir(directory):
+        if name.endswith(SNAPSHOT_SUFFIX):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def prune_snapshots(max_age=None):
+    """Delete snapshots (and stray temp files) not rewritten for ``max_age`` seconds.
+
+    A live worker rewrites its snapshot every flush interval while it serves
+    requests, so old files belong to exited workers. Returns the number deleted.
+    """
+    if max_age is None:
+        max_age = getattr(settings, 'PROFILING_SNAPSHOT_MAX_AGE', 24 * 60 * 60)
+    cutoff = time.time() - max_age
+    own_snapshot = f'{os.getpid()}{SNAPSHOT_SUFFIX}'
+    directory = _profiling_dir()
+    deleted = 0
+    for name in os.listdir(directory):
+        if name == own_snapshot or not name.endswith((SNAPSHOT_SUFFIX, f'{SNAPSHOT_SUFFIX}.tmp')):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                deleted += 1
+        except OSError:
+            continue
+    return deleted
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples, sort='p95_ms', prefix=None, limit=None):
+    """Aggregate samples per endpoint ("METHOD route") with p50/p95 figures."""
+    grouped = {}
+    for sample in samples:
+        if prefix and not sample['path'].startswith(prefix):
+            continue
+        grouped.setdefault(sample['endpoint'], []).append(sample)
+
+    report = []
+    for endpoint, rows in grouped.items():
+        durations = [r['duration_ms'] for r in rows]
+        sql_times = [r['sql_ms'] for r in rows]
+        queries = [r['queries'] for r in rows]
+        sizes = [r['response_bytes'] for r in rows if r['response_bytes'] is not None]
+        worst = max(rows, key=lambda r: r['duplicate_queries'])
+        report.append({
+            'endpoint': endpoint,
+            'view': rows[-1]['view'],
+            'count': len(rows),
+            'p50_ms': _percentile(durations, 50),
+            'p95_ms': _percentile(durations, 95),
+            'p50_sql_ms': _percentile(sql_times, 50),
+            'p95_sql_ms': _percentile(sql_times, 95),
+            'p50_python_ms': _percentile([r['python_ms'] for r in rows], 50),
+            'p50_queries': _percentile(queries, 50),
+            'p95_queries': _percentile(queries, 95),
+            'max_duplicate_queries': worst['duplicate_queries'],
+            'top_duplicate': worst['top_duplicate'],
+            'p50_response_bytes': _percentile(sizes, 50) if sizes else None,
+            'errors': sum(1 for r in rows if r['status'] >= 500),
+        })
+    report.sort(key=lambda row: row[sort] or 0, reverse=True)
+    return report[:limit] if limit else report
@@ -0,0 +1,18 @@
+"""Batched deletes for the retention commands (``prune_tokens``, ``prune_audit_events``)."""
+from collections import Counter
+
+
+def delete_in_batches(queryset, batch_size):
+    """Delete ``queryset`` ``batch_size`` primary keys at a time.
+
+    Each statement stays short and uses the primary key index, so a large
+    backlog never holds a long lock. Returns rows deleted per model label,
+    cascades included.
+    """
+    model = queryset.model
+    deleted = Counter()
+    while True:
+        pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        deleted.update(model.objects.filter(pk__in=pks).delete()[1])
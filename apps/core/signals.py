@@ -0,0 +1,26 @@
+from django.contrib.auth.models import User
+from django.core.signals import request_finished
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .audit import get_audit_writer
+from .authentication import PRINCIPAL_FIELDS, invalidate_user_principals
+
+
+@receiver(post_save, sender=User)
+def invalidate_principal_on_save(sender, instance, update_fields=None, **kwargs):
+    """Drop the cached auth principal when a field it holds may have changed."""
+    # Logins only touch last_login; skip them
+    if update_fields is not None and not set(PRINCIPAL_FIELDS) & set(update_fields):
+        return
+    invalidate_user_principals([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def invalidate_principal_on_delete(sender, instance, **kwargs):
+    invalidate_user_principals([instance.pk])
+
+
+@receiver(request_finished)
+def flush_audit_rows(sender, **kwargs):
+    """On SQLite, insert the request's audit rows in one batch once the response has been sent."""
+    get_audit_writer().flush_pending_rows()
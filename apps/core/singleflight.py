@@ -0,0 +1,223 @@
+"""Single-flight execution: identical concurrent calls share one computation.
+
+``get_single_flight(name).do(key, fn, group, replay)`` runs ``fn`` once per
+``key`` at a time. Callers in the same worker that arrive while it runs wait
+for it and get the same result (or exception). Across workers on the host,
+calls in the same ``group`` (default: the key) run one at a time under an
+``flock`` on ``logs/singleflight/<name>-<group digest>.lock``, so unrelated
+groups never wait for each other.
+
+The lock file holds only digests: the key being run, and the keys completed
+in the last ``SINGLE_FLIGHT_RESULT_TTL`` seconds. A duplicate in another
+worker that waited for the lock finds its key completed and calls
+``replay()`` to rebuild the result (say, re-read what ``fn`` saved) instead
+of running ``fn`` again. Results never touch the disk. A run that raises
+isn't recorded, so its duplicates run again.
+
+A duplicate that waits longer than ``SINGLE_FLIGHT_TIMEOUT`` gets
+:class:`RequestInProgress` (409); any other call in the group gets
+:class:`RequestBusy` (503 with Retry-After). Lock files idle for longer than
+the TTL are pruned. Without ``fcntl`` (Windows development) calls are only
+shared within a worker.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class RequestInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'An identical request is still being processed, please try again shortly.'
+    default_code = 'request_in_progress'
+
+
+class RequestBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'A related request is still being processed, please try again shortly.'
+    default_code = 'request_busy'
+
+    def __init__(self, detail=None, retry_after=None):
+        super().__init__(detail)
+        # DRF's exception handler turns ``wait`` into a Retry-After header
+        self.wait = retry_after
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, name):
+        self.name = name
+        self.result_ttl = getattr(settings, 'SINGLE_FLIGHT_RESULT_TTL', 60)
+        self.timeout = getattr(settings, 'SINGLE_FLIGHT_TIMEOUT', 120)
+        self.directory = os.path.join(settings.BASE_DIR, 'logs', 'singleflight')
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._pruned_at = 0.0
+
+    def do(self, key, fn, group=None, replay=None):
+        """``(result, shared)``; ``shared`` is True when another caller's run was reused."""
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        group_digest = hashlib.sha256(group.encode()).hexdigest() if group is not None else digest
+        with self._lock:
+            call = self._calls.get(digest)
+            leader = call is None
+            if leader:
+                call = self._calls[digest] = _Call()
+
+        if not leader:
+            if not call.event.wait(self.timeout):
+                raise RequestInProgress()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result, shared = self._run(digest, group_digest, fn, replay)
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[digest]
+            call.event.set()
+        return call.result, shared
+
+    def _run(self, digest, group_digest, fn, replay):
+        if fcntl is None:
+            return fn(), False
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{self.name}-{group_digest[:32]}.lock')
+        arrived = time.time()
+        lock_file = self._acquire(path, digest)
+        try:
+            done = self._completed(lock_file)
+            if replay is not None and done.get(digest, 0) >= arrived:
+                logger.info("Replaying the result of an identical request from another worker", extra={'flight': self.name})
+                return replay(), True
+            self._write(lock_file, digest, done)
+            try:
+                result = fn()
+            except BaseException:
+                self._write(lock_file, None, done)
+                raise
+            done[digest] = time.time()
+            self._write(lock_file, None, done)
+            return result, False
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            lock_file.close()
+            self._prune()
+
+    def _acquire(self, path, digest):
+        """Open and lock ``path``, retrying if it was pruned while we waited."""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            lock_file = open(path, 'a+')
+            try:
+                while True:
+                    try:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except OSError:
+                        if time.monotonic() >= deadline:
+                            raise self._busy(path, digest)
+                        time.sleep(self.POLL_INTERVAL)
+                if os.fstat(lock_file.fileno()).st_ino == os.stat(path).st_ino:
+                    return lock_file
+            except FileNotFoundError:
+                pass
+            except BaseException:
+                lock_file.close()
+                raise
+            lock_file.close()
+
+    def _busy(self, path, digest):
+        try:
+            with open(path) as f:
+                running = json.load(f).get('running')
+        except (OSError, ValueError, AttributeError):
+            running = None
+        if running == digest:
+            return RequestInProgress()
+        return RequestBusy(retry_after=max(1, round(self.timeout / 4)))
+
+    def _completed(self, lock_file):
+        """``{key digest: finished at}`` for runs completed within the TTL."""
+        lock_file.seek(0)
+        try:
+            done = json.load(lock_file).get('done', {})
+        except (ValueError, AttributeError):
+            done = {}
+        cutoff = time.time() - self.result_ttl
+        return {digest: at for digest, at in done.items() if isinstance(at, (int, float)) and at >= cutoff}
+
+    @staticmethod
+    def _write(lock_file, running, done):
+        lock_file.seek(0)
+        lock_file.truncate()
+        json.dump({'running': running, 'done': done}, lock_file)
+        lock_file.flush()
+
+    def _prune(self):
+        """Delete lock files idle for longer than the TTL, at most once per TTL per worker."""
+        now = time.time()
+        if now - self._pruned_at < self.result_ttl:
+            return
+        self._pruned_at = now
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return
+        for entry in entries:
+            if not entry.name.startswith(f'{self.name}-') or not entry.name.endswith('.lock'):
+                continue
+            try:
+                if entry.stat().st_mtime >= now - self.result_ttl:
+                    continue
+                with open(entry.path, 'a+') as lock_file:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    # Unlink only the file we locked; waiters on it re-open the path
+                    if os.fstat(lock_file.fileno()).st_ino == os.stat(entry.path).st_ino:
+                        os.unlink(entry.path)
+            except OSError:
+                continue
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def get_single_flight(name) -> SingleFlight:
+    flight = _flights.get(name)
+    if flight is None:
+        with _flights_lock:
+            flight = _flights.get(name)
+            if flight is None:
+                flight = _flights[name] = SingleFlight(name)
+    return flight
+
+
+def request_key(*parts):
+    """Stable key from JSON-serializable request parts (user, inputs, ...)."""
+    return json.dumps(parts, sort_keys=True, cls=DjangoJSONEncoder)
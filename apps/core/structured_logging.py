@@ -0,0 +1,131 @@
+"""Structured, non-blocking logging.
+
+- :class:`JSONFormatter` writes one JSON object per record.
+- :class:`AsyncHandler` formats on the calling thread and hands the record to
+  a ``QueueListener`` thread that does the actual I/O.
+- :class:`RequestIdFilter` stamps every record with the id set by
+  ``RequestIdMiddleware`` so one request's lines can be correlated.
+- :class:`PayloadSamplingFilter` keeps only a fraction of the records that
+  carry a bulky ``payload`` (``logger.debug(..., extra={'payload': data})``).
+
+This module is imported while settings are configured, so it must not
+import Django models.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+request_id_var = ContextVar('request_id', default=None)
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class PayloadSamplingFilter(logging.Filter):
+    """Pass only ``rate`` of the records that carry a ``payload`` extra."""
+
+    def __init__(self, rate=0.01):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if getattr(record, 'payload', None) is None:
+            return True
+        return random.random() < self.rate
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line; ``extra`` fields become top-level keys."""
+
+    def __init__(self, max_field_chars=2000, **kwargs):
+        super().__init__(**kwargs)
+        self.max_field_chars = max_field_chars
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = self._truncate(value)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+    def _truncate(self, value):
+        if isinstance(value, (str, int, float, bool)) or value is None:
+            if isinstance(value, str) and len(value) > self.max_field_chars:
+                return value[:self.max_field_chars] + '…'
+            return value
+        encoded = json.dumps(value, ensure_ascii=False, default=str)
+        if len(encoded) > self.max_field_chars:
+            return encoded[:self.max_field_chars] + '…'
+        return value
+
+
+class AsyncHandler(QueueHandler):
+    """Formats records on the caller's thread and writes them from a listener thread.
+
+    When the queue is full new records are dropped (and counted) rather than
+    blocking the request.
+    """
+
+    def __init__(self, target, queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.target = target
+        self.dropped = 0
+        self._pid = None
+        self.listener = None
+        self._start_listener()
+        atexit.register(self.close)
+
+    def _start_listener(self):
+        self._pid = os.getpid()
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def enqueue(self, record):
+        # The listener thread doesn't survive a fork (gunicorn --preload)
+        if self._pid != os.getpid():
+            self._start_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+        self.target.close()
+        super().close()
+
+
+def async_file_handler(filename, queue_size=10000):
+    """dictConfig factory: FileHandler behind a queue."""
+    return AsyncHandler(logging.FileHandler(filename, encoding='utf-8', delay=True), queue_size=queue_size)
+
+
+def async_stream_handler(queue_size=10000):
+    """dictConfig factory: stderr StreamHandler behind a queue."""
+    return AsyncHandler(logging.StreamHandler(), queue_size=queue_size)
@@ -0,0 +1,591 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from apps.admin_dashboard.models import TokenUsage, TokenUsageDaily
+from apps.reports.models import MainJob, MainJobOperation, WeeklyReport
+from billings.models import UserBalance
+from .audit import log_change
+from .authentication import PRINCIPAL_CACHE_KEY, CustomJWTAuthentication
+from .backups import get_backups_dir, get_watermark_field, latest_manifest, open_compressed
+from .llm_admission import AdmissionController, LLMUnavailable
+from .models import AuditEvent
+from .profiling import QueryRecorder, get_profile_store, summarize
+from .token_blacklist import BlacklistIndex, IndexedRefreshToken
+from .singleflight import RequestBusy, RequestInProgress, SingleFlight
+from .throttling import AIWeeklyReportThrottle, LoginIPThrottle, LoginUserThrottle
+
+
+class SingleFlightTests(SimpleTestCase):
+
+    def setUp(self):
+        base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, base_dir)
+        overrides = override_settings(BASE_DIR=base_dir, SINGLE_FLIGHT_TIMEOUT=0.5, SINGLE_FLIGHT_RESULT_TTL=60)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.directory = os.path.join(base_dir, 'logs', 'singleflight')
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = []
+
+    def blocking(self, result='enhanced', error=None):
+        def fn():
+            self.calls.append(result)
+            self.started.set()
+            self.release.wait(5)
+            if error:
+                raise error
+            return result
+        return fn
+
+    def in_thread(self, flight, *args, **kwargs):
+        """Run ``flight.do`` in a thread; returns a dict that gets its result or error."""
+        outcome = {}
+
+        def run():
+            try:
+                outcome['result'] = flight.do(*args, **kwargs)
+            except Exception as exc:
+                outcome['error'] = exc
+        thread = threading.Thread(target=run)
+        thread.start()
+        outcome['thread'] = thread
+        return outcome
+
+    def test_identical_calls_in_a_worker_share_one_run(self):
+        flight = SingleFlight('test')
+        leader = self.in_thread(flight, 'key', self.blocking())
+        self.started.wait(5)
+        follower = self.in_thread(flight, 'key', self.blocking('second'))
+        time.sleep(0.1)
+        self.release.set()
+        leader['thread'].join()
+        follower['thread'].join()
+
+        self.assertEqual(self.calls, ['enhanced'])
+        self.assertEqual(leader['result'], ('enhanced', False))
+        self.assertEqual(follower['result'], ('enhanced', True))
+
+    def test_duplicate_in_another_worker_replays_instead_of_running(self):
+        leader = self.in_thread(SingleFlight('test'), 'key', self.blocking(), replay=lambda: 'replayed')
+        self.started.wait(5)
+        # A second instance stands in for another worker: only the lock file is shared
+        follower = self.in_thread(SingleFlight('test'), 'key', self.blocking('second'), replay=lambda: 'replayed')
+        time.sleep(0.1)
+        self.release.set()
+        leader['thread'].join()
+        follower['thread'].join()
+
+        self.assertEqual(self.calls, ['enhanced'])
+        self.assertEqual(follower['result'], ('replayed', True))
+
+    def test_failed_run_is_not_replayed(self):
+        leader = self.in_thread(SingleFlight('test'), 'key', self.blocking(error=ValueError('boom')),
+                                replay=lambda: 'replayed')
+        self.started.wait(5)
+        follower = self.in_thread(SingleFlight('test'), 'key', lambda: 'ran again', replay=lambda: 'replayed')
+        time.sleep(0.1)
+        self.release.set()
+        leader['thread'].join()
+        follower['thread'].join()
+
+        self.assertIsInstance(leader['error'], ValueError)
+        self.assertEqual(follower['result'], ('ran again', False))
+
+    def test_unrelated_groups_do_not_wait_for_each_other(self):
+        leader = self.in_thread(SingleFlight('test'), 'a', self.blocking(), group='user-1')
+        self.started.wait(5)
+        try:
+            self.assertEqual(SingleFlight('test').do('b', lambda: 'other', group='user-2'), ('other', False))
+        finally:
+            self.release.set()
+            leader['thread'].join()
+
+    def test_waiting_too_long_is_409_only_for_duplicates(self):
+        leader = self.in_thread(SingleFlight('test'), 'a', self.blocking(), group='week-1')
+        self.started.wait(5)
+        try:
+            with self.assertRaises(RequestInProgress):
+                SingleFlight('test').do('a', lambda: 'duplicate', group='week-1')
+            with self.assertRaises(RequestBusy) as busy:
+                SingleFlight('test').do('b', lambda: 'different inputs', group='week-1')
+            self.assertEqual(busy.exception.status_code, 503)
+            self.assertIsNotNone(busy.exception.wait)
+        finally:
+            self.release.set()
+            leader['thread'].join()
+
+    def test_lock_files_hold_no_results(self):
+        SingleFlight('test').do('key', lambda: 'the report body')
+        for name in os.listdir(self.directory):
+            with open(os.path.join(self.directory, name)) as f:
+                self.assertNotIn('report body', f.read())
+
+    def test_idle_lock_files_are_pruned(self):
+        os.makedirs(self.directory)
+        stale = os.path.join(self.directory, 'test-stale.lock')
+        open(stale, 'w').close()
+        os.utime(stale, (time.time() - 3600, time.time() - 3600))
+
+        SingleFlight('test').do('key', lambda: 'ok')
+
+        self.assertFalse(os.path.exists(stale))
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+
+@mock.patch.object(LoginIPThrottle, 'THROTTLE_RATES', {'login_ip': '2/min', 'login_user': '2/min'})
+class TokenBucketTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+
+    def allowed(self, throttle_class, ip='10.0.0.1', username='student'):
+        throttle = throttle_class()
+        throttle.timer = lambda: self.now
+        request = mock.Mock(META={'REMOTE_ADDR': ip}, data={'username': username})
+        return throttle.allow_request(request, None), throttle.wait()
+
+    def test_burst_then_refill_at_the_rate(self):
+        self.assertEqual([self.allowed(LoginIPThrottle)[0] for _ in range(3)], [True, True, False])
+        self.assertAlmostEqual(self.allowed(LoginIPThrottle)[1], 30)
+
+        self.now += 30
+        self.assertEqual([self.allowed(LoginIPThrottle)[0] for _ in range(2)], [True, False])
+
+    def test_username_bucket_is_per_client_ip(self):
+        with mock.patch.object(LoginUserThrottle, 'THROTTLE_RATES', LoginIPThrottle.THROTTLE_RATES):
+            for _ in range(2):
+                self.allowed(LoginUserThrottle, ip='10.0.0.66')
+            self.assertFalse(self.allowed(LoginUserThrottle, ip='10.0.0.66')[0])
+            self.assertTrue(self.allowed(LoginUserThrottle, ip='10.0.0.1')[0])
+
+
+@mock.patch.object(AIWeeklyReportThrottle, 'THROTTLE_RATES', {
+    'ai_weekly_report': '1/hour', 'ai_weekly_report.SUBSCRIBED': '3/hour',
+})
+class TieredThrottleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        cls.weekly_report = WeeklyReport.objects.create(
+            student=cls.user, week_number=1, start_date='2025-01-20', end_date='2025-01-24'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def allowed(self):
+        request = mock.Mock(user=User.objects.get(pk=self.user.pk))
+        return AIWeeklyReportThrottle().allow_request(request, None)
+
+    def test_tier_rate_with_fallback_to_the_scope_rate(self):
+        UserBalance.objects.filter(user=self.user).update(payment_status='SUBSCRIBED')
+        self.assertEqual([self.allowed() for _ in range(4)], [True, True, True, False])
+
+        cache.clear()
+        UserBalance.objects.filter(user=self.user).update(payment_status='FREE_TRIAL')
+        self.assertEqual([self.allowed() for _ in range(2)], [True, False])
+
+        cache.clear()
+        UserBalance.objects.filter(user=self.user).delete()
+        self.assertEqual([self.allowed() for _ in range(2)], [True, False])
+
+    def test_tier_comes_from_a_preloaded_balance(self):
+        UserBalance.objects.filter(user=self.user).update(payment_status='SUBSCRIBED')
+        user = User.objects.select_related('balance').get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(AIWeeklyReportThrottle.get_tier(user), 'SUBSCRIBED')
+
+    def test_enhance_endpoints_return_429_with_retry_after(self):
+        for path in (f'/api/reports/weekly/{self.weekly_report.pk}/enhance_with_ai/',
+                     '/api/reports/weekly/week/1/enhance_with_ai/'):
+            cache.clear()
+            gateway = mock.Mock()
+            gateway.available.return_value = False
+            with mock.patch('apps.reports.views.get_llm_gateway', return_value=gateway):
+                self.assertNotEqual(self.client.post(path, {}, format='json').status_code, 429)
+                response = self.client.post(path, {}, format='json')
+            self.assertEqual(response.status_code, 429)
+            self.assertGreater(int(response['Retry-After']), 0)
+
+
+class PrincipalCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', email='student@example.com', password='pass12345')
+
+    def setUp(self):
+        cache.clear()
+        self.access = str(AccessToken.for_user(self.user))
+        self.token = CustomJWTAuthentication().get_validated_token(self.access)
+
+    def test_only_the_principal_is_cached(self):
+        CustomJWTAuthentication().get_user(self.token)
+        with self.assertNumQueries(0):
+            user = CustomJWTAuthentication().get_user(self.token)
+        self.assertEqual((user.pk, user.username, user.is_active), (self.user.pk, 'student', True))
+        self.assertIn('password', user.get_deferred_fields())
+        self.assertNotIn(self.user.password, cache.get(PRINCIPAL_CACHE_KEY.format(self.user.pk)))
+
+    def test_changing_the_password_does_not_undo_a_ban(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        CustomJWTAuthentication().get_user(self.token)
+        # Banned elsewhere while the principal is still cached
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        response = client.post('/api/auth/change-password/', {
+            'current_password': 'pass12345', 'new_password': 'new-pass-67890',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertFalse(user.is_active)
+        self.assertTrue(user.check_password('new-pass-67890'))
+
+    def test_saving_a_principal_field_drops_the_cached_entry(self):
+        CustomJWTAuthentication().get_user(self.token)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        User.objects.get(pk=self.user.pk).save(update_fields=['is_active'])
+        self.assertFalse(CustomJWTAuthentication().get_user(self.token).is_active)
+
+
+class TokenBlacklistTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+
+    def index(self):
+        """An index with a built filter and no sync thread."""
+        index = BlacklistIndex()
+        index._ensure_thread = lambda: None
+        index._sync()
+        return index
+
+    def test_filter_miss_needs_no_query(self):
+        index = self.index()
+        with self.assertNumQueries(0):
+            self.assertFalse(index.is_blacklisted('not-a-blacklisted-jti'))
+
+    def test_sync_picks_up_new_rows(self):
+        index = self.index()
+        token = RefreshToken.for_user(self.user)
+        token.blacklist()
+        index._sync()
+        self.assertTrue(index.is_blacklisted(token['jti']))
+
+    def test_rotating_a_token_the_filter_has_not_seen_is_rejected(self):
+        refresh = str(RefreshToken.for_user(self.user))
+        client = APIClient()
+        self.assertEqual(client.post('/api/auth/refresh/', {'refresh': refresh}, format='json').status_code, 200)
+
+        # Another worker's filter hasn't synced the blacklisted token yet
+        with mock.patch('apps.core.token_blacklist.get_blacklist_index', return_value=mock.Mock(
+                is_blacklisted=mock.Mock(return_value=False))):
+            response = client.post('/api/auth/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+    def test_prune_tokens_deletes_expired_tokens_in_batches(self):
+        for _ in range(5):
+            IndexedRefreshToken.for_user(self.user).blacklist()
+        OutstandingToken.objects.filter(pk__in=OutstandingToken.objects.values('pk')[:3]).update(
+            expires_at='2020-01-01T00:00:00Z'
+        )
+        call_command('prune_tokens', batch_size=2, stdout=io.StringIO())
+        self.assertEqual(OutstandingToken.objects.count(), 2)
+        self.assertEqual(BlacklistedToken.objects.count(), 2)
+
+
+class AuditLogTests(TestCase):
+
+    def test_sqlite_rows_are_inserted_in_one_batch_after_the_request(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for n in range(3):
+                log_change('MainJobOperation', 'delete', {'id': n})
+        self.assertEqual(AuditEvent.objects.count(), 0)
+
+        with self.assertNumQueries(1):
+            request_finished.send(sender=None)
+        self.assertEqual(AuditEvent.objects.filter(model='MainJobOperation').count(), 3)
+
+    def test_rolled_back_changes_are_not_inserted(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            log_change('MainJobOperation', 'delete', {'id': 1})
+        request_finished.send(sender=None)
+        self.assertEqual(AuditEvent.objects.count(), 0)
+
+    def test_failed_insert_is_logged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            log_change('MainJobOperation', 'delete', {'id': 1})
+        with mock.patch.object(AuditEvent.objects, 'bulk_create', side_effect=DatabaseError('disk I/O error')), \
+                self.assertLogs('apps.core.audit', 'ERROR') as logs:
+            request_finished.send(sender=None)
+        self.assertIn('Failed to insert 1 audit events', logs.output[0])
+
+
+class AuditLogRequestTests(TransactionTestCase):
+    """The SQLite path end to end: on_commit collects the row, request_finished inserts it."""
+
+    def setUp(self):
+        base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, base_dir)
+        overrides = override_settings(BASE_DIR=base_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_deleted_operation_is_in_the_table_once_the_response_is_sent(self):
+        user = User.objects.create_user(username='student', password='pass12345')
+        weekly_report = WeeklyReport.objects.create(
+            student=user, week_number=1, start_date=date(2025, 1, 20), end_date=date(2025, 1, 24),
+        )
+        main_job = MainJob.objects.create(weekly_report=weekly_report, title='Compressor servicing')
+        operation = MainJobOperation.objects.create(main_job=main_job, step_number=1, operation_description='Step 1')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.delete(f'/api/reports/main-jobs/{main_job.pk}/operations/{operation.pk}/')
+
+        self.assertEqual(response.status_code, 204)
+        event = AuditEvent.objects.get()
+        self.assertEqual((event.model, event.action, event.user_id), ('MainJobOperation', 'delete', user.pk))
+        self.assertEqual(event.payload['id'], operation.pk)
+
+
+class BackupWatermarkTests(SimpleTestCase):
+
+    def test_only_auto_now_updated_at_is_a_watermark(self):
+        self.assertEqual(get_watermark_field(WeeklyReport), 'updated_at')
+        self.assertEqual(get_watermark_field(UserBalance), 'updated_at')
+        # Insert-only: new rows are found by primary key
+        for model in (TokenUsage, AuditEvent, OutstandingToken, BlacklistedToken):
+            self.assertEqual(get_watermark_field(model), 'pk')
+        # No updated_at to track update() calls and F() increments: dumped in full
+        for model in (User, TokenUsageDaily):
+            self.assertIsNone(get_watermark_field(model))
+
+
+class BackupRestoreTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # Restore rebuilds the search index; its table comes from a RunPython migration
+        from django.db import connection
+        from apps.reports.search import get_search_backend
+        with connection.cursor() as cursor:
+            for sql in get_search_backend(connection).create_sql:
+                cursor.execute(sql)
+        super().setUpClass()
+
+    def setUp(self):
+        base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, base_dir)
+        overrides = override_settings(BASE_DIR=base_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.clock = timezone.now()
+
+        self.kept = User.objects.create_user(username='kept', password='pass12345')
+        self.removed = User.objects.create_user(username='removed', password='pass12345')
+        self.old_event = AuditEvent.objects.create(ts=self.clock, model='MainJob', action='delete')
+
+    def at(self, seconds):
+        """Run a step at a fixed offset from setUp; backup ids and watermarks have second resolution."""
+        return mock.patch('django.utils.timezone.now', return_value=self.clock + timedelta(seconds=seconds))
+
+    def backup(self, seconds):
+        with self.at(seconds):
+            call_command('backup', '--skip-media', stdout=io.StringIO())
+        return latest_manifest()
+
+    def restore(self):
+        call_command('restore', '--no-input', stdout=io.StringIO())
+
+    def test_restore_replays_incremental_changes_and_deletions(self):
+        self.backup(1)
+        with self.at(2):
+            UserBalance.objects.filter(user=self.kept).update(available_tokens=123, updated_at=timezone.now())
+            self.removed.delete()
+            self.old_event.delete()
+            new_event = AuditEvent.objects.create(ts=timezone.now(), model='MainJob', action='update')
+        manifest = self.backup(3)
+
+        balances = manifest['models']['billings.userbalance']
+        events = manifest['models']['core.auditevent']
+        self.assertTrue(balances['incremental'] and events['incremental'])
+        self.assertEqual((balances['rows'], events['rows']), (1, 1))
+
+        # Changes made after the last backup are discarded by the restore
+        User.objects.create_user(username='later', password='pass12345')
+        UserBalance.objects.filter(user=self.kept).update(available_tokens=0)
+        self.restore()
+
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['kept'])
+        self.assertEqual(UserBalance.objects.get(user=self.kept).available_tokens, 123)
+        self.assertEqual(UserBalance.objects.count(), 1)
+        self.assertEqual(list(AuditEvent.objects.values_list('pk', flat=True)), [new_event.pk])
+
+    def test_failed_restore_keeps_current_data(self):
+        manifest = self.backup(1)
+        entry = manifest['models']['billings.userbalance']
+        with open_compressed(get_backups_dir() / manifest['id'] / entry['files'][0], 'w', manifest['compression']) as f:
+            f.write('{"model": "billings.userbalance", "pk": 1, "fields": {"user": 999999}}\n')
+        later = User.objects.create_user(username='later', password='pass12345')
+
+        with self.assertRaises(Exception):
+            self.restore()
+
+        self.assertEqual(User.objects.count(), 3)
+        self.assertTrue(UserBalance.objects.filter(user=later).exists())
+        self.assertTrue(AuditEvent.objects.filter(pk=self.old_event.pk).exists())
+
+
+class ProfilingTests(TestCase):
+
+    def setUp(self):
+        get_profile_store().clear()
+
+    @staticmethod
+    def sample(endpoint, duration_ms, queries=1, duplicate_queries=0, top_duplicate=None, status=200, **extra):
+        return {
+            'ts': time.time(), 'endpoint': endpoint, 'view': 'views.view', 'path': extra.pop('path', '/api/x/'),
+            'status': status, 'duration_ms': duration_ms, 'sql_ms': duration_ms / 2, 'python_ms': duration_ms / 2,
+            'queries': queries, 'duplicate_queries': duplicate_queries, 'top_duplicate': top_duplicate,
+            'response_bytes': extra.pop('response_bytes', 100),
+        }
+
+    def test_repeated_statements_are_counted_as_duplicates(self):
+        recorder = QueryRecorder()
+        execute = mock.Mock(return_value=None)
+        for pk in range(3):
+            recorder(execute, 'SELECT * FROM companies WHERE id = %s', (pk,), False, {})
+        recorder(execute, 'SELECT count(*) FROM companies', (), False, {})
+
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(
+            recorder.duplicates(), (2, {'sql': 'SELECT * FROM companies WHERE id = %s', 'count': 3})
+        )
+        self.assertEqual(QueryRecorder().duplicates(), (0, None))
+
+    def test_summary_per_endpoint(self):
+        n_plus_one = {'sql': 'SELECT ... WHERE user_id = %s', 'count': 20}
+        samples = [self.sample('GET users', ms, queries=3) for ms in range(10, 110, 10)]
+        samples.append(self.sample('GET users', 500, queries=21, duplicate_queries=19, top_duplicate=n_plus_one))
+        samples.append(self.sample('POST login', 50, status=503, path='/api/auth/login/', response_bytes=None))
+
+        report = summarize(samples)
+
+        self.assertEqual([row['endpoint'] for row in report], ['GET users', 'POST login'])
+        users = report[0]
+        self.assertEqual((users['count'], users['p50_ms'], users['p95_ms']), (11, 60, 500))
+        self.assertEqual((users['p50_queries'], users['p95_queries']), (3, 21))
+        self.assertEqual((users['max_duplicate_queries'], users['top_duplicate']), (19, n_plus_one))
+        self.assertEqual((report[1]['errors'], report[1]['p50_response_bytes']), (1, None))
+
+        self.assertEqual([row['endpoint'] for row in summarize(samples, prefix='/api/auth/')], ['POST login'])
+        self.assertEqual([row['endpoint'] for row in summarize(samples, sort='errors', limit=1)], ['POST login'])
+
+    def test_middleware_records_a_sample_per_request(self):
+        base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, base_dir)
+        user = User.objects.create_user(username='student', password='pass12345')
+        with override_settings(PROFILING_ENABLED=True, BASE_DIR=base_dir):
+            client = APIClient()
+            client.force_authenticate(user)
+            response = client.get('/api/companies/autocomplete/', {'q': 'tan'})
+
+        self.assertEqual(response.status_code, 200)
+        sample, = get_profile_store().samples
+        self.assertEqual((sample['endpoint'], sample['status']), ('GET companies:company-autocomplete', 200))
+        self.assertGreaterEqual(sample['queries'], 1)
+        self.assertEqual(sample['response_bytes'], len(response.content))
+
+
+class AdmissionControlTests(SimpleTestCase):
+
+    def setUp(self):
+        base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, base_dir)
+        overrides = override_settings(BASE_DIR=base_dir, LLM_MAX_CONCURRENCY=1, LLM_QUEUE_SIZE=2, LLM_QUEUE_TIMEOUT=2)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.controller = AdmissionController()
+        self.release = threading.Event()
+        self.admitted = []
+        self.errors = []
+
+    def call(self, name, hold=False):
+        def run():
+            try:
+                with self.controller.slot():
+                    self.admitted.append(name)
+                    if hold:
+                        self.release.wait(5)
+            except LLMUnavailable as exc:
+                self.errors.append(exc)
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.addCleanup(thread.join)
+        return thread
+
+    def queue(self, *names):
+        """Start callers one at a time, each after the previous one is queued."""
+        for depth, name in enumerate(names, 1):
+            self.call(name)
+            while self.controller.queue_depth < depth:
+                time.sleep(0.01)
+
+    def test_waiters_are_admitted_in_arrival_order(self):
+        holder = self.call('holder', hold=True)
+        while not self.admitted:
+            time.sleep(0.01)
+        self.queue('first', 'second')
+        self.release.set()
+        holder.join()
+        while len(self.admitted) < 3:
+            time.sleep(0.01)
+        self.assertEqual(self.admitted, ['holder', 'first', 'second'])
+
+    def test_full_queue_is_shed_with_retry_after(self):
+        self.call('holder', hold=True)
+        while not self.admitted:
+            time.sleep(0.01)
+        self.queue('first', 'second')
+        with self.assertRaises(LLMUnavailable) as shed:
+            with self.controller.slot():
+                pass
+        self.assertEqual(shed.exception.status_code, 503)
+        self.assertGreaterEqual(shed.exception.wait, 1)
+        self.assertEqual(self.controller.counters['shed_queue_full'], 1)
+        self.release.set()
+
+    @override_settings(LLM_QUEUE_TIMEOUT=0.1)
+    def test_waiting_past_the_deadline_is_shed(self):
+        controller = AdmissionController()
+        with controller.slot():
+            with self.assertRaises(LLMUnavailable):
+                with controller.slot():
+                    pass
+        self.assertEqual(controller.counters['shed_deadline'], 1)
+        self.assertEqual(controller.queue_depth, 0)
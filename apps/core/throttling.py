@@ -0,0 +1,141 @@
+"""Token-bucket request throttles.
+
+Rates use DRF's ``DEFAULT_THROTTLE_RATES`` format (``'10/min'``): the bucket
+holds that many requests and refills at that rate, so short bursts are
+allowed but the sustained rate is capped. Buckets live in the cache named by
+``THROTTLE_CACHE_ALIAS``. With the default per-process cache each worker
+enforces its own limit. With a shared backend (e.g. Redis) the limit is
+global, though concurrent requests from different workers may race on a bucket.
+"""
+import math
+import threading
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+_bucket_lock = threading.Lock()
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """SimpleRateThrottle with a token bucket instead of a request history list."""
+
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'THROTTLE_CACHE_ALIAS', 'default')]
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        capacity, period = self.num_requests, self.duration
+        refill = capacity / period
+        with _bucket_lock:
+            now = self.timer()
+            tokens, stamp = self.cache.get(self.key, (capacity, now))
+            tokens = min(capacity, tokens + (now - stamp) * refill)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self.cache.set(self.key, (tokens, now), math.ceil(period))
+        self._wait = 0 if allowed else (1 - tokens) / refill
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class LoginIPThrottle(TokenBucketThrottle):
+    """Login attempts per client IP (generous: campus networks share addresses)."""
+
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginUserThrottle(TokenBucketThrottle):
+    """Login attempts per username from one client IP.
+
+    Keyed on the pair rather than the username alone: the username is
+    whatever the client sends, so anyone could otherwise lock a user out by
+    spending their bucket. Guessing from many addresses is capped by each
+    address's LoginIPThrottle bucket.
+    """
+
+    scope = 'login_user'
+
+    def get_cache_key(self, request, view):
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        if not username:
+            return None
+        ident = f'{self.get_ident(request)}:{str(username).strip().lower()[:150]}'
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class PasswordChangeThrottle(TokenBucketThrottle):
+    """Password change attempts per authenticated user."""
+
+    scope = 'password_change'
+
+    def get_cache_key(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': request.user.pk}
+
+
+class TieredUserThrottle(TokenBucketThrottle):
+    """Per-user bucket whose rate depends on the user's billing tier.
+
+    The rate is ``DEFAULT_THROTTLE_RATES['<scope>.<payment_status>']`` when set,
+    otherwise ``DEFAULT_THROTTLE_RATES['<scope>']``.
+    """
+
+    def allow_request(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return True
+        rate = self.THROTTLE_RATES.get(f'{self.scope}.{self.get_tier(request.user)}')
+        if rate:
+            self.rate = rate
+            self.num_requests, self.duration = self.parse_rate(rate)
+        return super().allow_request(request, view)
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': request.user.pk}
+
+    @staticmethod
+    def get_tier(user):
+        """The user's payment status, from ``user.balance`` if it was loaded with select_related."""
+        from billings.models import UserBalance
+
+        if type(user).balance.related.is_cached(user):
+            try:
+                return user.balance.payment_status
+            except UserBalance.DoesNotExist:
+                return None
+        return UserBalance.objects.filter(user_id=user.pk).values_list('payment_status', flat=True).first()
+
+
+class AIEnhanceThrottle(TieredUserThrottle):
+    """Text and report field enhancement (one LLM call each)."""
+
+    scope = 'ai_enhance'
+
+
+class AIGenerateThrottle(TieredUserThrottle):
+    scope = 'ai_generate'
+
+
+class AISuggestThrottle(TieredUserThrottle):
+    scope = 'ai_suggest'
+
+
+class AIWeeklyReportThrottle(TieredUserThrottle):
+    """Whole weekly report enhancement: the largest prompts."""
+
+    scope = 'ai_weekly_report'
@@ -0,0 +1,152 @@
+"""Constant-time refresh token blacklist checks.
+
+With ``ROTATE_REFRESH_TOKENS`` and ``BLACKLIST_AFTER_ROTATION`` every refresh
+blacklists the token it replaces, so ``BlacklistedToken`` grows by one row per
+refresh. Each process keeps a Bloom filter of the unexpired blacklisted JTIs:
+
+- a JTI the filter has never seen is not blacklisted, so no lookup is needed;
+- a filter hit (or false positive) is confirmed against the database.
+
+A background thread keeps the filter current: every
+``TOKEN_BLACKLIST_SYNC_INTERVAL`` seconds it adds the rows blacklisted since
+(by any process) with a primary key range query, and every
+``TOKEN_BLACKLIST_REBUILD_INTERVAL`` seconds it builds a fresh filter, so
+expired tokens drop out, and swaps it in. Checks never query or lock for the
+filter. Until the first build they go to the database.
+
+A token blacklisted by another process in the last sync interval can pass the
+filter. Rotating it still fails: :meth:`IndexedRefreshToken.blacklist`
+rejects a token whose blacklist row already exists. The ``prune_tokens``
+command deletes expired rows.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .background import BackgroundWorker
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings."""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(int(capacity), 1)
+        self.size = math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k positions from one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class BlacklistIndex(BackgroundWorker):
+    """Per-process Bloom filter of blacklisted refresh token JTIs, kept in sync by a background thread."""
+
+    thread_name = 'token-blacklist-sync'
+
+    def __init__(self):
+        super().__init__()
+        self.sync_interval = getattr(settings, 'TOKEN_BLACKLIST_SYNC_INTERVAL', 5)
+        self.rebuild_interval = getattr(settings, 'TOKEN_BLACKLIST_REBUILD_INTERVAL', 3600)
+        self.error_rate = getattr(settings, 'TOKEN_BLACKLIST_ERROR_RATE', 0.001)
+        # Only the sync thread writes the filter; checks read whichever one is current
+        self._filter = None
+        self._last_id = 0
+        self._built_at = 0
+
+    def is_blacklisted(self, jti):
+        self._ensure_thread()
+        bloom = self._filter
+        if bloom is not None and jti not in bloom:
+            return False
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def _after_fork(self):
+        # The parent's filter stops being synced; start over
+        self._filter = None
+
+    def _run(self):
+        while True:
+            self._refresh_connection()
+            try:
+                self._sync()
+            except Exception:
+                logger.exception("Token blacklist filter sync failed")
+            time.sleep(self.sync_interval)
+
+    def _sync(self):
+        if (self._filter is None
+                or time.monotonic() - self._built_at >= self.rebuild_interval
+                or self._filter.count > self._filter.capacity):
+            self._rebuild()
+            return
+        new_rows = BlacklistedToken.objects.filter(id__gt=self._last_id).order_by('id').values_list('id', 'token__jti')
+        for row_id, jti in new_rows:
+            self._filter.add(jti)
+            self._last_id = row_id
+
+    def _rebuild(self):
+        last_id = BlacklistedToken.objects.aggregate(last=Max('id'))['last'] or 0
+        live = BlacklistedToken.objects.filter(id__lte=last_id, token__expires_at__gt=timezone.now())
+        # Headroom so the filter isn't rebuilt again after a few refreshes
+        bloom = BloomFilter(max(live.count() * 2, 1024), self.error_rate)
+        for jti in live.values_list('token__jti', flat=True).iterator(chunk_size=5000):
+            bloom.add(jti)
+        self._last_id, self._built_at = last_id, time.monotonic()
+        self._filter = bloom
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_blacklist_index() -> BlacklistIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = BlacklistIndex()
+    return _index
+
+
+class IndexedRefreshToken(RefreshToken):
+    def check_blacklist(self):
+        if get_blacklist_index().is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        """Blacklist this token; fails if it already was, which the filter may not know yet."""
+        blacklisted, created = super().blacklist()
+        if not created:
+            raise TokenError(_("Token is blacklisted"))
+        return blacklisted, created
+
+
+class IndexedTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = IndexedRefreshToken
@@ -4,4 +4,6 @@ from . import views
 urlpatterns = [
     path('', views.api_root, name='api_root'),
     path('health/', views.health_check, name='health_check'),
+    path('profiling/', views.profiling_report, name='profiling_report'),
+    path('llm-admission/', views.llm_admission_status, name='llm_admission_status'),
 ] 
\ No newline at end of file
@@ -1,7 +1,11 @@
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 from django.urls import reverse
+import time
+
+from .llm_admission import get_admission_controller
+from .profiling import load_samples, summarize
 
 
 @api_view(['GET'])
@@ -27,4 +31,44 @@ def health_check(request):
     return Response({
         'status': 'healthy',
         'message': 'API is running successfully'
-    }) 
\ No newline at end of file
+    })
+
+
+PROFILING_SORT_FIELDS = {'p50_ms', 'p95_ms', 'p95_sql_ms', 'p95_queries', 'max_duplicate_queries', 'count'}
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def profiling_report(request):
+    """Per-endpoint p50/p95 latency, SQL and duplicate-query figures from ProfilingMiddleware"""
+    sort = request.GET.get('sort', 'p95_ms')
+    if sort not in PROFILING_SORT_FIELDS:
+        return Response({
+            'success': False,
+            'message': f"sort must be one of: {', '.join(sorted(PROFILING_SORT_FIELDS))}"
+        }, status=400)
+    try:
+        minutes = int(request.GET['minutes']) if request.GET.get('minutes') else None
+        limit = int(request.GET.get('limit', 50))
+    except ValueError:
+        return Response({'success': False, 'message': 'minutes and limit must be integers'}, status=400)
+
+    since = time.time() - minutes * 60 if minutes else None
+    samples = load_samples(since=since)
+    return Response({
+        'success': True,
+        'data': {
+            'samples': len(samples),
+            'endpoints': summarize(samples, sort=sort, prefix=request.GET.get('prefix'), limit=limit),
+        }
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def llm_admission_status(request):
+    """Outbound LLM queue depth, in-flight calls, wait times and shed counts (this worker)"""
+    return Response({
+        'success': True,
+        'data': get_admission_controller().snapshot()
+    })
@@ -553,4 +553,116 @@ def export_general_report_docx(general_report):
         
     except Exception as e:
         logger.error(f"Error exporting general report DOCX: {e}")
-        raise 
\ No newline at end of file
+        raise 
+
+# ---------------------------------------------------------------------------
+# Streaming data exports (CSV / NDJSON) for analytics and auditing
+# ---------------------------------------------------------------------------
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FLUSH_BYTES = 64 * 1024
+
+
+def _export_datasets():
+    """Map of exportable dataset name -> (queryset, ordered field list).
+
+    Fields are passed straight to ``values()`` so only plain tuples/dicts are
+    materialised, never model instances.
+    """
+    from apps.reports.models import DailyReport, WeeklyReport
+    from apps.admin_dashboard.models import TokenUsage
+    from billings.models import Transaction
+
+    return {
+        'daily-reports': (
+            DailyReport.objects.all(),
+            ['id', 'student_id', 'student__username', 'week_number', 'date',
+             'description', 'hours_spent', 'created_at', 'updated_at'],
+        ),
+        'weekly-reports': (
+            WeeklyReport.objects.all(),
+            ['id', 'student_id', 'student__username', 'week_number', 'start_date',
+             'end_date', 'total_hours', 'is_complete', 'main_job__title',
+             'created_at', 'updated_at'],
+        ),
+        'transactions': (
+            Transaction.objects.all(),
+            ['id', 'user_id', 'user__username', 'payment_method', 'wakala_name',
+             'transaction_status', 'amount', 'tokens_generated', 'confirmed_by_id',
+             'created_at', 'updated_at'],
+        ),
+        'token-usage': (
+            TokenUsage.objects.all(),
+            ['id', 'user_id', 'user__username', 'tokens_consumed', 'enhancement_type',
+             'content_type', 'cost_estimate', 'created_at'],
+        ),
+    }
+
+
+def get_export_dataset_names():
+    """Return the names of all streamable datasets."""
+    return sorted(_export_datasets().keys())
+
+
+def iter_export_rows(dataset, since=None, until=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield dataset rows as dicts using a server-side cursor.
+
+    ``since``/``until`` are dates applied to ``created_at`` (inclusive).
+    Raises ``KeyError`` for an unknown dataset.
+    """
+    queryset, fields = _export_datasets()[dataset]
+    if since:
+        queryset = queryset.filter(created_at__date__gte=since)
+    if until:
+        queryset = queryset.filter(created_at__date__lte=until)
+    # Order by primary key so the export is stable and index-backed
+    return queryset.order_by('pk').values(*fields).iterator(chunk_size=chunk_size)
+
+
+def get_export_fields(dataset):
+    """Return the ordered column names for a dataset."""
+    return list(_export_datasets()[dataset][1])
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the value instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def _buffered(lines, flush_bytes=EXPORT_FLUSH_BYTES):
+    """Group small string chunks so the response isn't flushed per row."""
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= flush_bytes:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_csv(rows, fields):
+    """Stream rows as CSV text, header first."""
+    import csv
+
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow([row[field] for field in fields])
+
+    return _buffered(lines())
+
+
+def stream_ndjson(rows):
+    """Stream rows as newline-delimited JSON."""
+    from django.core.serializers.json import DjangoJSONEncoder
+
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    return _buffered(encoder.encode(row) + '\n' for row in rows)
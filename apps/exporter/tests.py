@@ -0,0 +1,70 @@
+import csv
+import datetime
+import io
+import json
+from django.contrib.auth.models import User
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.reports.models import DailyReport
+
+
+class DataExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', password='pass12345', is_staff=True)
+        cls.student = User.objects.create_user(username='student', password='pass12345')
+        cls.reports = [
+            DailyReport.objects.create(
+                student=cls.student, week_number=1, date=datetime.date(2025, 1, 20) + datetime.timedelta(days=day),
+                description=f'Day {day}, with "quotes", commas\nand a newline', hours_spent=8,
+            )
+            for day in range(3)
+        ]
+        # Created on an earlier day, to be filtered out by since
+        DailyReport.objects.filter(pk=cls.reports[0].pk).update(
+            created_at=datetime.datetime(2024, 12, 1, tzinfo=datetime.timezone.utc)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def export(self, path, **params):
+        return self.client.get(f'/api/export/data/{path}', params)
+
+    def test_only_staff_can_export(self):
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.export('daily-reports.csv').status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.export('daily-reports.csv').status_code, 401)
+
+    def test_csv_has_a_header_and_one_row_per_object(self):
+        response = self.export('daily-reports.csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertRegex(response['Content-Disposition'], r'attachment; filename="daily-reports_\d{8}T\d{6}Z\.csv"')
+
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([int(row['id']) for row in rows], [report.pk for report in self.reports])
+        self.assertEqual(rows[1]['student__username'], 'student')
+        self.assertEqual(rows[1]['description'], self.reports[1].description)
+
+    def test_ndjson_is_one_object_per_line_and_filters_on_creation_date(self):
+        response = self.export('daily-reports.ndjson', since='2025-01-01')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [report.pk for report in self.reports[1:]])
+        self.assertEqual((rows[0]['date'], rows[0]['hours_spent']), ('2025-01-21', '8.0'))
+
+        response = self.export('daily-reports.ndjson', until='2024-12-31')
+        self.assertEqual(b''.join(response.streaming_content).decode().count('\n'), 1)
+
+    def test_unknown_dataset_is_404_and_bad_parameters_are_400(self):
+        self.assertEqual(self.export('users.csv').status_code, 404)
+        self.assertEqual(self.export('daily-reports.xlsx').status_code, 400)
+        self.assertEqual(self.export('daily-reports.csv', since='last week').status_code, 400)
+        self.assertEqual(self.export('daily-reports.csv', until='2025-02-30').status_code, 400)
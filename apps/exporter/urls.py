@@ -11,4 +11,5 @@ urlpatterns = [
     path('general/pdf/', views.export_general_report_pdf_view, name='general-pdf'),
     path('general/docx/', views.export_general_report_docx_view, name='general-docx'),
     path('bulk/', views.bulk_export, name='bulk-export'),
+    path('data/<str:dataset>.<str:export_format>', views.stream_data_export, name='data-export'),
 ] 
\ No newline at end of file
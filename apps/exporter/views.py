@@ -1,11 +1,16 @@
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework import status
-from .services import export_weekly_report_pdf, export_weekly_report_docx, export_general_report_pdf, export_general_report_docx
+from .services import (
+    export_weekly_report_pdf, export_weekly_report_docx, export_general_report_pdf, export_general_report_docx,
+    get_export_dataset_names, get_export_fields, iter_export_rows, stream_csv, stream_ndjson,
+)
 from apps.reports.models import WeeklyReport, GeneralReport, DailyReport
 from apps.core.permissions import IsOwnerOrReadOnly
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
 
 @api_view(['GET'])
@@ -304,4 +309,51 @@ def bulk_export(request):
     return Response({
         'success': False,
         'message': 'Bulk export not implemented for this report type'
-    }, status=400) 
\ No newline at end of file
+    }, status=400)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def stream_data_export(request, dataset, export_format):
+    """Stream a full-table export as CSV or NDJSON in constant memory.
+
+    Optional ``since``/``until`` query params (YYYY-MM-DD) filter on creation date.
+    """
+    if dataset not in get_export_dataset_names():
+        return Response({
+            'success': False,
+            'message': f'Unknown dataset. Choose one of: {", ".join(get_export_dataset_names())}'
+        }, status=404)
+
+    if export_format not in ('csv', 'ndjson'):
+        return Response({
+            'success': False,
+            'message': 'Format must be either csv or ndjson'
+        }, status=400)
+
+    dates = {}
+    for param in ('since', 'until'):
+        raw = request.query_params.get(param)
+        try:
+            dates[param] = parse_date(raw) if raw else None
+        except ValueError:
+            dates[param] = None
+        if raw and dates[param] is None:
+            return Response({
+                'success': False,
+                'message': f'{param} must be a valid date (YYYY-MM-DD)'
+            }, status=400)
+    since, until = dates['since'], dates['until']
+
+    rows = iter_export_rows(dataset, since=since, until=until)
+    if export_format == 'csv':
+        content = stream_csv(rows, get_export_fields(dataset))
+        content_type = 'text/csv; charset=utf-8'
+    else:
+        content = stream_ndjson(rows)
+        content_type = 'application/x-ndjson; charset=utf-8'
+
+    filename = f'{dataset}_{timezone.now().strftime("%Y%m%dT%H%M%SZ")}.{export_format}'
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1 @@
+# Management commands for reports 
\ No newline at end of file
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.reports.search import get_search_backend, rebuild_search_index
+import time
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index over daily reports, main jobs and operations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Documents written per batch (default: 1000)')
+
+    def handle(self, *args, **options):
+        if get_search_backend() is None:
+            raise CommandError('Full-text search is not supported on this database backend')
+
+        started = time.monotonic()
+        total = rebuild_search_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {total} documents in {time.monotonic() - started:.1f}s'
+        ))
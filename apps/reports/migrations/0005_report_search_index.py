@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    from apps.reports.search import get_search_backend
+
+    backend = get_search_backend(schema_editor.connection)
+    if backend is None:
+        return
+    for sql in backend.create_sql:
+        schema_editor.execute(sql)
+
+
+def drop_search_table(apps, schema_editor):
+    from apps.reports.search import get_search_backend
+
+    backend = get_search_backend(schema_editor.connection)
+    if backend is None:
+        return
+    for sql in backend.drop_sql:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0004_originaluserinputs"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
@@ -186,7 +186,8 @@ class AIEnhancementLog(models.Model):
     original_content = models.TextField(null=True, blank=True)
     enhanced_content = models.TextField(null=True, blank=True)
     tokens_consumed = models.IntegerField(default=0, null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: rows are written in batches and keep the time of the call
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
 
     class Meta:
         ordering = ['-created_at']
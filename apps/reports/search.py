@@ -0,0 +1,304 @@
+"""Full-text search over report content.
+
+Daily report descriptions, main job titles/descriptions and operation
+descriptions/tools are copied into a single ``report_search`` table:
+an FTS5 virtual table on SQLite, or a table with a generated ``tsvector``
+column and a GIN index on PostgreSQL. Signals keep it in sync on writes;
+``rebuild_search_index`` repopulates it after bulk loads.
+"""
+import logging
+import re
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = 'report_search'
+
+# Row ids are derived from (kind, object_id) so upserts/deletes are primary key lookups
+KIND_CODES = {
+    'daily_report': 1,
+    'main_job': 2,
+    'operation': 3,
+}
+
+
+class SearchUnavailable(Exception):
+    """Full-text search isn't supported on the configured database."""
+
+
+def document_id(kind, object_id):
+    return object_id * 8 + KIND_CODES[kind]
+
+
+class SQLiteSearchBackend:
+    """FTS5 virtual table ranked with bm25()."""
+
+    create_sql = [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+            kind UNINDEXED, object_id UNINDEXED, student_id UNINDEXED, week_number UNINDEXED,
+            title, body, tools,
+            tokenize = 'porter unicode61 remove_diacritics 2'
+        )""",
+    ]
+    drop_sql = [f"DROP TABLE IF EXISTS {SEARCH_TABLE}"]
+
+    def upsert(self, cursor, docs):
+        ids = [(doc['id'],) for doc in docs]
+        cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", ids)
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, kind, object_id, student_id, week_number, title, body, tools) "
+            f"VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+            [(d['id'], d['kind'], d['object_id'], d['student_id'], d['week_number'],
+              d['title'], d['body'], d['tools']) for d in docs],
+        )
+
+    def delete(self, cursor, ids):
+        cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [(i,) for i in ids])
+
+    def clear(self, cursor):
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+
+    def search(self, cursor, query, student_id, kind, limit, offset):
+        # Quote every term so user input can't inject FTS5 query syntax
+        terms = re.findall(r'\w+', query)
+        if not terms:
+            return [], 0
+        match = ' '.join(f'"{term}"' for term in terms)
+
+        where = [f"{SEARCH_TABLE} MATCH %s"]
+        params = [match]
+        if student_id is not None:
+            where.append("student_id = %s")
+            params.append(student_id)
+        if kind:
+            where.append("kind = %s")
+            params.append(kind)
+        where_sql = ' AND '.join(where)
+
+        cursor.execute(f"SELECT count(*) FROM {SEARCH_TABLE} WHERE {where_sql}", params)
+        total = cursor.fetchone()[0]
+        if not total:
+            return [], 0
+
+        cursor.execute(
+            f"SELECT kind, object_id, week_number, "
+            f"bm25({SEARCH_TABLE}, 0, 0, 0, 0, 3.0, 1.0, 2.0) AS rank, "
+            f"snippet({SEARCH_TABLE}, -1, '<mark>', '</mark>', '…', 16) "
+            f"FROM {SEARCH_TABLE} WHERE {where_sql} ORDER BY rank LIMIT %s OFFSET %s",
+            params + [limit, offset],
+        )
+        # bm25() is lower-is-better; flip it so higher scores rank first like ts_rank
+        return [
+            {'kind': k, 'id': object_id, 'week_number': week, 'score': round(-rank, 6), 'snippet': snippet}
+            for k, object_id, week, rank, snippet in cursor.fetchall()
+        ], total
+
+
+class PostgresSearchBackend:
+    """Weighted tsvector (title > tools > body) with a GIN index, ranked with ts_rank()."""
+
+    create_sql = [
+        f"""CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+            id bigint PRIMARY KEY,
+            kind varchar(20) NOT NULL,
+            object_id bigint NOT NULL,
+            student_id integer NOT NULL,
+            week_number integer,
+            title text NOT NULL DEFAULT '',
+            body text NOT NULL DEFAULT '',
+            tools text NOT NULL DEFAULT '',
+            document tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', title), 'A') ||
+                setweight(to_tsvector('english', tools), 'B') ||
+                setweight(to_tsvector('english', body), 'C')
+            ) STORED
+        )""",
+        f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_idx ON {SEARCH_TABLE} USING GIN (document)",
+        f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_student_idx ON {SEARCH_TABLE} (student_id, kind)",
+    ]
+    drop_sql = [f"DROP TABLE IF EXISTS {SEARCH_TABLE}"]
+
+    def upsert(self, cursor, docs):
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (id, kind, object_id, student_id, week_number, title, body, tools) "
+            f"VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+            f"ON CONFLICT (id) DO UPDATE SET student_id = EXCLUDED.student_id, "
+            f"week_number = EXCLUDED.week_number, title = EXCLUDED.title, "
+            f"body = EXCLUDED.body, tools = EXCLUDED.tools",
+            [(d['id'], d['kind'], d['object_id'], d['student_id'], d['week_number'],
+              d['title'], d['body'], d['tools']) for d in docs],
+        )
+
+    def delete(self, cursor, ids):
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE id = ANY(%s)", [list(ids)])
+
+    def clear(self, cursor):
+        cursor.execute(f"TRUNCATE {SEARCH_TABLE}")
+
+    def search(self, cursor, query, student_id, kind, limit, offset):
+        where = ["document @@ q"]
+        params = [query]
+        if student_id is not None:
+            where.append("student_id = %s")
+            params.append(student_id)
+        if kind:
+            where.append("kind = %s")
+            params.append(kind)
+        from_sql = f"FROM {SEARCH_TABLE}, websearch_to_tsquery('english', %s) q WHERE {' AND '.join(where)}"
+
+        cursor.execute(f"SELECT count(*) {from_sql}", params)
+        total = cursor.fetchone()[0]
+        if not total:
+            return [], 0
+
+        cursor.execute(
+            f"SELECT kind, object_id, week_number, ts_rank(document, q) AS rank, "
+            f"ts_headline('english', concat_ws(' … ', nullif(title, ''), nullif(tools, ''), nullif(body, '')), q, "
+            f"'StartSel=<mark>, StopSel=</mark>, MaxWords=24, MinWords=8') "
+            f"{from_sql} ORDER BY rank DESC LIMIT %s OFFSET %s",
+            params + [limit, offset],
+        )
+        return [
+            {'kind': k, 'id': object_id, 'week_number': week, 'score': round(rank, 6), 'snippet': snippet}
+            for k, object_id, week, rank, snippet in cursor.fetchall()
+        ], total
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(conn=None):
+    """Backend for the given connection's vendor, or None if full-text search isn't supported."""
+    backend_class = BACKENDS.get((conn or connection).vendor)
+    return backend_class() if backend_class else None
+
+
+def build_document(instance):
+    """Index row for a DailyReport, MainJob or MainJobOperation (None if it has no owner yet)."""
+    from .models import WeeklyReport
+
+    kind = _kind_for(instance)
+    if kind == 'daily_report':
+        return _document_from_row(kind, (
+            instance.pk, instance.student_id, instance.week_number, instance.description))
+
+    # Jobs and operations belong to a student through their weekly report
+    if kind == 'main_job':
+        owner = WeeklyReport.objects.filter(pk=instance.weekly_report_id)
+    else:
+        owner = WeeklyReport.objects.filter(main_job__id=instance.main_job_id)
+    owner = owner.values_list('student_id', 'week_number').first()
+    if owner is None:
+        return None
+
+    if kind == 'main_job':
+        return _document_from_row(kind, (instance.pk, *owner, instance.title, instance.description))
+    return _document_from_row(kind, (instance.pk, *owner, instance.operation_description, instance.tools_used))
+
+
+def index_instance(instance):
+    """Add or refresh one object in the index; never breaks the surrounding write."""
+    backend = get_search_backend()
+    if backend is None:
+        return
+    try:
+        doc = build_document(instance)
+        # Savepoint so a search index failure can't poison the caller's transaction
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                if doc is None:
+                    backend.delete(cursor, [document_id(_kind_for(instance), instance.pk)])
+                else:
+                    backend.upsert(cursor, [doc])
+    except Exception:
+        logger.exception("Failed to index %s %s for search", type(instance).__name__, instance.pk)
+
+
+def remove_instance(instance):
+    backend = get_search_backend()
+    if backend is None:
+        return
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                backend.delete(cursor, [document_id(_kind_for(instance), instance.pk)])
+    except Exception:
+        logger.exception("Failed to remove %s %s from search", type(instance).__name__, instance.pk)
+
+
+def _kind_for(instance):
+    return {
+        'DailyReport': 'daily_report',
+        'MainJob': 'main_job',
+        'MainJobOperation': 'operation',
+    }[type(instance).__name__]
+
+
+def rebuild_search_index(batch_size=1000):
+    """Re-index every searchable object (after restores or other signal-less bulk loads)."""
+    from .models import DailyReport, MainJob, MainJobOperation
+
+    backend = get_search_backend()
+    if backend is None:
+        return 0
+
+    sources = [
+        ('daily_report', DailyReport.objects.values_list(
+            'pk', 'student_id', 'week_number', 'description')),
+        ('main_job', MainJob.objects.filter(weekly_report__isnull=False).values_list(
+            'pk', 'weekly_report__student_id', 'weekly_report__week_number', 'title', 'description')),
+        ('operation', MainJobOperation.objects.filter(main_job__weekly_report__isnull=False).values_list(
+            'pk', 'main_job__weekly_report__student_id', 'main_job__weekly_report__week_number',
+            'operation_description', 'tools_used')),
+    ]
+
+    total = 0
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            backend.clear(cursor)
+            for kind, rows in sources:
+                batch = []
+                for row in rows.order_by('pk').iterator(chunk_size=batch_size):
+                    batch.append(_document_from_row(kind, row))
+                    if len(batch) >= batch_size:
+                        backend.upsert(cursor, batch)
+                        total += len(batch)
+                        batch = []
+                if batch:
+                    backend.upsert(cursor, batch)
+                    total += len(batch)
+    return total
+
+
+def _document_from_row(kind, row):
+    if kind == 'daily_report':
+        pk, student_id, week_number, body = row
+        title, tools = '', ''
+    elif kind == 'main_job':
+        pk, student_id, week_number, title, body = row
+        tools = ''
+    else:
+        pk, student_id, week_number, body, tools = row
+        title = ''
+    return {
+        'id': document_id(kind, pk),
+        'kind': kind,
+        'object_id': pk,
+        'student_id': student_id,
+        'week_number': week_number,
+        'title': title or '',
+        'body': body or '',
+        'tools': tools or '',
+    }
+
+
+def search_reports(query, student_id=None, kind=None, limit=20, offset=0):
+    """Ranked matches as (results, total). Raises SearchUnavailable on unsupported databases."""
+    backend = get_search_backend()
+    if backend is None:
+        raise SearchUnavailable(f"Full-text search is not supported on {connection.vendor}")
+    with connection.cursor() as cursor:
+        return backend.search(cursor, query, student_id, kind, limit, offset)
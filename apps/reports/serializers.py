@@ -2,6 +2,9 @@ from rest_framework import serializers
 from .models import DailyReport, WeeklyReport, MainJob, MainJobOperation
 from datetime import date, timedelta
 from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
 
 def get_week_range(week_number, year=2025):
     """Calculate the start and end date for a given week number.
@@ -230,15 +233,15 @@ class WeeklyReportCreateSerializer(serializers.ModelSerializer):
                 
                 # Only update operations if operations_data is provided
                 if operations_data:
-                # Remove existing operations if updating main job
-                if not main_job_created:
-                    main_job.operations.all().delete()
-                # Create operations
-                for operation_data in operations_data:
-                    MainJobOperation.objects.create(
-                        main_job=main_job,
-                        **operation_data
-                    )
+                    # Remove existing operations if updating main job
+                    if not main_job_created:
+                        main_job.operations.all().delete()
+                    # Create operations
+                    for operation_data in operations_data:
+                        MainJobOperation.objects.create(
+                            main_job=main_job,
+                            **operation_data
+                        )
             
             # Create daily reports
             for day, data in daily_data.items():
@@ -272,10 +275,8 @@ class WeeklyReportCreateSerializer(serializers.ModelSerializer):
                     )
             
             return weekly_report
-        except Exception as e:
-            print(f"❌ Error in create method: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error creating weekly report")
             raise
 
     def update(self, instance, validated_data):
@@ -334,7 +335,11 @@ class WeeklyReportCreateSerializer(serializers.ModelSerializer):
                             for op in main_job.operations.all()
                         ]
                         if ops_snapshot:
-                            log_change('MainJobOperation', 'bulk_delete', ops_snapshot)
+                            request = self.context.get('request')
+                            log_change(
+                                'MainJobOperation', 'bulk_delete', ops_snapshot,
+                                user=request.user if request else instance.student,
+                            )
                     except Exception:
                         pass
                     main_job.operations.all().delete()
@@ -377,10 +382,8 @@ class WeeklyReportCreateSerializer(serializers.ModelSerializer):
                     )
             
             return instance
-        except Exception as e:
-            print(f"❌ Error in update method: {e}")
-            import traceback
-            traceback.print_exc()
+        except Exception:
+            logger.exception("Error updating weekly report")
             raise 
 
 class MainJobDetailSerializer(serializers.ModelSerializer):
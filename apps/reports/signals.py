@@ -0,0 +1,23 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import DailyReport, MainJob, MainJobOperation
+from .search import index_instance, remove_instance
+
+
+@receiver(post_save, sender=DailyReport)
+@receiver(post_save, sender=MainJob)
+@receiver(post_save, sender=MainJobOperation)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    """Keep the full-text search index in sync with report content."""
+    if raw:
+        # loaddata: related rows may not exist yet; run rebuild_search_index afterwards
+        return
+    index_instance(instance)
+
+
+@receiver(post_delete, sender=DailyReport)
+@receiver(post_delete, sender=MainJob)
+@receiver(post_delete, sender=MainJobOperation)
+def remove_from_search_index(sender, instance, **kwargs):
+    """Drop deleted report content from the full-text search index."""
+    remove_instance(instance)
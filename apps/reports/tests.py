@@ -0,0 +1,162 @@
+import datetime
+import json
+from types import SimpleNamespace
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.ai_assist.mock_llm import WEEKLY_REPORT_RESPONSE
+from .models import DailyReport, MainJob, MainJobOperation, WeeklyReport
+from .search import get_search_backend
+
+
+class WeeklyEnhancementTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        for offset in range(5):
+            DailyReport.objects.create(
+                student=cls.user, week_number=1, date=datetime.date(2025, 1, 20) + datetime.timedelta(days=offset),
+                description='Serviced the compressor', hours_spent=8,
+            )
+        weekly_report = WeeklyReport.create_from_daily_reports(cls.user, 1)
+        main_job = MainJob.objects.create(weekly_report=weekly_report, title='Compressor servicing')
+        for step in range(1, 6):
+            MainJobOperation.objects.create(main_job=main_job, step_number=step, operation_description=f'Step {step}')
+
+    def setUp(self):
+        cache.clear()  # throttle buckets
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def enhance(self, reply, available=True):
+        gateway = mock.Mock()
+        gateway.available.return_value = available
+        gateway.complete.return_value = SimpleNamespace(text=reply, output_tokens=2000)
+        with mock.patch('apps.reports.views.get_llm_gateway', return_value=gateway):
+            return self.client.post('/api/reports/weekly/week/1/enhance_with_ai/', {}, format='json')
+
+    def test_truncated_reply_keeps_the_users_operations(self):
+        reply = json.dumps(WEEKLY_REPORT_RESPONSE, indent=2)
+        response = self.enhance(reply[:reply.index('"step_number": 3') + 30])
+        self.assertEqual(response.status_code, 200)
+        operations = MainJobOperation.objects.filter(main_job__weekly_report__student=self.user)
+        self.assertEqual(list(operations.values_list('operation_description', flat=True)),
+                         [f'Step {step}' for step in range(1, 6)])
+        self.assertEqual(
+            DailyReport.objects.get(student=self.user, date=datetime.date(2025, 1, 20)).description,
+            WEEKLY_REPORT_RESPONSE['daily_reports'][0]['description'],
+        )
+
+    def test_complete_reply_replaces_operations(self):
+        response = self.enhance('Here is the {draft}: ' + json.dumps(WEEKLY_REPORT_RESPONSE))
+        self.assertEqual(response.status_code, 200)
+        operations = MainJobOperation.objects.filter(main_job__weekly_report__student=self.user)
+        self.assertEqual(operations.count(), len(WEEKLY_REPORT_RESPONSE['operations']))
+
+    def test_failed_enhancement_returns_its_error_response(self):
+        response = self.enhance('', available=False)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['error_type'], 'missing_api_key')
+
+
+class ReportSearchTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # The index table comes from a RunPython migration
+        with connection.cursor() as cursor:
+            for sql in get_search_backend(connection).create_sql:
+                cursor.execute(sql)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+        cls.other = User.objects.create_user(username='other', password='pass12345')
+        cls.staff = User.objects.create_user(username='staff', password='pass12345', is_staff=True)
+
+        cls.daily = DailyReport.objects.create(
+            student=cls.user, week_number=1, date=datetime.date(2025, 1, 20), hours_spent=8,
+            description='Replaced the pump seals on the loader, then checked the coolant level and belts',
+        )
+        weekly_report = WeeklyReport.objects.create(
+            student=cls.user, week_number=1, start_date=datetime.date(2025, 1, 20), end_date=datetime.date(2025, 1, 24),
+        )
+        cls.main_job = MainJob.objects.create(
+            weekly_report=weekly_report, title='Hydraulic pump overhaul', description='Pump teardown and pump rebuild',
+        )
+        cls.operation = MainJobOperation.objects.create(
+            main_job=cls.main_job, step_number=1, operation_description='Drained the oil', tools_used='Pump puller',
+        )
+        DailyReport.objects.create(
+            student=cls.other, week_number=1, date=datetime.date(2025, 1, 20), hours_spent=8,
+            description='Inspected the fire pump',
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, q, user=None, **params):
+        self.client.force_authenticate(user or self.user)
+        response = self.client.get('/api/reports/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data['data']
+
+    def hits(self, q, **params):
+        return [(row['kind'], row['id']) for row in self.search(q, **params)['results']]
+
+    def test_index_follows_saves_and_deletes(self):
+        self.assertIn(('daily_report', self.daily.pk), self.hits('seals'))
+
+        self.daily.description = 'Welded the bucket teeth'
+        self.daily.save()
+        self.assertEqual(self.hits('seals'), [])
+        self.assertEqual(self.hits('welded'), [('daily_report', self.daily.pk)])
+
+        self.assertEqual(self.hits('puller'), [('operation', self.operation.pk)])
+        self.operation.delete()
+        self.assertEqual(self.hits('puller'), [])
+
+        self.main_job.delete()
+        self.assertEqual(self.hits('overhaul'), [])
+
+    def test_results_are_ranked_and_paginated(self):
+        # The job mentions pump three times, once in the weighted title
+        self.assertEqual(
+            self.hits('pump'),
+            [('main_job', self.main_job.pk), ('operation', self.operation.pk), ('daily_report', self.daily.pk)],
+        )
+        first = self.search('pump', page_size=2)
+        self.assertEqual((first['count'], first['has_next'], len(first['results'])), (3, True, 2))
+        last = self.search('pump', page_size=2, page=2)
+        self.assertEqual(last['has_next'], False)
+        self.assertEqual([row['id'] for row in last['results']], [self.daily.pk])
+        self.assertEqual(self.hits('pump', kind='operation'), [('operation', self.operation.pk)])
+
+    def test_students_only_search_their_own_reports(self):
+        self.assertNotIn('fire', str(self.search('pump')['results']))
+        self.assertEqual(self.search('fire')['count'], 0)
+        self.assertEqual(self.search('fire', student='all')['count'], 0)
+
+        self.assertEqual(self.search('fire', user=self.staff, student='all')['count'], 1)
+        self.assertEqual(self.search('pump', user=self.staff, student=str(self.other.pk))['count'], 1)
+
+    def test_query_syntax_is_treated_as_plain_words(self):
+        # Operators, prefixes, column filters and stray quotes are all just words
+        self.assertEqual(self.hits('pump*'), self.hits('pump'))
+        self.assertEqual(self.hits('pump OR welded'), [])
+        self.assertEqual(self.hits('title:overhaul'), [])
+        self.assertEqual(self.hits('"pump NEAR(seals'), [])
+        self.assertEqual(self.search('"*:()')['count'], 0)
+
+    def test_unsupported_database_is_501(self):
+        with mock.patch('apps.reports.search.get_search_backend', return_value=None):
+            response = self.client.get('/api/reports/search/', {'q': 'pump'})
+        self.assertEqual(response.status_code, 501)
+        self.assertFalse(response.data['success'])
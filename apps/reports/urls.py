@@ -3,7 +3,7 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     DailyReportViewSet, WeeklyReportViewSet, 
     MainJobViewSet, MainJobOperationViewSet,
-    MainJobOperationsViewSet, MainJobDetailViewSet
+    MainJobOperationsViewSet, MainJobDetailViewSet, report_search
 )
 
 router = DefaultRouter()
@@ -12,6 +12,7 @@ router.register(r'weekly', WeeklyReportViewSet, basename='weekly')
 router.register(r'main-jobs', MainJobViewSet, basename='main-job')
 
 urlpatterns = [
+    path('search/', report_search, name='report-search'),
     path('', include(router.urls)),
     # Custom endpoints for main job operations management
     path('main-jobs/<int:main_job_id>/operations/', MainJobOperationsViewSet.as_view({
@@ -1,5 +1,5 @@
 from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from django_filters import rest_framework as filters
 from django.shortcuts import get_object_or_404
@@ -11,17 +11,26 @@ from .serializers import (
     MainJobUpdateSerializer, MainJobOperationCreateSerializer, MainJobOperationUpdateSerializer
 )
 from apps.exporter.services import export_weekly_report_pdf, export_weekly_report_docx
-import anthropic
-import json
-import os
+from .search import KIND_CODES, SearchUnavailable, search_reports
+from apps.ai_assist.parsing import EnhancementParseError, parse_enhancement
+from apps.ai_assist.providers import get_llm_gateway, usage_tracker
+from apps.core.llm_admission import LLMUnavailable
+from apps.core.singleflight import RequestBusy, RequestInProgress, get_single_flight, request_key
+from apps.core.throttling import AIWeeklyReportThrottle
+import logging
 from django.conf import settings
 
-# Configure Anthropic Claude
-ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
-if ANTHROPIC_API_KEY and ANTHROPIC_API_KEY != 'your-api-key-here':
-    anthropic_client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-else:
-    anthropic_client = None
+logger = logging.getLogger(__name__)
+
+
+class _EnhancementFailed(Exception):
+    """A failed enhancement's response; raised so duplicates in other workers don't replay it."""
+
+    def __init__(self, body, status_code):
+        super().__init__(body.get('message'))
+        self.body = body
+        self.status_code = status_code
+
 
 class DailyReportViewSet(viewsets.ModelViewSet):
     """ViewSet for daily reports."""
@@ -82,8 +91,7 @@ class WeeklyReportViewSet(viewsets.ModelViewSet):
                 serializer = self.get_serializer(weekly_report)
                 return Response(serializer.data)
             elif request.method == 'PUT':
-                # Debug: Log the received data
-                print(f"🔍 Received data for week {week_number}: {request.data}")
+                logger.debug("Updating weekly report for week %s", week_number, extra={'payload': request.data})
                 
                 # Use the create serializer for updates
                 serializer = WeeklyReportCreateSerializer(weekly_report, data=request.data, partial=True)
@@ -93,7 +101,7 @@ class WeeklyReportViewSet(viewsets.ModelViewSet):
                     read_serializer = self.get_serializer(updated_report)
                     return Response(read_serializer.data)
                 else:
-                    print(f"❌ Validation errors: {serializer.errors}")
+                    logger.info("Weekly report for week %s failed validation", week_number, extra={'errors': serializer.errors})
                     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
                     
         except WeeklyReport.DoesNotExist:
@@ -103,8 +111,7 @@ class WeeklyReportViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_404_NOT_FOUND
                 )
             elif request.method == 'PUT':
-                # Debug: Log the received data
-                print(f"🔍 Creating new report for week {week_number}: {request.data}")
+                logger.debug("Creating weekly report for week %s", week_number, extra={'payload': request.data})
                 
                 # Create new weekly report if it doesn't exist
                 # First, try to get or create the weekly report to avoid duplicate
@@ -130,11 +137,11 @@ class WeeklyReportViewSet(viewsets.ModelViewSet):
                         read_serializer = self.get_serializer(weekly_report)
                         return Response(read_serializer.data, status=status.HTTP_201_CREATED)
                     else:
-                        print(f"❌ Validation errors: {serializer.errors}")
+                        logger.info("Weekly report for week %s failed validation", week_number, extra={'errors': serializer.errors})
                         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
                         
                 except Exception as e:
-                    print(f"❌ Error creating/updating report: {e}")
+                    logger.exception("Error creating/updating weekly report for week %s", week_number)
                     return Response(
                         {"error": f"Error creating/updating report: {str(e)}"}, 
                         status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -170,7 +177,8 @@ class WeeklyReportViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-    @action(detail=False, methods=['post'], url_path='week/(?P<week_number>[^/.]+)/enhance_with_ai')
+    @action(detail=False, methods=['post'], url_path='week/(?P<week_number>[^/.]+)/enhance_with_ai',
+            throttle_classes=[AIWeeklyReportThrottle])
     def enhance_by_week_number(self, request, week_number=None):
         """Enhance weekly report by week number"""
         try:
@@ -190,75 +198,19 @@ class WeeklyReportViewSet(viewsets.ModelViewSet):
                     'message': f'Weekly report for week {week_number} not found'
                 }, status=status.HTTP_404_NOT_FOUND)
             
-            print(f"🔍 Enhancing weekly report for week {week_number} (ID: {weekly_report.id}) for user {request.user.id}")
-            
-            # Get additional instructions from request
-            additional_instructions = request.data.get('additional_instructions', '')
-            print(f"📝 Additional instructions: {additional_instructions}")
-            
-            # Prepare data for AI enhancement
-            enhancement_data = self._prepare_enhancement_data(weekly_report)
-            print(f"📊 Prepared enhancement data: {enhancement_data}")
-            
-            # Save original inputs before enhancement
-            self._save_original_inputs(weekly_report, enhancement_data, additional_instructions)
-            
-            # Call Claude API
-            enhanced_data = self._enhance_with_claude(enhancement_data, additional_instructions)
+            logger.info("Enhancing weekly report %s (week %s) for user %s", weekly_report.id, week_number, request.user.id)
             
-            if enhanced_data:
-                print(f"✅ AI enhancement successful: {enhanced_data}")
-                
-                # Transform enhanced data to match serializer format
-                transformed_data = self._transform_enhanced_data(enhanced_data, weekly_report)
-                print(f"🔄 Transformed data: {transformed_data}")
-                
-                # Update the weekly report with enhanced data
-                serializer = WeeklyReportCreateSerializer(
-                    weekly_report,
-                    data=transformed_data,
-                    partial=True,
-                    context={'request': request}
-                )
-                
-                if serializer.is_valid():
-                    enhanced_report = serializer.save()
-                    return Response({
-                        'success': True,
-                        'message': 'Weekly report enhanced successfully',
-                        'data': self.get_serializer(enhanced_report).data
-                    })
-                else:
-                    print(f"❌ Serializer validation errors: {serializer.errors}")
-                    return Response({
-                        'success': False,
-                        'message': 'Error saving enhanced report',
-                        'errors': serializer.errors
-                    }, status=status.HTTP_400_BAD_REQUEST)
-            else:
-                print("❌ AI enhancement returned None")
-                if anthropic_client is None:
-                    return Response({
-                        'success': False,
-                        'message': 'AI enhancement not available - no valid API key configured. Please set ANTHROPIC_API_KEY environment variable.',
-                        'error_type': 'missing_api_key'
-                    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-                else:
-                    return Response({
-                        'success': False,
-                        'message': 'Failed to enhance report with AI'
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                
+            return self._enhance_report(request, weekly_report)
+        except (LLMUnavailable, RequestInProgress, RequestBusy):
+            raise
         except Exception as e:
-            print(f"💥 Error in enhance_by_week_number: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error in enhance_by_week_number")
             return Response({
                 'success': False,
                 'message': f'Error enhancing report: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['post'], throttle_classes=[AIWeeklyReportThrottle])
     def enhance_with_ai(self, request, pk=None):
         """Enhance weekly report using AI"""
         try:
@@ -270,74 +222,103 @@ class WeeklyReportViewSet(viewsets.ModelViewSet):
                 }, status=status.HTTP_401_UNAUTHORIZED)
             
             weekly_report = self.get_object()
-            print(f"🔍 Enhancing weekly report {pk} for user {request.user.id}")
-            
-            # Get additional instructions from request
-            additional_instructions = request.data.get('additional_instructions', '')
-            print(f"📝 Additional instructions: {additional_instructions}")
-            
-            # Prepare data for AI enhancement
-            enhancement_data = self._prepare_enhancement_data(weekly_report)
-            print(f"📊 Prepared enhancement data: {enhancement_data}")
-            
-            # Save original inputs before enhancement
-            self._save_original_inputs(weekly_report, enhancement_data, additional_instructions)
+            logger.info("Enhancing weekly report %s for user %s", pk, request.user.id)
             
-            # Call Claude API
-            enhanced_data = self._enhance_with_claude(enhancement_data, additional_instructions)
-            
-            if enhanced_data:
-                print(f"✅ AI enhancement successful: {enhanced_data}")
-                
-                # Transform enhanced data to match serializer format
-                transformed_data = self._transform_enhanced_data(enhanced_data, weekly_report)
-                print(f"🔄 Transformed data: {transformed_data}")
-                
-                # Update the weekly report with enhanced data
-                serializer = WeeklyReportCreateSerializer(
-                    weekly_report,
-                    data=transformed_data,
-                    partial=True,
-                    context={'request': request}
-                )
-                
-                if serializer.is_valid():
-                    enhanced_report = serializer.save()
-                    return Response({
-                        'success': True,
-                        'message': 'Weekly report enhanced successfully',
-                        'data': self.get_serializer(enhanced_report).data
-                    })
-                else:
-                    print(f"❌ Serializer validation errors: {serializer.errors}")
-                    return Response({
-                        'success': False,
-                        'message': 'Error saving enhanced report',
-                        'errors': serializer.errors
-                    }, status=status.HTTP_400_BAD_REQUEST)
-            else:
-                print("❌ AI enhancement returned None")
-                if anthropic_client is None:
-                    return Response({
-                        'success': False,
-                        'message': 'AI enhancement not available - no valid API key configured. Please set ANTHROPIC_API_KEY environment variable.',
-                        'error_type': 'missing_api_key'
-                    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-                else:
-                    return Response({
-                        'success': False,
-                        'message': 'Failed to enhance report with AI'
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                
+            return self._enhance_report(request, weekly_report)
+        except (LLMUnavailable, RequestInProgress, RequestBusy):
+            raise
         except Exception as e:
-            print(f"💥 Error in enhance_with_ai: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error in enhance_with_ai")
             return Response({
                 'success': False,
                 'message': f'Error enhancing report: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    def _enhance_report(self, request, weekly_report):
+        """Enhance ``weekly_report``; identical concurrent requests share one run.
+
+        Double clicks and client retries send the same enhancement several
+        times at once. They are keyed on user, week and the exact inputs, so
+        only one calls the LLM and saves the report, and all get its response.
+        Enhancements of the same week with different inputs run one at a time.
+        """
+        # Get additional instructions from request
+        additional_instructions = request.data.get('additional_instructions', '')
+        
+        # Prepare data for AI enhancement
+        enhancement_data = self._prepare_enhancement_data(weekly_report)
+        logger.debug("Prepared enhancement data", extra={
+            'payload': enhancement_data, 'additional_instructions': additional_instructions
+        })
+        
+        key = request_key(request.user.id, weekly_report.week_number, enhancement_data, additional_instructions)
+        try:
+            body, shared = get_single_flight('weekly_enhance').do(
+                key, lambda: self._run_enhancement(request, weekly_report, enhancement_data, additional_instructions),
+                group=request_key(request.user.id, weekly_report.week_number),
+                replay=lambda: self._enhanced_body(self.get_queryset().get(pk=weekly_report.pk))
+            )
+        except _EnhancementFailed as e:
+            return Response(e.body, status=e.status_code)
+        if shared:
+            logger.info("Joined an identical in-flight enhancement of weekly report %s", weekly_report.id)
+        return Response(body, status=status.HTTP_200_OK)
+    
+    def _enhanced_body(self, weekly_report):
+        return {
+            'success': True,
+            'message': 'Weekly report enhanced successfully',
+            'data': self.get_serializer(weekly_report).data
+        }
+    
+    def _run_enhancement(self, request, weekly_report, enhancement_data, additional_instructions):
+        """Call the LLM and save the enhanced report; returns the response body.
+
+        Failures raise :class:`_EnhancementFailed` with their response.
+        """
+        # Save original inputs before enhancement
+        self._save_original_inputs(weekly_report, enhancement_data, additional_instructions)
+        
+        # Call Claude API
+        enhanced_data = self._enhance_with_claude(enhancement_data, additional_instructions)
+        
+        if enhanced_data:
+            # Transform enhanced data to match serializer format
+            transformed_data = self._transform_enhanced_data(enhanced_data, weekly_report)
+            logger.debug("AI enhancement transformed", extra={'payload': transformed_data})
+            
+            # Update the weekly report with enhanced data
+            serializer = WeeklyReportCreateSerializer(
+                weekly_report,
+                data=transformed_data,
+                partial=True,
+                context={'request': request}
+            )
+            
+            if serializer.is_valid():
+                enhanced_report = serializer.save()
+                return self._enhanced_body(enhanced_report)
+            else:
+                logger.warning("Enhanced weekly report %s failed validation", weekly_report.id, extra={'errors': serializer.errors})
+                raise _EnhancementFailed({
+                    'success': False,
+                    'message': 'Error saving enhanced report',
+                    'errors': serializer.errors
+                }, status.HTTP_400_BAD_REQUEST)
+        else:
+            logger.warning("AI enhancement returned nothing for weekly report %s", weekly_report.id)
+            if not get_llm_gateway().available():
+                raise _EnhancementFailed({
+                    'success': False,
+                    'message': 'AI enhancement not available - no valid API key configured. Please set the ANTHROPIC_API_KEY or OPENAI_API_KEY environment variable.',
+                    'error_type': 'missing_api_key'
+                }, status.HTTP_503_SERVICE_UNAVAILABLE)
+            else:
+                raise _EnhancementFailed({
+                    'success': False,
+                    'message': 'Failed to enhance report with AI'
+                }, status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
     def _prepare_enhancement_data(self, weekly_report):
         """Prepare data for AI enhancement"""
         # Get daily reports using the correct method
@@ -394,49 +375,38 @@ class WeeklyReportViewSet(viewsets.ModelViewSet):
         }
     
     def _enhance_with_claude(self, data, additional_instructions):
-        """Enhance data using Anthropic Claude API"""
+        """Enhance data with Claude (OpenAI as fallback) through the LLM provider layer"""
         try:
-            # Check if Claude API is available
-            if anthropic_client is None:
-                print("❌ Claude API not available - no valid API key provided")
+            gateway = get_llm_gateway()
+            if not gateway.available():
+                logger.warning("AI enhancement not available - no valid API key provided")
                 return None
             
             # Prepare prompt
             prompt = self._create_enhancement_prompt(data, additional_instructions)
             
-            # Call Claude API (using Claude 3 Haiku - cheapest model)
-            response = anthropic_client.messages.create(
-                model="claude-3-haiku-20240307",
+            # Claude 3 Haiku (cheapest model) first; tokens are tracked even if
+            # the reply turns out not to be valid JSON
+            completion = gateway.complete(
+                prompt,
                 max_tokens=2000,
                 temperature=0.7,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
+                prefer='anthropic',
+                on_complete=usage_tracker(self.request.user, 'ENHANCE', 'WEEKLY', prompt)
             )
-            
-            # Parse response
-            enhanced_content = response.content[0].text
-            
-            # Parse the JSON response
             try:
-                enhanced_data = json.loads(enhanced_content)
-                return enhanced_data
-            except json.JSONDecodeError:
-                # If JSON parsing fails, try to extract JSON from the response
-                import re
-                json_match = re.search(r'\{.*\}', enhanced_content, re.DOTALL)
-                if json_match:
-                    enhanced_data = json.loads(json_match.group())
-                    return enhanced_data
-                else:
-                    print(f"Failed to parse Claude response: {enhanced_content}")
-                    return None
+                enhanced_data, repaired = parse_enhancement(completion.text, original=data)
+            except EnhancementParseError as e:
+                logger.warning("Failed to parse Claude response: %s", e, extra={'response_text': completion.text[:2000]})
+                return None
+            if repaired:
+                logger.info("Repaired truncated AI enhancement JSON", extra={'output_tokens': completion.output_tokens})
+            return enhanced_data
                     
+        except LLMUnavailable:
+            raise
         except Exception as e:
-            print(f"Claude API Error: {str(e)}")
+            logger.exception("Claude API error")
             return None
     
     def _create_enhancement_prompt(self, data, additional_instructions):
@@ -598,10 +568,8 @@ Return only this JSON format:
                 original_inputs.enhancement_instructions = additional_instructions
                 original_inputs.save()
             
-            print(f"💾 Saved original inputs for weekly report {weekly_report.id}")
-            
-        except Exception as e:
-            print(f"⚠️ Warning: Could not save original inputs: {str(e)}")
+        except Exception:
+            logger.warning("Could not save original inputs for weekly report %s", weekly_report.id, exc_info=True)
             # Don't fail the enhancement if saving original inputs fails
 
     def _transform_enhanced_data(self, enhanced_data, weekly_report):
@@ -728,7 +696,8 @@ class MainJobOperationsViewSet(viewsets.ModelViewSet):
                     'step_number': instance.step_number,
                     'operation_description': instance.operation_description,
                     'tools_used': instance.tools_used,
-                }
+                },
+                user=self.request.user,
             )
         except Exception:
             pass
@@ -771,4 +740,67 @@ class MainJobDetailViewSet(viewsets.ModelViewSet):
     def partial_update(self, request, *args, **kwargs):
         """Partial update main job title."""
         kwargs['partial'] = True
-        return self.update(request, *args, **kwargs) 
\ No newline at end of file
+        return self.update(request, *args, **kwargs)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def report_search(request):
+    """Ranked full-text search over the user's daily reports, main jobs and operations.
+
+    Query params: q (required), kind (daily_report|main_job|operation), page, page_size.
+    Staff may pass student=<user id> to search another student's reports, or
+    student=all to search everyone's.
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({
+            'success': False,
+            'message': 'Search query is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    kind = request.query_params.get('kind') or None
+    if kind and kind not in KIND_CODES:
+        return Response({
+            'success': False,
+            'message': f"kind must be one of: {', '.join(KIND_CODES)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    student_id = request.user.id
+    student = request.query_params.get('student')
+    if student and request.user.is_staff:
+        if student == 'all':
+            student_id = None
+        elif student.isdigit():
+            student_id = int(student)
+
+    try:
+        page = max(int(request.query_params.get('page', 1)), 1)
+        page_size = min(max(int(request.query_params.get('page_size', 20)), 1), 50)
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'page and page_size must be integers'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        results, total = search_reports(
+            query, student_id=student_id, kind=kind,
+            limit=page_size, offset=(page - 1) * page_size
+        )
+    except SearchUnavailable as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+    return Response({
+        'success': True,
+        'data': {
+            'count': total,
+            'page': page,
+            'page_size': page_size,
+            'has_next': page * page_size < total,
+            'results': results,
+        }
+    })
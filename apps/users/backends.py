@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from .hashers import hashing_slot
+
+
+class ProfileModelBackend(ModelBackend):
+    """ModelBackend that loads the profile and token balance with the user.
+
+    Login responses read ``user.profile`` and User post_save signals touch
+    ``user.balance``, so fetching both in the credentials query saves two
+    queries per login. Only the password hashing holds a ``hashing_slot()``,
+    not the user lookup.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.select_related('profile', 'balance').get(
+                **{UserModel.USERNAME_FIELD: username}
+            )
+        except UserModel.DoesNotExist:
+            # Run the default password hasher once to reduce the timing
+            # difference between an existing and a nonexistent user (#20760).
+            with hashing_slot():
+                UserModel().set_password(password)
+        else:
+            with hashing_slot():
+                password_ok = user.check_password(password)
+            if password_ok and self.user_can_authenticate(user):
+                return user
+        return None
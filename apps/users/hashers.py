@@ -0,0 +1,56 @@
+"""Password hashing: a tunable PBKDF2 hasher and a cap on concurrent hashing.
+
+PBKDF2 is CPU-bound. ``hashing_slot()`` lets at most ``PASSWORD_HASH_CONCURRENCY``
+hashes run at once per process (``hashlib`` releases the GIL while hashing, so
+these run in parallel). Other requests wait up to ``PASSWORD_HASH_WAIT``
+seconds for a slot and then get a 503, so a login rush can't occupy every
+worker thread.
+"""
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """pbkdf2_sha256 with the iteration count from ``PASSWORD_HASH_ITERATIONS``.
+
+    The algorithm name is unchanged, so existing hashes still verify. Hashes
+    with a different iteration count are re-encoded on the user's next
+    successful login (Django's ``must_update``).
+    """
+
+    iterations = getattr(settings, 'PASSWORD_HASH_ITERATIONS', PBKDF2PasswordHasher.iterations)
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many sign-in requests right now, please try again in a few seconds.'
+    default_code = 'password_hashing_busy'
+
+
+_slots = None
+_slots_lock = threading.Lock()
+
+
+def _get_slots():
+    global _slots
+    if _slots is None:
+        with _slots_lock:
+            if _slots is None:
+                _slots = threading.BoundedSemaphore(getattr(settings, 'PASSWORD_HASH_CONCURRENCY', 2))
+    return _slots
+
+
+@contextmanager
+def hashing_slot():
+    """Hold one of the process's password hashing slots; raises PasswordHashingBusy on timeout."""
+    slots = _get_slots()
+    if not slots.acquire(timeout=getattr(settings, 'PASSWORD_HASH_WAIT', 5)):
+        raise PasswordHashingBusy()
+    try:
+        yield
+    finally:
+        slots.release()
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 23:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_remove_userprofile_company_userprofile_company_name_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userprofile",
+            index=models.Index(fields=["company_name"], name="profile_company_name_idx"),
+        ),
+    ]
@@ -41,6 +41,10 @@ class UserProfile(models.Model):
         db_table = 'user_profiles'
         verbose_name = 'User Profile'
         verbose_name_plural = 'User Profiles'
+        indexes = [
+            # Students are linked to companies by name; backs per-company student counts
+            models.Index(fields=['company_name'], name='profile_company_name_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.student_id or 'No ID'}"
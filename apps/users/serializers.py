@@ -1,9 +1,33 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .hashers import hashing_slot
 from .models import UserProfile
 
 
+class LoginSerializer(TokenObtainPairSerializer):
+    """Token pair plus the user summary, built from the user that was just authenticated."""
+    
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        user = self.user
+        # Safely check if user has complete profile
+        try:
+            has_complete_profile = bool(user.profile.company_name and user.profile.company_name.strip())
+        except UserProfile.DoesNotExist:
+            has_complete_profile = False
+        
+        data['user'] = {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email,
+            'full_name': user.get_full_name(),
+            'has_complete_profile': has_complete_profile
+        }
+        return data
+
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, validators=[validate_password])
     password_confirm = serializers.CharField(write_only=True)
@@ -19,7 +43,8 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         validated_data.pop('password_confirm')
-        user = User.objects.create_user(**validated_data)
+        with hashing_slot():
+            user = User.objects.create_user(**validated_data)
         UserProfile.objects.create(user=user)
         return user
 
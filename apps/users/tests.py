@@ -0,0 +1,50 @@
+import threading
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+
+@override_settings(PASSWORD_HASH_WAIT=0.01)
+class LoginTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='student', password='pass12345')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def login(self, password='pass12345'):
+        return self.client.post('/api/auth/login/', {'username': 'student', 'password': password}, format='json')
+
+    def test_login_returns_tokens_and_user(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user']['username'], 'student')
+        self.assertIn('access', response.data)
+
+    def test_login_takes_three_queries(self):
+        # User with profile and balance, outstanding token insert, last_login update
+        with self.assertNumQueries(3):
+            response = self.login()
+        self.assertEqual(response.status_code, 200)
+
+    def test_last_login_update_does_not_save_the_balance(self):
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=['last_login'])
+        # Any other save still saves the balance alongside the user
+        with CaptureQueriesContext(connection) as queries:
+            self.user.save(update_fields=['first_name'])
+        self.assertEqual(len([q for q in queries if 'user_balances' in q['sql']]), 1)
+
+    def test_login_is_503_while_every_hashing_slot_is_taken(self):
+        with mock.patch('apps.users.hashers._slots', threading.BoundedSemaphore(1)) as slots:
+            slots.acquire()
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.data['detail'].code, 'password_hashing_busy')
@@ -1,35 +1,19 @@
 from rest_framework import status, generics, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
-from .serializers import UserRegistrationSerializer, UserProfileSerializer, UserSerializer
+from apps.core.throttling import LoginIPThrottle, LoginUserThrottle, PasswordChangeThrottle
+from apps.core.token_blacklist import IndexedRefreshToken
+from .hashers import PasswordHashingBusy, hashing_slot
+from .serializers import LoginSerializer, UserRegistrationSerializer, UserProfileSerializer, UserSerializer
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
-    def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        if response.status_code == 200:
-            # Get the user from the request data
-            username = request.data.get('username')
-            user = User.objects.get(username=username)
-            # Safely check if user has complete profile
-            has_complete_profile = False
-            try:
-                has_complete_profile = user.profile.company_name is not None and user.profile.company_name.strip() != ''
-            except:
-                has_complete_profile = False
-            
-            response.data['user'] = {
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'full_name': user.get_full_name(),
-                'has_complete_profile': has_complete_profile
-            }
-        return response
+    serializer_class = LoginSerializer
+    throttle_classes = [LoginIPThrottle, LoginUserThrottle]
 
 
 class UserRegistrationView(generics.CreateAPIView):
@@ -76,6 +60,7 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
+@throttle_classes([PasswordChangeThrottle])
 def change_password_view(request):
     """Change password for authenticated user."""
     try:
@@ -90,7 +75,9 @@ def change_password_view(request):
         
         # Verify current password
         user = request.user
-        if not user.check_password(current_password):
+        with hashing_slot():
+            password_ok = user.check_password(current_password)
+        if not password_ok:
             return Response({
                 'success': False,
                 'message': 'Current password is incorrect'
@@ -104,14 +91,18 @@ def change_password_view(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Change password
-        user.set_password(new_password)
-        user.save()
+        with hashing_slot():
+            user.set_password(new_password)
+        # Only the password: the authenticated user's other columns come from a cache
+        user.save(update_fields=['password'])
         
         return Response({
             'success': True,
             'message': 'Password changed successfully'
         }, status=status.HTTP_200_OK)
         
+    except PasswordHashingBusy:
+        raise
     except Exception as e:
         return Response({
             'success': False,
@@ -125,7 +116,7 @@ def change_password_view(request):
 def logout_view(request):
     try:
         refresh_token = request.data.get('refresh')
-        token = RefreshToken(refresh_token)
+        token = IndexedRefreshToken(refresh_token)
         token.blacklist()
         return Response({
             'success': True,
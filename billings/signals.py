@@ -12,8 +12,11 @@ def create_user_balance(sender, instance, created, **kwargs):
 
 
 @receiver(post_save, sender=User)
-def save_user_balance(sender, instance, **kwargs):
+def save_user_balance(sender, instance, update_fields=None, **kwargs):
     """Save UserBalance when user is updated."""
+    # Logins only touch last_login; skip them
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
     try:
         instance.balance.save()
     except UserBalance.DoesNotExist:
@@ -49,11 +49,15 @@ LOCAL_APPS = [
     'apps.ai_assist',
     'apps.exporter',
     'apps.core',
+    'apps.admin_dashboard',
+    'billings',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    'apps.core.middleware.RequestIdMiddleware',
+    'apps.core.middleware.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -94,6 +98,24 @@ DATABASES = {
     }
 }
 
+# Authentication (loads profile and balance with the user at login)
+AUTHENTICATION_BACKENDS = [
+    'apps.users.backends.ProfileModelBackend',
+]
+
+# Password hashing: iterations are tunable; at most PASSWORD_HASH_CONCURRENCY hashes run
+# at once per process, other logins wait PASSWORD_HASH_WAIT seconds and then get a 503
+PASSWORD_HASHERS = [
+    'apps.users.hashers.TunedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_HASH_ITERATIONS = config('PASSWORD_HASH_ITERATIONS', default=600000, cast=int)
+PASSWORD_HASH_CONCURRENCY = config('PASSWORD_HASH_CONCURRENCY', default=2, cast=int)
+PASSWORD_HASH_WAIT = config('PASSWORD_HASH_WAIT', default=5, cast=float)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -153,6 +175,21 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FormParser',
     ],
+    # Token-bucket throttles (apps.core.throttling)
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': '60/min',
+        'login_user': '10/min',
+        'password_change': '5/min',
+        # AI endpoints: '<scope>.<payment_status>' overrides '<scope>'
+        'ai_enhance': '30/hour',
+        'ai_enhance.SUBSCRIBED': '120/hour',
+        'ai_generate': '10/hour',
+        'ai_generate.SUBSCRIBED': '40/hour',
+        'ai_suggest': '30/hour',
+        'ai_suggest.SUBSCRIBED': '120/hour',
+        'ai_weekly_report': '5/hour',
+        'ai_weekly_report.SUBSCRIBED': '20/hour',
+    },
 }
 
 # JWT Configuration
@@ -170,8 +207,20 @@ SIMPLE_JWT = {
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
     'TOKEN_TYPE_CLAIM': 'token_type',
+    'TOKEN_REFRESH_SERIALIZER': 'apps.core.token_blacklist.IndexedTokenRefreshSerializer',
 }
 
+# JWT authentication caches each user's id/active/staff flags for this many seconds;
+# bans and deactivations take effect in other workers within this window
+JWT_USER_CACHE_TTL = config('JWT_USER_CACHE_TTL', default=15, cast=int)
+
+# Request profiling middleware (opt-in): per-endpoint SQL/latency samples in a ring buffer
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=False, cast=bool)
+PROFILING_SAMPLE_RATE = config('PROFILING_SAMPLE_RATE', default=1.0, cast=float)
+PROFILING_BUFFER_SIZE = config('PROFILING_BUFFER_SIZE', default=5000, cast=int)
+PROFILING_FLUSH_INTERVAL = config('PROFILING_FLUSH_INTERVAL', default=10, cast=int)
+PROFILING_SNAPSHOT_MAX_AGE = config('PROFILING_SNAPSHOT_MAX_AGE', default=86400, cast=int)
+
 # Production CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     'https://maipt.netlify.app',
@@ -194,9 +243,12 @@ SECURE_HSTS_PRELOAD = True
 
 # AI API Keys for Production
 ANTHROPIC_API_KEY = config('ANTHROPIC_API_KEY', default='')
+ANTHROPIC_MODEL = config('ANTHROPIC_MODEL', default='claude-3-haiku-20240307')
+ANTHROPIC_BASE_URL = config('ANTHROPIC_BASE_URL', default='')
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
 OPENAI_MODEL = config('OPENAI_MODEL', default='gpt-4')
 OPENAI_MAX_TOKENS = config('OPENAI_MAX_TOKENS', default=2000, cast=int)
+OPENAI_API_BASE = config('OPENAI_API_BASE', default='')
 
 # Production Email Configuration
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
@@ -207,6 +259,11 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 
 # Production Logging Configuration
+# JSON lines to logs/django.log; file and console I/O happen on a QueueListener thread
+LOG_LEVEL = config('LOG_LEVEL', default='INFO')
+LOG_PAYLOAD_SAMPLE_RATE = config('LOG_PAYLOAD_SAMPLE_RATE', default=0.01, cast=float)
+LOG_MAX_FIELD_CHARS = config('LOG_MAX_FIELD_CHARS', default=2000, cast=int)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -219,18 +276,33 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'apps.core.structured_logging.JSONFormatter',
+            'max_field_chars': LOG_MAX_FIELD_CHARS,
+        },
+    },
+    'filters': {
+        'request_id': {
+            '()': 'apps.core.structured_logging.RequestIdFilter',
+        },
+        'sample_payloads': {
+            '()': 'apps.core.structured_logging.PayloadSamplingFilter',
+            'rate': LOG_PAYLOAD_SAMPLE_RATE,
+        },
     },
     'handlers': {
         'file': {
             'level': 'INFO',
-            'class': 'logging.FileHandler',
+            '()': 'apps.core.structured_logging.async_file_handler',
             'filename': BASE_DIR / 'logs' / 'django.log',
-            'formatter': 'verbose',
+            'formatter': 'json',
+            'filters': ['request_id', 'sample_payloads'],
         },
         'console': {
             'level': 'INFO',
-            'class': 'logging.StreamHandler',
+            '()': 'apps.core.structured_logging.async_stream_handler',
             'formatter': 'simple',
+            'filters': ['request_id', 'sample_payloads'],
         },
     },
     'root': {
@@ -243,9 +315,72 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'apps': {
+            'level': LOG_LEVEL,
+        },
     },
 }
 
 # Create logs directory if it doesn't exist
 os.makedirs(BASE_DIR / 'logs', exist_ok=True)
 
+# Audit log: buffered background writer with size/age based rotation
+AUDIT_LOG_MAX_BYTES = config('AUDIT_LOG_MAX_BYTES', default=50 * 1024 * 1024, cast=int)
+AUDIT_LOG_MAX_AGE = config('AUDIT_LOG_MAX_AGE', default=24 * 60 * 60, cast=int)
+AUDIT_LOG_FLUSH_INTERVAL = config('AUDIT_LOG_FLUSH_INTERVAL', default=1.0, cast=float)
+AUDIT_LOG_TO_DATABASE = config('AUDIT_LOG_TO_DATABASE', default=True, cast=bool)
+AUDIT_EVENT_RETENTION_DAYS = config('AUDIT_EVENT_RETENTION_DAYS', default=365, cast=int)
+
+# Company autocomplete: in-process LRU cache of ranked suggestions per prefix
+COMPANY_AUTOCOMPLETE_CACHE_SIZE = config('COMPANY_AUTOCOMPLETE_CACHE_SIZE', default=1024, cast=int)
+COMPANY_AUTOCOMPLETE_CACHE_TTL = config('COMPANY_AUTOCOMPLETE_CACHE_TTL', default=300, cast=int)
+
+# Admin user list header stats are cached for this many seconds
+ADMIN_USER_STATS_CACHE_TTL = config('ADMIN_USER_STATS_CACHE_TTL', default=60, cast=int)
+
+# LLM usage events are queued and written in batches (TokenUsage, AIEnhancementLog, daily rollups)
+USAGE_EVENT_FLUSH_INTERVAL = config('USAGE_EVENT_FLUSH_INTERVAL', default=2.0, cast=float)
+USAGE_EVENT_BATCH_SIZE = config('USAGE_EVENT_BATCH_SIZE', default=500, cast=int)
+USAGE_EVENT_QUEUE_SIZE = config('USAGE_EVENT_QUEUE_SIZE', default=10000, cast=int)
+
+# Live admin dashboard (server-sent events)
+LIVE_METRICS_REFRESH_INTERVAL = config('LIVE_METRICS_REFRESH_INTERVAL', default=30, cast=int)
+LIVE_METRICS_MIN_INTERVAL = config('LIVE_METRICS_MIN_INTERVAL', default=2, cast=int)
+LIVE_METRICS_HEARTBEAT = config('LIVE_METRICS_HEARTBEAT', default=15, cast=int)
+LIVE_METRICS_STREAM_MAX_AGE = config('LIVE_METRICS_STREAM_MAX_AGE', default=300, cast=int)
+# Each stream holds a server thread for up to LIVE_METRICS_STREAM_MAX_AGE seconds, so streams are
+# capped at half of WEB_THREADS (the gunicorn --threads per worker, set in the Dockerfile)
+WEB_THREADS = config('WEB_THREADS', default=8, cast=int)
+LIVE_METRICS_MAX_STREAMS = min(
+    config('LIVE_METRICS_MAX_STREAMS', default=max(1, WEB_THREADS // 4), cast=int), max(1, WEB_THREADS // 2)
+)
+
+# Refresh token blacklist: per-process Bloom filter in front of blacklist checks, synced with
+# new blacklist rows every SYNC_INTERVAL seconds and rebuilt every REBUILD_INTERVAL seconds so
+# expired tokens drop out (run `prune_tokens` daily)
+TOKEN_BLACKLIST_SYNC_INTERVAL = config('TOKEN_BLACKLIST_SYNC_INTERVAL', default=5, cast=int)
+TOKEN_BLACKLIST_REBUILD_INTERVAL = config('TOKEN_BLACKLIST_REBUILD_INTERVAL', default=3600, cast=int)
+TOKEN_BLACKLIST_ERROR_RATE = config('TOKEN_BLACKLIST_ERROR_RATE', default=0.001, cast=float)
+
+# Cache alias for throttle buckets; point it at a shared backend to make limits global
+THROTTLE_CACHE_ALIAS = config('THROTTLE_CACHE_ALIAS', default='default')
+
+# Outbound LLM calls: at most LLM_MAX_CONCURRENCY at once across the host's workers;
+# callers queue (LLM_QUEUE_SIZE per worker) for up to LLM_QUEUE_TIMEOUT seconds, then get a 503
+LLM_MAX_CONCURRENCY = config('LLM_MAX_CONCURRENCY', default=4, cast=int)
+LLM_QUEUE_SIZE = config('LLM_QUEUE_SIZE', default=16, cast=int)
+LLM_QUEUE_TIMEOUT = config('LLM_QUEUE_TIMEOUT', default=20, cast=float)
+
+# LLM provider layer: circuit breakers, hedged requests and failover between Anthropic and OpenAI
+LLM_REQUEST_TIMEOUT = config('LLM_REQUEST_TIMEOUT', default=45, cast=float)
+LLM_HEDGE_ENABLED = config('LLM_HEDGE_ENABLED', default=True, cast=bool)
+LLM_HEDGE_MIN_DELAY = config('LLM_HEDGE_MIN_DELAY', default=2.0, cast=float)
+LLM_BREAKER_FAILURES = config('LLM_BREAKER_FAILURES', default=5, cast=int)
+LLM_BREAKER_RESET = config('LLM_BREAKER_RESET', default=30, cast=int)
+
+# Identical concurrent weekly report enhancements (double clicks, retries) share one LLM call and save;
+# duplicates wait up to SINGLE_FLIGHT_TIMEOUT seconds for it, then get a 409 (other enhancements of
+# the same week get a 503). A duplicate in another worker reuses a run finished in the last
+# SINGLE_FLIGHT_RESULT_TTL seconds
+SINGLE_FLIGHT_TIMEOUT = config('SINGLE_FLIGHT_TIMEOUT', default=120, cast=float)
+SINGLE_FLIGHT_RESULT_TTL = config('SINGLE_FLIGHT_RESULT_TTL', default=60, cast=int)